@@ -18,6 +18,14 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/CSCfi/tauhka",
     packages=setuptools.find_packages(),
+    entry_points={
+        "console_scripts": [
+            "tauhka=tauhka.runner:main",
+            "tauhka-report=tauhka.report:main",
+            "tauhka-baseline=tauhka.baseline:main",
+            "tauhka-load=tauhka.load:main",
+        ],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
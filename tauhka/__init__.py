@@ -1,5 +1,29 @@
 __name__ = "tauhka"
-__all__ = ["testcase"]
+__all__ = [
+    "testcase",
+    "pool",
+    "runner",
+    "network",
+    "perflog",
+    "memory",
+    "devtools",
+    "heapsnapshot",
+    "report",
+    "har",
+    "performance",
+    "baseline",
+    "profiler",
+    "throttling",
+    "replay",
+    "query",
+    "page",
+    "waits",
+    "fake",
+    "stream",
+    "console",
+    "load",
+    "artifacts",
+]
 __version__ = "0.0.10"
 __author__ = "CSC - IT Center for Science Ltd."
 __copyright__ = "Copyright (C) 2019 CSC - IT Center for Science Ltd."
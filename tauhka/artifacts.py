@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the background writer of the failure artifacts.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import os
+import gzip
+import json
+import queue
+import atexit
+import functools
+import threading
+import collections
+
+DOM_SNAPSHOT_ARGS = {"computedStyles": []}
+DEFAULT_ARTIFACT_MAX_MB = 200
+
+
+def json_payload(value):
+    # the serialization is left to the writer thread
+    return functools.partial(json.dumps, value, separators=(",", ":"))
+
+
+class TauhkaArtifactWriter(object):
+    def __init__(self, directory, max_bytes=None, compresslevel=6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        # the written files oldest first, the oldest are evicted over the size cap
+        self.written = collections.deque()
+        self.total_bytes = 0
+        self.evicted = []
+        self.errors = []
+
+    def submit(self, filename, payload, compress=True):
+        # payload is bytes, a string or a callable returning either
+        if compress:
+            filename += ".gz"
+        with self.lock:
+            if self.thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self.thread = threading.Thread(target=self.run, name="tauhka-artifact-writer", daemon=True)
+                self.thread.start()
+        self.queue.put((filename, payload, compress))
+        return filename
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self.write(*item)
+            except (OSError, TypeError, ValueError) as e:
+                self.errors.append((item[0], str(e)))
+            finally:
+                self.queue.task_done()
+
+    def write(self, filename, payload, compress):
+        data = payload() if callable(payload) else payload
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if compress:
+            data = gzip.compress(data, self.compresslevel)
+        with open(filename, "wb") as fh:
+            fh.write(data)
+        self.written.append((filename, len(data)))
+        self.total_bytes += len(data)
+        self.evict()
+
+    def evict(self):
+        while self.max_bytes and self.total_bytes > self.max_bytes and self.written:
+            filename, size = self.written.popleft()
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            self.evicted.append(filename)
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+
+
+artifact_writers = {}
+
+
+def get_artifact_writer(directory, max_bytes=None):
+    # one writer and one size cap per directory for the whole run
+    if directory not in artifact_writers:
+        artifact_writers[directory] = TauhkaArtifactWriter(directory, max_bytes)
+        atexit.register(artifact_writers[directory].close)
+    return artifact_writers[directory]
+
+
+def close_artifact_writers():
+    # the queued artifacts are written before the writers stop
+    for writer in artifact_writers.values():
+        writer.close()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the persistent performance baseline store.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import os
+import sys
+import time
+import atexit
+import sqlite3
+import argparse
+import statistics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    description TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS measurements_key ON measurements (test_id, description, metric, created);
+CREATE INDEX IF NOT EXISTS measurements_run ON measurements (run_id);
+"""
+
+
+def new_run_id():
+    return "{time}-{pid}".format(time=time.strftime("%Y%m%d%H%M%S"), pid=os.getpid())
+
+
+def median_mad(values):
+    median = statistics.median(values)
+    return median, statistics.median([abs(value - median) for value in values])
+
+
+class TauhkaBaselineStore(object):
+    def __init__(self, filename, run_id=None):
+        self.filename = filename
+        self.run_id = run_id or new_run_id()
+        self.connection = sqlite3.connect(filename, timeout=30)
+        self.connection.executescript(SCHEMA)
+
+    def record(self, test_id, description, metric, value):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO measurements (run_id, test_id, description, metric, value, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.run_id, test_id, description or "", metric, float(value), time.time())
+            )
+
+    def history(self, test_id, description, metric, window=20):
+        # the values of the earlier runs, newest first
+        rows = self.connection.execute(
+            "SELECT value FROM measurements WHERE test_id = ? AND description = ? AND metric = ? AND run_id != ? ORDER BY created DESC LIMIT ?",
+            (test_id, description or "", metric, self.run_id, window)
+        )
+        return [row[0] for row in rows]
+
+    def threshold(self, test_id, description, metric, k=3.0, window=20, min_samples=5, min_relative_spread=0.05, min_delta=1.0):
+        values = self.history(test_id, description, metric, window)
+        if len(values) < min_samples:
+            return None
+        median, mad = median_mad(values)
+        # identical earlier values would make any change a regression, and with a zero median even a relative spread is zero
+        return median + max(k * max(mad, abs(median) * min_relative_spread), min_delta)
+
+    def runs(self):
+        rows = self.connection.execute("SELECT run_id, MIN(created), COUNT(*) FROM measurements GROUP BY run_id ORDER BY MIN(created)")
+        return list(rows)
+
+    def run_values(self, run_id):
+        rows = self.connection.execute(
+            "SELECT test_id, description, metric, AVG(value) FROM measurements WHERE run_id = ? GROUP BY test_id, description, metric",
+            (run_id,)
+        )
+        return dict(((test_id, description, metric), value) for test_id, description, metric, value in rows)
+
+    def compare(self, run_a, run_b):
+        values_a = self.run_values(run_a)
+        values_b = self.run_values(run_b)
+        rows = []
+        for key in sorted(set(values_a.keys()) & set(values_b.keys())):
+            value_a, value_b = values_a[key], values_b[key]
+            ratio = value_b / value_a if value_a else (float("inf") if value_b > 0 else 1.0)
+            rows.append(key + (value_a, value_b, value_b - value_a, ratio))
+        rows.sort(key=lambda row: row[-1], reverse=True)
+        return rows
+
+    def trends(self, test_id=None, window=20):
+        query = "SELECT DISTINCT test_id, description, metric FROM measurements"
+        args = ()
+        if test_id:
+            query += " WHERE test_id LIKE ?"
+            args = (test_id + "%",)
+        rows = []
+        for key in self.connection.execute(query + " ORDER BY test_id, description, metric", args).fetchall():
+            values = [row[0] for row in self.connection.execute(
+                "SELECT value FROM measurements WHERE test_id = ? AND description = ? AND metric = ? ORDER BY created DESC LIMIT ?",
+                key + (window,)
+            )]
+            values.reverse()
+            median, mad = median_mad(values)
+            rows.append(key + (len(values), median, mad, values[-1]))
+        return rows
+
+    def close(self):
+        self.connection.close()
+
+
+baseline_store = None
+
+
+def get_baseline_store():
+    global baseline_store
+    filename = os.environ.get("TAUHKA_BASELINE_DB", None)
+    if not filename:
+        return None
+    if baseline_store is None:
+        baseline_store = TauhkaBaselineStore(filename, os.environ.get("TAUHKA_RUN_ID", None))
+        atexit.register(baseline_store.close)
+    return baseline_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tauhka-baseline", description="Show the performance baselines recorded by tauhka.")
+    parser.add_argument("--db", default=os.environ.get("TAUHKA_BASELINE_DB", "tauhka-baseline.sqlite"), help="baseline database")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("runs", help="list the recorded runs")
+    trends = commands.add_parser("trends", help="show the median, MAD and latest value of every measurement")
+    trends.add_argument("test", nargs="?", default=None, help="test id prefix")
+    trends.add_argument("--window", type=int, default=20, help="number of latest runs")
+    compare = commands.add_parser("compare", help="show the worst regressions between two runs")
+    compare.add_argument("run_a", nargs="?", default=None, help="earlier run, defaults to the second latest")
+    compare.add_argument("run_b", nargs="?", default=None, help="later run, defaults to the latest")
+    compare.add_argument("--top", type=int, default=20, help="number of rows to show")
+    args = parser.parse_args(argv)
+
+    store = TauhkaBaselineStore(args.db)
+    if args.command == "trends":
+        print("test\tdescription\tmetric\tcount\tmedian\tmad\tlatest")
+        for test_id, description, metric, count, median, mad, latest in store.trends(args.test, args.window):
+            print(test_id, description, metric, count, "{0:.3f}".format(median), "{0:.3f}".format(mad), "{0:.3f}".format(latest), sep="\t")
+    elif args.command == "compare":
+        runs = [run[0] for run in store.runs()]
+        if len(runs) < 2 and not (args.run_a and args.run_b):
+            print("At least two runs are needed for a comparison.")
+            return 1
+        run_a = args.run_a or runs[-2]
+        run_b = args.run_b or runs[-1]
+        print("Regressions from {run_a} to {run_b}:".format(run_a=run_a, run_b=run_b))
+        print("test\tdescription\tmetric\tbefore\tafter\tdiff\tratio")
+        for test_id, description, metric, value_a, value_b, diff, ratio in store.compare(run_a, run_b)[:args.top]:
+            print(test_id, description, metric, "{0:.3f}".format(value_a), "{0:.3f}".format(value_b),
+                  "{0:+.3f}".format(diff), "{0:.2f}x".format(ratio), sep="\t")
+    else:
+        print("run\tstarted\tmeasurements")
+        for run_id, created, count in store.runs():
+            print(run_id, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created)), count, sep="\t")
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
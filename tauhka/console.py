@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the console log filters and deduplication.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import re
+import time
+import collections
+
+CONSOLE_LEVELS = ("DEBUG", "INFO", "WARNING", "SEVERE")
+
+# for the browsers without the chromedriver browser log
+CONSOLE_HOOK_SCRIPT = """
+if (!window.__tauhka_console) {
+    var entries = window.__tauhka_console = [];
+    var levels = {debug: 'DEBUG', log: 'INFO', info: 'INFO', warn: 'WARNING', error: 'SEVERE'};
+    Object.keys(levels).forEach(function(name) {
+        var original = console[name];
+        console[name] = function() {
+            var message = Array.prototype.map.call(arguments, function(arg) { return String(arg); }).join(' ');
+            entries.push({timestamp: Date.now(), level: levels[name], message: message, stack: null});
+            return original.apply(console, arguments);
+        };
+    });
+    window.addEventListener('error', function(event) {
+        entries.push({timestamp: Date.now(), level: 'SEVERE', message: event.message, stack: event.error ? String(event.error.stack) : null});
+    });
+}
+"""
+COLLECT_CONSOLE_SCRIPT = "var entries = window.__tauhka_console; return entries ? entries.splice(0, entries.length) : [];"
+
+
+class TauhkaConsoleFilter(object):
+    def __init__(self, levels=None, pattern=None, ignore=None):
+        self.levels = set(levels) if levels else None
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.ignore = re.compile(ignore) if isinstance(ignore, str) else ignore
+
+    def __call__(self, row):
+        level, message = row[1], row[2] or ""
+        if self.levels is not None and level not in self.levels:
+            return False
+        if self.pattern is not None and not self.pattern.search(message):
+            return False
+        if self.ignore is not None and self.ignore.search(message):
+            return False
+        return True
+
+
+class TauhkaConsoleLog(object):
+    # repeated messages are kept once with a count, so log storms take no memory
+    def __init__(self):
+        self.entries = collections.OrderedDict()
+
+    def add(self, rows):
+        for row in rows:
+            key = (row[1], row[2])
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = [row[0], row[1], row[2], row[3] if len(row) > 3 else 1]
+            else:
+                entry[3] += row[3] if len(row) > 3 else 1
+        return self
+
+    def rows(self):
+        return [tuple(entry) for entry in self.entries.values()]
+
+    def count(self, level=None):
+        return sum(entry[3] for entry in self.entries.values() if level is None or entry[1] == level)
+
+    def counts(self):
+        counts = collections.OrderedDict((level, 0) for level in CONSOLE_LEVELS)
+        for entry in self.entries.values():
+            counts[entry[1]] = counts.get(entry[1], 0) + entry[3]
+        return counts
+
+
+def dedupe_console(rows):
+    return TauhkaConsoleLog().add(rows).rows()
+
+
+def exception_record(params):
+    # Runtime.exceptionThrown with the stack trace of the throw
+    details = params.get("exceptionDetails", {})
+    frames = (details.get("stackTrace") or {}).get("callFrames", [])
+    return {
+        "timestamp": params.get("timestamp", time.time() * 1000),
+        "message": details.get("exception", {}).get("description") or details.get("text", ""),
+        "stack": [
+            "{function} ({url}:{line}:{column})".format(
+                function=frame.get("functionName") or "(anonymous)",
+                url=frame.get("url", ""),
+                line=frame.get("lineNumber", 0) + 1,
+                column=frame.get("columnNumber", 0) + 1
+            )
+            for frame in frames
+        ],
+    }
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the DevTools protocol websocket connection.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import os
+import json
+import base64
+import socket
+import queue
+import struct
+import logging
+import threading
+import http.client
+from urllib.parse import urlparse
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+logger = logging.getLogger(__name__)
+
+
+class TauhkaDevToolsError(Exception):
+    pass
+
+
+def mask_payload(mask, payload):
+    if not payload:
+        return payload
+    repeated = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(payload), "big")
+
+
+def encode_frame(opcode, payload, masked=True):
+    # client frames are always masked, server frames never
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if masked else 0
+    length = len(payload)
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 65536:
+        header += bytes([mask_bit | 126]) + struct.pack(">H", length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack(">Q", length)
+    if not masked:
+        return header + payload
+    mask = os.urandom(4)
+    return header + mask + mask_payload(mask, payload)
+
+
+def decode_frame_header(header):
+    fin = bool(header[0] & 0x80)
+    opcode = header[0] & 0x0F
+    masked = bool(header[1] & 0x80)
+    length = header[1] & 0x7F
+    return fin, opcode, masked, length
+
+
+def handshake_request(url, key):
+    parsed = urlparse(url)
+    return (
+        "GET {path} HTTP/1.1\r\n"
+        "Host: {host}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        "Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n"
+        "\r\n"
+    ).format(path=parsed.path or "/", host=parsed.netloc, key=key).encode("ascii")
+
+
+def debugger_address(driver):
+    capabilities = getattr(driver, "capabilities", None) or {}
+    return capabilities.get("goog:chromeOptions", {}).get("debuggerAddress")
+
+
+def page_websocket_url(address, target_id=None):
+    host, port = address.rsplit(":", 1)
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    try:
+        connection.request("GET", "/json")
+        targets = json.loads(connection.getresponse().read().decode("utf-8"))
+    finally:
+        connection.close()
+    pages = [target for target in targets if target.get("type") == "page"]
+    for target in pages:
+        if target.get("id") == target_id:
+            return target["webSocketDebuggerUrl"]
+    if not pages:
+        raise TauhkaDevToolsError("No page targets available at {address}".format(address=address))
+    return pages[0]["webSocketDebuggerUrl"]
+
+
+def driver_websocket_url(driver):
+    # the fake driver serves its own stand-in DevTools endpoint
+    if hasattr(driver, "devtools_websocket_url"):
+        return driver.devtools_websocket_url()
+    address = debugger_address(driver)
+    if not address:
+        raise TauhkaDevToolsError("The browser does not expose a DevTools debugger address")
+    # chromedriver window handles are the DevTools target ids with a prefix
+    target_id = driver.current_window_handle.replace("CDwindow-", "")
+    return page_websocket_url(address, target_id)
+
+
+class TauhkaWebSocket(object):
+    # client frames are masked, the frames of the fake DevTools server are not
+    def __init__(self, sock, pending=b"", masked=True):
+        self.sock = sock
+        self.pending = pending
+        self.masked = masked
+        self.send_lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, url, timeout=30):
+        parsed = urlparse(url)
+        sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout=timeout)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        sock.sendall(handshake_request(url, key))
+        response = b""
+        while b"\r\n\r\n" not in response:
+            data = sock.recv(4096)
+            if not data:
+                raise TauhkaDevToolsError("Connection closed during websocket handshake")
+            response += data
+        status_line = response.split(b"\r\n", 1)[0]
+        if b" 101 " not in status_line + b" ":
+            raise TauhkaDevToolsError("Websocket handshake failed: {status}".format(status=status_line.decode("ascii", "replace")))
+        # the reader thread waits for browser events for as long as the test runs
+        sock.settimeout(None)
+        return cls(sock, response.split(b"\r\n\r\n", 1)[1])
+
+    def read_exactly(self, count):
+        data = self.pending[:count]
+        self.pending = self.pending[count:]
+        while len(data) < count:
+            chunk = self.sock.recv(max(65536, count - len(data)))
+            if not chunk:
+                raise TauhkaDevToolsError("Websocket connection closed")
+            data += chunk
+        if len(data) > count:
+            self.pending = data[count:] + self.pending
+            data = data[:count]
+        return data
+
+    def send(self, text):
+        self.send_frame(OPCODE_TEXT, text.encode("utf-8"))
+
+    def send_frame(self, opcode, payload):
+        with self.send_lock:
+            self.sock.sendall(encode_frame(opcode, payload, self.masked))
+
+    def recv(self):
+        message = b""
+        while True:
+            fin, opcode, masked, length = decode_frame_header(self.read_exactly(2))
+            if length == 126:
+                length = struct.unpack(">H", self.read_exactly(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", self.read_exactly(8))[0]
+            mask = self.read_exactly(4) if masked else None
+            payload = self.read_exactly(length)
+            if mask:
+                payload = mask_payload(mask, payload)
+            if opcode == OPCODE_PING:
+                self.send_frame(OPCODE_PONG, payload)
+                continue
+            if opcode == OPCODE_PONG:
+                continue
+            if opcode == OPCODE_CLOSE:
+                raise TauhkaDevToolsError("Websocket connection closed by the peer")
+            message += payload
+            if fin:
+                return message.decode("utf-8")
+
+    def close(self):
+        try:
+            self.send_frame(OPCODE_CLOSE, b"")
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class TauhkaDevTools(object):
+    def __init__(self, url, timeout=30):
+        self.websocket = TauhkaWebSocket.connect(url, timeout)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.last_id = 0
+        self.pending = {}
+        self.subscribers = {}
+        self.listeners = []
+        self.events = queue.Queue()
+        self.error = None
+        self.reader = threading.Thread(target=self.read_messages, name="tauhka-devtools-reader", daemon=True)
+        self.reader.start()
+        self.dispatcher = threading.Thread(target=self.dispatch_events, name="tauhka-devtools-events", daemon=True)
+        self.dispatcher.start()
+
+    @classmethod
+    def for_driver(cls, driver, timeout=30):
+        return cls(driver_websocket_url(driver), timeout)
+
+    def read_messages(self):
+        try:
+            while True:
+                message = json.loads(self.websocket.recv())
+                if "id" in message:
+                    with self.lock:
+                        slot = self.pending.get(message["id"])
+                    if slot:
+                        slot["message"] = message
+                        slot["done"].set()
+                elif "method" in message:
+                    method, params = message["method"], message.get("params", {})
+                    # listeners see every event on the reader thread, e.g. the TauhkaEventStream buffers
+                    for on_event, on_close in self.listeners:
+                        on_event(method, params)
+                    # handlers given to call() see the events before the response, in order
+                    with self.lock:
+                        call_handlers = [slot["on_event"] for slot in self.pending.values() if slot["on_event"]]
+                    for handler in call_handlers:
+                        handler(method, params)
+                    if method in self.subscribers:
+                        self.events.put((method, params))
+        except (TauhkaDevToolsError, OSError, ValueError) as e:
+            self.error = e
+        with self.lock:
+            for slot in self.pending.values():
+                slot["done"].set()
+        for on_event, on_close in self.listeners:
+            if on_close:
+                on_close()
+        self.events.put(None)
+
+    def dispatch_events(self):
+        # subscribers run in their own thread, so they can call() the browser
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            method, params = event
+            for handler in list(self.subscribers.get(method, [])):
+                try:
+                    handler(params)
+                except Exception:
+                    logger.exception("DevTools event handler for %s failed", method)
+
+    def listen(self, on_event, on_close=None):
+        self.listeners.append((on_event, on_close))
+
+    def subscribe(self, method, handler):
+        self.subscribers.setdefault(method, []).append(handler)
+
+    def unsubscribe(self, method, handler):
+        handlers = self.subscribers.get(method, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self.subscribers.pop(method, None)
+
+    def call(self, method, params=None, on_event=None):
+        slot = {"done": threading.Event(), "message": None, "on_event": on_event}
+        with self.lock:
+            if self.error is not None:
+                raise TauhkaDevToolsError("DevTools connection is closed: {error}".format(error=self.error))
+            self.last_id += 1
+            message_id = self.last_id
+            self.pending[message_id] = slot
+            self.websocket.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+        try:
+            if not slot["done"].wait(self.timeout):
+                raise TauhkaDevToolsError("{method} timed out after {timeout} seconds".format(method=method, timeout=self.timeout))
+        finally:
+            with self.lock:
+                self.pending.pop(message_id, None)
+        message = slot["message"]
+        if message is None:
+            raise TauhkaDevToolsError("DevTools connection was closed during {method}: {error}".format(method=method, error=self.error))
+        if "error" in message:
+            raise TauhkaDevToolsError("{method} failed: {error}".format(method=method, error=message["error"].get("message")))
+        return message.get("result", {})
+
+    def close(self):
+        self.websocket.close()
+        self.reader.join(self.timeout)
+        self.dispatcher.join(self.timeout)
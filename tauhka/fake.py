@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the fake driver for testing tauhka without a browser.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import re
+import json
+import time
+import base64
+import socket
+import hashlib
+import threading
+import collections
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+from tauhka.waits import WAIT_SCRIPT, DEFAULT_SCRIPT_TIMEOUT
+from tauhka.devtools import TauhkaDevToolsError, TauhkaWebSocket
+
+DEFAULT_HEAP_SIZE = 1024 * 1024
+FAKE_SCREENSHOT = b"\x89PNG\r\n\x1a\n"
+EMPTY_CPU_PROFILE = {"nodes": [], "startTime": 0, "endTime": 0, "samples": [], "timeDeltas": []}
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+NETWORK_RESOURCE_COMMANDS = ("Network.getResponseBody", "Network.getRequestPostData")
+NO_RESOURCE_ERROR = "No resource with given identifier found"
+CONSOLE_TYPES = {"DEBUG": "debug", "INFO": "log", "WARNING": "warning", "SEVERE": "error"}
+
+
+def performance_row(method, params, timestamp=None):
+    # the shape of the rows chromedriver returns from get_log('performance')
+    timestamp = time.time() if timestamp is None else timestamp
+    return {
+        "level": "INFO",
+        "timestamp": int(timestamp * 1000),
+        "message": json.dumps({"message": {"method": method, "params": params}, "webview": "fake"}),
+    }
+
+
+def console_row(level, message, timestamp=None):
+    timestamp = time.time() if timestamp is None else timestamp
+    return {"level": level, "message": message, "source": "console-api", "timestamp": int(timestamp * 1000)}
+
+
+def load_fake_script(filename):
+    if not filename:
+        return {}
+    with open(filename) as fh:
+        return json.load(fh)
+
+
+class TauhkaFakeDevTools(object):
+    def __init__(self, driver):
+        self.driver = driver
+        self.handlers = {}
+
+    def subscribe(self, method, handler):
+        self.handlers.setdefault(method, []).append(handler)
+
+    def unsubscribe(self, method, handler):
+        handlers = self.handlers.get(method, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def dispatch(self, method, params):
+        for handler in list(self.handlers.get(method, [])):
+            handler(params)
+
+    def call(self, method, params=None, on_event=None):
+        return self.driver.execute_cdp_cmd(method, params or {})
+
+    def close(self):
+        if self in self.driver.devtools_connections:
+            self.driver.devtools_connections.remove(self)
+
+
+class TauhkaFakeDevToolsServer(object):
+    # stand-in for the DevTools websocket of a page, commands are answered by the fake driver
+    # and its events are sent to the clients which have enabled their domain
+    def __init__(self, driver, host="127.0.0.1"):
+        self.driver = driver
+        self.host = host
+        self.server = socket.create_server((host, 0))
+        self.port = self.server.getsockname()[1]
+        self.clients = []
+        self.lock = threading.Lock()
+        self.threads = []
+        self.thread = threading.Thread(target=self.accept, name="tauhka-fake-devtools", daemon=True)
+        self.thread.start()
+
+    def url(self):
+        return "ws://{host}:{port}/devtools/page/fake".format(host=self.host, port=self.port)
+
+    def accept(self):
+        while True:
+            try:
+                sock, address = self.server.accept()
+            except OSError:
+                return
+            thread = threading.Thread(target=self.serve, args=(sock,), name="tauhka-fake-devtools-client", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def serve(self, sock):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            data = sock.recv(4096)
+            if not data:
+                sock.close()
+                return
+            request += data
+        request, pending = request.split(b"\r\n\r\n", 1)
+        key = re.search(rb"Sec-WebSocket-Key:\s*(\S+)", request, re.IGNORECASE).group(1)
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        sock.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        websocket = TauhkaWebSocket(sock, pending, masked=False)
+        client = (websocket, set())
+        with self.lock:
+            self.clients.append(client)
+        try:
+            while True:
+                message = json.loads(websocket.recv())
+                method = message["method"]
+                if method.endswith(".enable"):
+                    client[1].add(method.split(".", 1)[0])
+                if method in NETWORK_RESOURCE_COMMANDS and "Network" not in client[1]:
+                    response = {"id": message["id"], "error": {"code": -32000, "message": NO_RESOURCE_ERROR}}
+                else:
+                    response = {"id": message["id"], "result": self.driver.cdp_response(method, message.get("params", {}))}
+                websocket.send(json.dumps(response))
+        except (TauhkaDevToolsError, OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                self.clients.remove(client)
+            websocket.close()
+
+    def broadcast(self, method, params):
+        # sent right away, so the events reach the client before the response to its next command
+        text = json.dumps({"method": method, "params": params})
+        domain = method.split(".", 1)[0]
+        with self.lock:
+            clients = list(self.clients)
+        for websocket, enabled in clients:
+            if domain in enabled:
+                try:
+                    websocket.send(text)
+                except OSError:
+                    pass
+
+    def close(self):
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+        self.thread.join()
+        with self.lock:
+            clients = list(self.clients)
+        for websocket, enabled in clients:
+            websocket.close()
+        for thread in self.threads:
+            thread.join()
+
+
+class TauhkaFakeDriver(object):
+    # replays the scripted logs, CDP responses and heap values instead of driving a browser:
+    # {"pages": {url: {"title": ..., "network": [{"method": ..., "url": ..., "status": ..., "body": ...}], "console": [[level, message]]}},
+    #  "heap": [bytes, ...], "metrics": {name: value}, "cdp": {method: response}, "scripts": [[script substring, result]]}
+    def __init__(self, script=None, performance_log=True):
+        script = script or {}
+        # like chromedriver, the session knows the network resources only while the performance log enables Network
+        self.performance_log = performance_log
+        self.pages = script.get("pages", {})
+        self.heap_values = collections.deque(script.get("heap", []))
+        self.heap_value = DEFAULT_HEAP_SIZE
+        self.metrics = dict(script.get("metrics", {}))
+        self.cdp_responses = dict(script.get("cdp", {}))
+        self.script_results = [tuple(entry) for entry in script.get("scripts", [])]
+        self.logs = {"performance": [], "browser": []}
+        self.bodies = {}
+        self.post_data = {}
+        self.devtools_connections = []
+        self.commands = collections.Counter()
+        self.request_count = 0
+        self.gc_count = 0
+        self.current_url = "about:blank"
+        self.title = ""
+        self.session_id = "fake"
+        self.capabilities = {"browserName": "fake"}
+        self.quit_called = False
+        self.devtools_server = None
+        self.script_timeout = DEFAULT_SCRIPT_TIMEOUT
+
+    @classmethod
+    def from_file(cls, filename, performance_log=True):
+        return cls(load_fake_script(filename), performance_log)
+
+    def round_trips(self):
+        return sum(self.commands.values())
+
+    def read_heap(self):
+        if self.heap_values:
+            self.heap_value = self.heap_values.popleft()
+        return self.heap_value
+
+    def emit(self, method, params, log=True):
+        if log:
+            self.logs["performance"].append(performance_row(method, params))
+        for connection in list(self.devtools_connections):
+            connection.dispatch(method, params)
+        if self.devtools_server is not None:
+            self.devtools_server.broadcast(method, params)
+
+    def log_console(self, level, message):
+        timestamp = time.time()
+        self.logs["browser"].append(console_row(level, message, timestamp))
+        # the console messages are not in the performance log
+        self.emit("Runtime.consoleAPICalled", {
+            "type": CONSOLE_TYPES.get(level, "log"),
+            "args": [{"type": "string", "value": message}],
+            "timestamp": timestamp * 1000,
+        }, log=False)
+
+    def throw_exception(self, message, frames=()):
+        # an uncaught exception, frames are (function, url, line, column)
+        timestamp = time.time()
+        self.logs["browser"].append(console_row("SEVERE", message, timestamp))
+        self.emit("Runtime.exceptionThrown", {
+            "timestamp": timestamp * 1000,
+            "exceptionDetails": {
+                "text": "Uncaught",
+                "exception": {"type": "object", "description": message},
+                "stackTrace": {"callFrames": [
+                    {"functionName": function, "url": url, "lineNumber": line - 1, "columnNumber": column - 1}
+                    for function, url, line, column in frames
+                ]},
+            },
+        }, log=False)
+
+    def devtools_websocket_url(self):
+        if self.devtools_server is None:
+            self.devtools_server = TauhkaFakeDevToolsServer(self)
+        return self.devtools_server.url()
+
+    def exchange(self, method, url, status=200, body="", post_data=None, status_text="OK"):
+        self.request_count += 1
+        request_id = "fake.{count}".format(count=self.request_count)
+        timestamp = time.time()
+        request = {"method": method, "url": url, "headers": {}}
+        if post_data is not None:
+            request["postData"] = post_data
+            self.post_data[request_id] = post_data
+        self.bodies[request_id] = body
+        self.emit("Network.requestWillBeSent", {"requestId": request_id, "timestamp": timestamp, "wallTime": timestamp, "request": request})
+        self.emit("Network.responseReceived", {
+            "requestId": request_id,
+            "timestamp": timestamp,
+            "response": {"url": url, "status": status, "statusText": status_text, "headers": {}, "mimeType": "text/plain"},
+        })
+        self.emit("Network.loadingFinished", {"requestId": request_id, "timestamp": timestamp, "encodedDataLength": len(body)})
+        return request_id
+
+    def on_script(self, pattern, result):
+        # the first script containing the pattern returns the result, callables get the script arguments
+        self.script_results.insert(0, (pattern, result))
+
+    def scripted_result(self, script, args, default):
+        for pattern, result in self.script_results:
+            if pattern in script:
+                return result(*args) if callable(result) else result
+        return default
+
+    def get(self, url):
+        self.commands["get"] += 1
+        self.current_url = url
+        page = self.pages.get(url, {})
+        self.title = page.get("title", "")
+        for exchange in page.get("network", []):
+            self.exchange(**exchange)
+        for level, message in page.get("console", []):
+            self.log_console(level, message)
+
+    def refresh(self):
+        self.get(self.current_url)
+
+    def get_log(self, kind):
+        self.commands["get_log"] += 1
+        rows, self.logs[kind] = self.logs.get(kind, []), []
+        return rows
+
+    def execute_script(self, script, *args):
+        self.commands["execute_script"] += 1
+        if "usedJSHeapSize" in script:
+            if "window.gc()" in script:
+                self.gc_count += 1
+            return self.scripted_result(script, args, self.read_heap())
+        return self.scripted_result(script, args, None)
+
+    def execute_async_script(self, script, *args):
+        self.commands["execute_async_script"] += 1
+        if script == WAIT_SCRIPT:
+            return self.scripted_result(script, args, self.wait_result(args[0], args[1]))
+        return self.scripted_result(script, args, {})
+
+    def wait_result(self, condition, args):
+        # there is no DOM, only the title conditions can hold
+        if condition == "title_is":
+            return {"ok": self.title == args[0], "value": True}
+        if condition == "title_contains":
+            return {"ok": args[0] in self.title, "value": True}
+        return {"ok": False}
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self.commands["execute_cdp_cmd"] += 1
+        if cmd in NETWORK_RESOURCE_COMMANDS and not self.performance_log:
+            raise WebDriverException("unknown error: {cmd} failed: {error}".format(cmd=cmd, error=NO_RESOURCE_ERROR))
+        return self.cdp_response(cmd, cmd_args)
+
+    def cdp_response(self, cmd, cmd_args):
+        if cmd in self.cdp_responses:
+            response = self.cdp_responses[cmd]
+            return response(cmd_args) if callable(response) else response
+        if cmd == "Runtime.getHeapUsage":
+            return {"usedSize": self.read_heap(), "totalSize": self.heap_value * 2}
+        if cmd == "HeapProfiler.collectGarbage":
+            self.gc_count += 1
+            return {}
+        if cmd == "Performance.getMetrics":
+            metrics = dict(self.metrics, JSHeapUsedSize=self.read_heap())
+            return {"metrics": [{"name": name, "value": value} for name, value in sorted(metrics.items())]}
+        if cmd == "Network.getResponseBody":
+            return {"body": self.bodies.get(cmd_args.get("requestId"), ""), "base64Encoded": False}
+        if cmd == "Network.getRequestPostData":
+            return {"postData": self.post_data.get(cmd_args.get("requestId"), "")}
+        if cmd == "Profiler.stop":
+            return {"profile": dict(EMPTY_CPU_PROFILE)}
+        if cmd == "DOMSnapshot.captureSnapshot":
+            # the snapshot refers to its strings by index
+            return {"documents": [{"documentURL": 0, "title": 1, "nodes": {}}], "strings": [self.current_url, self.title]}
+        return {}
+
+    def tauhka_devtools(self):
+        connection = TauhkaFakeDevTools(self)
+        self.devtools_connections.append(connection)
+        return connection
+
+    def get_screenshot_as_png(self):
+        self.commands["get_screenshot_as_png"] += 1
+        return FAKE_SCREENSHOT
+
+    def implicitly_wait(self, time_to_wait):
+        self.commands["implicitly_wait"] += 1
+
+    def set_script_timeout(self, time_to_wait):
+        self.commands["set_script_timeout"] += 1
+        self.script_timeout = time_to_wait
+
+    def delete_all_cookies(self):
+        self.commands["delete_all_cookies"] += 1
+
+    def get_cookies(self):
+        self.commands["get_cookies"] += 1
+        return []
+
+    def find_element(self, by, value):
+        self.commands["find_element"] += 1
+        raise NoSuchElementException("The fake driver has no DOM: {by}={value}".format(by=by, value=value))
+
+    def find_element_by_id(self, elemId):
+        return self.find_element("id", elemId)
+
+    def find_element_by_name(self, elemName):
+        return self.find_element("name", elemName)
+
+    def find_element_by_xpath(self, xpath):
+        return self.find_element("xpath", xpath)
+
+    def find_element_by_css_selector(self, css_selector):
+        return self.find_element("css selector", css_selector)
+
+    def find_element_by_class_name(self, classname):
+        return self.find_element("class name", classname)
+
+    def find_element_by_link_text(self, text):
+        return self.find_element("link text", text)
+
+    def close(self):
+        self.commands["close"] += 1
+
+    def quit(self):
+        self.commands["quit"] += 1
+        self.quit_called = True
+        if self.devtools_server is not None:
+            self.devtools_server.close()
+            self.devtools_server = None
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the HAR export of the captured network traffic.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import json
+import base64
+import datetime
+from urllib.parse import urlparse, parse_qsl
+
+import tauhka
+
+HAR_EVENTS = (
+    "Network.requestWillBeSent",
+    "Network.responseReceived",
+    "Network.dataReceived",
+    "Network.loadingFinished",
+    "Network.loadingFailed",
+)
+
+
+def har_headers(headers):
+    return [{"name": name, "value": str(value)} for name, value in (headers or {}).items()]
+
+
+def har_datetime(wall_time):
+    return datetime.datetime.fromtimestamp(wall_time, datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def har_timings(timing, finished_timestamp):
+    # chrome reports the phases in ms relative to timing.requestTime
+    if not timing:
+        return {"blocked": -1, "dns": -1, "connect": -1, "ssl": -1, "send": 0, "wait": 0, "receive": 0}
+
+    def phase(start, end):
+        if timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+            return -1
+        return timing[end] - timing[start]
+
+    first_start = [timing[name] for name in ("dnsStart", "connectStart", "sendStart") if timing.get(name, -1) >= 0]
+    receive = 0
+    if finished_timestamp is not None:
+        receive = max(0, (finished_timestamp - timing["requestTime"]) * 1000 - timing.get("receiveHeadersEnd", 0))
+    return {
+        "blocked": first_start[0] if first_start else -1,
+        "dns": phase("dnsStart", "dnsEnd"),
+        "connect": phase("connectStart", "connectEnd"),
+        "ssl": phase("sslStart", "sslEnd"),
+        "send": max(0, phase("sendStart", "sendEnd")),
+        "wait": max(0, timing.get("receiveHeadersEnd", 0) - timing.get("sendEnd", 0)),
+        "receive": receive,
+    }
+
+
+class TauhkaHarEntry(object):
+    def __init__(self, params):
+        self.request_id = str(params["requestId"])
+        self.request = params["request"]
+        self.wall_time = params.get("wallTime", 0)
+        self.timestamp = params["timestamp"]
+        self.response = None
+        self.finished_timestamp = None
+        self.encoded_data_length = None
+        self.data_length = 0
+        self.failed = None
+        self.body = None
+
+    def content(self):
+        content = {
+            "size": self.data_length,
+            "mimeType": self.response.get("mimeType", "") if self.response else "",
+        }
+        if self.body is not None:
+            text = self.body.resolve()
+            if isinstance(text, bytes):
+                content["text"] = base64.b64encode(text).decode("ascii")
+                content["encoding"] = "base64"
+            else:
+                content["text"] = str(text)
+        return content
+
+    def har(self):
+        response = self.response or {}
+        timings = har_timings(response.get("timing"), self.finished_timestamp)
+        post_data = self.request.get("postData")
+        request = {
+            "method": self.request["method"],
+            "url": self.request["url"],
+            "httpVersion": response.get("protocol", ""),
+            "cookies": [],
+            "headers": har_headers(self.request.get("headers")),
+            "queryString": [{"name": name, "value": value} for name, value in parse_qsl(urlparse(self.request["url"]).query)],
+            "headersSize": -1,
+            "bodySize": len(post_data) if post_data else 0,
+        }
+        if post_data:
+            request["postData"] = {"mimeType": self.request.get("headers", {}).get("Content-Type", ""), "text": post_data}
+        return {
+            "startedDateTime": har_datetime(self.wall_time),
+            "time": sum(value for name, value in timings.items() if value > 0 and name != "ssl"),
+            "request": request,
+            "response": {
+                "status": response.get("status", 0),
+                "statusText": response.get("statusText", self.failed or ""),
+                "httpVersion": response.get("protocol", ""),
+                "cookies": [],
+                "headers": har_headers(response.get("headers")),
+                "content": self.content(),
+                "redirectURL": response.get("headers", {}).get("Location", response.get("headers", {}).get("location", "")),
+                "headersSize": -1,
+                "bodySize": -1 if self.encoded_data_length is None else self.encoded_data_length,
+                "_transferSize": -1 if self.encoded_data_length is None else self.encoded_data_length,
+            },
+            "cache": {},
+            "timings": timings,
+            "serverIPAddress": response.get("remoteIPAddress", ""),
+            "_requestId": self.request_id,
+        }
+
+
+class TauhkaHarRecorder(object):
+    def __init__(self, body_fetcher=None):
+        # body_fetcher returns a lazy body handle for a requestId, bodies are skipped without it
+        self.body_fetcher = body_fetcher
+        self.entries = []
+        self.current = {}
+        self.parser = None
+
+    def subscribe(self, parser):
+        self.parser = parser
+        for method in HAR_EVENTS:
+            parser.subscribe(method, self.handler(method))
+        return self
+
+    def unsubscribe(self):
+        if self.parser:
+            for method in HAR_EVENTS:
+                self.parser.unsubscribe(method, self.handler(method))
+            self.parser = None
+
+    def handler(self, method):
+        return getattr(self, "on_" + method.split(".", 1)[1])
+
+    def on_requestWillBeSent(self, params):
+        request_id = str(params["requestId"])
+        previous = self.current.get(request_id)
+        if previous is not None and "redirectResponse" in params:
+            previous.response = params["redirectResponse"]
+            previous.finished_timestamp = params["timestamp"]
+        entry = TauhkaHarEntry(params)
+        self.current[request_id] = entry
+        self.entries.append(entry)
+
+    def on_responseReceived(self, params):
+        entry = self.current.get(str(params["requestId"]))
+        if entry is not None:
+            entry.response = params["response"]
+            if self.body_fetcher:
+                entry.body = self.body_fetcher(entry.request_id)
+
+    def on_dataReceived(self, params):
+        entry = self.current.get(str(params["requestId"]))
+        if entry is not None:
+            entry.data_length += params.get("dataLength", 0)
+
+    def on_loadingFinished(self, params):
+        entry = self.current.get(str(params["requestId"]))
+        if entry is not None:
+            entry.finished_timestamp = params["timestamp"]
+            entry.encoded_data_length = int(params.get("encodedDataLength", 0))
+
+    def on_loadingFailed(self, params):
+        entry = self.current.get(str(params["requestId"]))
+        if entry is not None:
+            entry.finished_timestamp = params["timestamp"]
+            entry.failed = params.get("errorText", "failed")
+
+    def total_bytes(self):
+        return sum(entry.encoded_data_length for entry in self.entries if entry.encoded_data_length)
+
+    def har(self):
+        return {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "tauhka", "version": tauhka.__version__},
+                "pages": [],
+                "entries": [entry.har() for entry in self.entries],
+            }
+        }
+
+    def save(self, filename):
+        with open(filename, "w", encoding="utf-8") as fh:
+            json.dump(self.har(), fh, indent=2)
+        return filename
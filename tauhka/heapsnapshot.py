@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the heap snapshot capture and streaming diff.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import json
+import array
+from json.decoder import scanstring
+
+from tauhka.report import artifact_filename
+
+# node types which are grouped by their constructor name, others by their type
+CONSTRUCTOR_NODE_TYPES = ("object", "native")
+SKIPPED_EDGE_TYPES = ("weak", "shortcut")
+
+
+def take_heap_snapshot(devtools, filename):
+    # the snapshot arrives in chunks, which are written to disk as they come
+    with open(filename, "w", encoding="utf-8") as fh:
+        def on_event(method, params):
+            if method == "HeapProfiler.addHeapSnapshotChunk":
+                fh.write(params["chunk"])
+        devtools.call("HeapProfiler.enable")
+        devtools.call("HeapProfiler.takeHeapSnapshot", {"reportProgress": False}, on_event=on_event)
+    return filename
+
+
+class TauhkaJsonStream(object):
+    def __init__(self, fh, chunk_size=1 << 20):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            raise ValueError("Unexpected end of heap snapshot")
+        if self.pos > len(self.buffer) // 2:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.fh.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer += chunk
+
+    def read_until(self, token):
+        text = ""
+        while True:
+            index = self.buffer.find(token, self.pos)
+            if index >= 0:
+                text += self.buffer[self.pos:index]
+                self.pos = index + len(token)
+                return text
+            # keep the tail, the token may be split between two chunks
+            keep = max(self.pos, len(self.buffer) - len(token) + 1)
+            text += self.buffer[self.pos:keep]
+            self.pos = keep
+            self.fill()
+
+    def skip_to(self, token):
+        while True:
+            index = self.buffer.find(token, self.pos)
+            if index >= 0:
+                self.pos = index + len(token)
+                return
+            self.pos = max(self.pos, len(self.buffer) - len(token) + 1)
+            self.fill()
+
+    def iter_numbers(self):
+        self.skip_to("[")
+        while True:
+            end = self.buffer.find("]", self.pos)
+            if end >= 0:
+                segment, self.pos = self.buffer[self.pos:end], end + 1
+                for part in segment.split(","):
+                    if part.strip():
+                        yield int(part)
+                return
+            cut = self.buffer.rfind(",", self.pos)
+            if cut >= 0:
+                segment, self.pos = self.buffer[self.pos:cut], cut + 1
+                for part in segment.split(","):
+                    if part.strip():
+                        yield int(part)
+            self.fill()
+
+    def iter_strings(self):
+        self.skip_to("[")
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n,":
+                self.pos += 1
+            if self.pos >= len(self.buffer):
+                self.fill()
+                continue
+            if self.buffer[self.pos] == "]":
+                self.pos += 1
+                return
+            try:
+                value, end = scanstring(self.buffer, self.pos + 1)
+            except ValueError:
+                # the string continues in the next chunk
+                self.fill()
+                continue
+            self.pos = end
+            yield value
+
+
+class TauhkaHeapSnapshotSummary(object):
+    def __init__(self):
+        self.objects = {}
+        self.retainers = {}
+
+    @classmethod
+    def from_file(cls, filename, retainers=True):
+        summary = cls()
+        with open(filename, "r", encoding="utf-8") as fh:
+            summary.parse(TauhkaJsonStream(fh), retainers)
+        return summary
+
+    def parse(self, stream, retainers=True):
+        header = stream.read_until('"nodes"').strip().rstrip(",") + "}"
+        meta = json.loads(header)["snapshot"]["meta"]
+        node_fields = meta["node_fields"]
+        node_types = meta["node_types"][node_fields.index("type")]
+        edge_fields = meta["edge_fields"]
+        edge_types = meta["edge_types"][edge_fields.index("type")]
+        node_field_count = len(node_fields)
+        type_offset = node_fields.index("type")
+        name_offset = node_fields.index("name")
+        size_offset = node_fields.index("self_size")
+        edge_count_offset = node_fields.index("edge_count")
+
+        # per node only the grouping key and the edge count are kept, in compact arrays
+        node_keys = array.array('q')
+        node_edge_counts = array.array('l')
+        totals = {}
+        node = [0] * node_field_count
+        field = 0
+        for value in stream.iter_numbers():
+            node[field] = value
+            field += 1
+            if field < node_field_count:
+                continue
+            field = 0
+            type_name = node_types[node[type_offset]] if node[type_offset] < len(node_types) else "unknown"
+            key = node[name_offset] if type_name in CONSTRUCTOR_NODE_TYPES else -(node[type_offset] + 1)
+            node_keys.append(key)
+            node_edge_counts.append(node[edge_count_offset])
+            total = totals.get(key)
+            if total is None:
+                totals[key] = [1, node[size_offset]]
+            else:
+                total[0] += 1
+                total[1] += node[size_offset]
+
+        retained = {}
+        if retainers:
+            edge_field_count = len(edge_fields)
+            edge_type_offset = edge_fields.index("type")
+            to_node_offset = edge_fields.index("to_node")
+            skipped = set(index for index, name in enumerate(edge_types) if name in SKIPPED_EDGE_TYPES)
+            owner = 0
+            owner_edges_left = node_edge_counts[0] if node_edge_counts else 0
+            edge = [0] * edge_field_count
+            field = 0
+            for value in stream.iter_numbers():
+                edge[field] = value
+                field += 1
+                if field < edge_field_count:
+                    continue
+                field = 0
+                while owner_edges_left == 0:
+                    owner += 1
+                    owner_edges_left = node_edge_counts[owner]
+                owner_edges_left -= 1
+                if edge[edge_type_offset] in skipped:
+                    continue
+                target_key = node_keys[edge[to_node_offset] // node_field_count]
+                owner_key = node_keys[owner]
+                by_owner = retained.setdefault(target_key, {})
+                by_owner[owner_key] = by_owner.get(owner_key, 0) + 1
+        del node_edge_counts
+
+        stream.skip_to('"strings"')
+        wanted = set(key for key in totals.keys() if key >= 0)
+        for by_owner in retained.values():
+            wanted.update(key for key in by_owner.keys() if key >= 0)
+        names = {}
+        for index, value in enumerate(stream.iter_strings()):
+            if index in wanted:
+                names[index] = value
+
+        def key_name(key):
+            if key >= 0:
+                return names.get(key, "(unknown)")
+            return "({type})".format(type=node_types[-key - 1])
+
+        for key, total in totals.items():
+            name = key_name(key)
+            current = self.objects.setdefault(name, [0, 0])
+            current[0] += total[0]
+            current[1] += total[1]
+        for key, by_owner in retained.items():
+            current = self.retainers.setdefault(key_name(key), {})
+            for owner_key, count in by_owner.items():
+                owner_name = key_name(owner_key)
+                current[owner_name] = current.get(owner_name, 0) + count
+
+
+def diff_heap_snapshots(before, after, top=10, top_retainers=3):
+    rows = []
+    for name, (count, size) in after.objects.items():
+        count_before, size_before = before.objects.get(name, (0, 0))
+        if count > count_before or size > size_before:
+            retainers_before = before.retainers.get(name, {})
+            retainer_growth = [
+                (owner, count_after - retainers_before.get(owner, 0))
+                for owner, count_after in after.retainers.get(name, {}).items()
+                if count_after > retainers_before.get(owner, 0)
+            ]
+            retainer_growth.sort(key=lambda item: item[1], reverse=True)
+            rows.append((name, count - count_before, size - size_before, retainer_growth[:top_retainers]))
+    rows.sort(key=lambda row: (row[2], row[1]), reverse=True)
+    return rows[:top]
+
+
+def snapshot_filename(directory, test_id, description, suffix):
+    return artifact_filename(directory, test_id, "{description}-{suffix}".format(description=description, suffix=suffix), "heapsnapshot")
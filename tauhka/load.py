@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the load mode, which runs one test scenario concurrently.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import os
+import io
+import sys
+import json
+import math
+import time
+import queue
+import argparse
+import unittest
+import contextlib
+import collections
+import multiprocessing
+
+from tauhka.pool import session_pool
+from tauhka.baseline import new_run_id
+from tauhka.report import close_report_writer
+from tauhka.artifacts import close_artifact_writers, DEFAULT_ARTIFACT_MAX_MB
+from tauhka.runner import TauhkaRunnerResult, iter_tests, init_worker
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, p):
+    # nearest rank, so the value is one of the measured ones
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, int(math.ceil(p / 100.0 * len(ordered))) - 1)]
+
+
+def format_stat(value):
+    return "-" if value is None else "{value:.3f}".format(value=value)
+
+
+def check_test_id(test_id, sys_paths):
+    # checked once before the users are started, otherwise every user fails on it
+    for path in reversed(sys_paths):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    tests = list(iter_tests(unittest.defaultTestLoader.loadTestsFromName(test_id)))
+    if len(tests) == 1 and isinstance(tests[0], unittest.loader._FailedTest):
+        raise ValueError("{test_id} cannot be loaded: {error}".format(test_id=test_id, error=tests[0]._exception))
+    if len(tests) != 1:
+        raise ValueError("{test_id} is not a single test method".format(test_id=test_id))
+
+
+def run_iteration(test_id, iteration):
+    output = io.StringIO()
+    result = TauhkaRunnerResult()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        tests = list(iter_tests(unittest.defaultTestLoader.loadTestsFromName(test_id)))
+        assert len(tests) == 1, "{test_id} is not a single test method".format(test_id=test_id)
+        test = tests[0]
+        # every virtual user keeps its browser session for all of its iterations
+        test.session_pool = "process"
+        test.session_max_uses = 0
+        test.run(result)
+    entry = result.tests[0]
+    return {
+        "iteration": iteration,
+        "user": os.getpid(),
+        "started": entry["started"],
+        "duration": entry["duration"],
+        "status": entry["status"],
+        "metrics": list(getattr(test, "recorded_metrics", [])),
+        "errors": [trace for failed, trace in result.errors + result.failures],
+    }
+
+
+def virtual_user(test_id, start_delay, next_iteration, iterations, results, sys_paths, run_id, artifact_max_mb):
+    init_worker(sys_paths, run_id)
+    os.environ["TAUHKA_ARTIFACT_MAX_MB"] = str(artifact_max_mb)
+    time.sleep(start_delay)
+    try:
+        while True:
+            with next_iteration.get_lock():
+                iteration = next_iteration.value
+                if iteration >= iterations:
+                    break
+                next_iteration.value += 1
+            results.put(run_iteration(test_id, iteration))
+    finally:
+        # the process exits without running atexit
+        session_pool.close_all()
+        close_report_writer()
+        close_artifact_writers()
+        results.put(None)
+
+
+class TauhkaLoadResult(object):
+    def __init__(self, test_id, concurrency, ramp_up):
+        self.test_id = test_id
+        self.concurrency = concurrency
+        self.ramp_up = ramp_up
+        self.iterations = []
+
+    def add(self, iteration):
+        self.iterations.append(iteration)
+
+    def statuses(self):
+        return collections.Counter(iteration["status"] for iteration in self.iterations)
+
+    def wall_time(self):
+        if not self.iterations:
+            return 0.0
+        return max(i["started"] + i["duration"] for i in self.iterations) - min(i["started"] for i in self.iterations)
+
+    def throughput(self):
+        # completed iterations per second
+        wall_time = self.wall_time()
+        return len(self.iterations) / wall_time if wall_time else 0.0
+
+    def series(self):
+        # the iteration durations and every metric the monitors recorded, by description
+        series = collections.OrderedDict()
+        series[("iteration", "duration")] = [iteration["duration"] for iteration in self.iterations]
+        for iteration in self.iterations:
+            for description, metric, value in iteration["metrics"]:
+                series.setdefault((description, metric), []).append(value)
+        return series
+
+    def stats(self):
+        return [
+            {
+                "description": description,
+                "metric": metric,
+                "count": len(values),
+                "mean": sum(values) / len(values) if values else None,
+                "max": max(values) if values else None,
+                "percentiles": dict(("p{p}".format(p=p), percentile(values, p)) for p in PERCENTILES),
+            }
+            for (description, metric), values in self.series().items()
+        ]
+
+    def as_dict(self):
+        return {
+            "test": self.test_id,
+            "concurrency": self.concurrency,
+            "ramp_up": self.ramp_up,
+            "iterations": len(self.iterations),
+            "statuses": dict(self.statuses()),
+            "wall_time": self.wall_time(),
+            "throughput": self.throughput(),
+            "stats": self.stats(),
+        }
+
+    def print_report(self, out=sys.stdout):
+        print("======================================================================", file=out)
+        print("Load: {test} with {concurrency} concurrent users, ramp-up {ramp_up:.1f}s".format(
+            test=self.test_id, concurrency=self.concurrency, ramp_up=self.ramp_up), file=out)
+        print("{count} iterations ({statuses}) in {wall_time:.3f}s, {throughput:.3f} iterations/s".format(
+            count=len(self.iterations),
+            statuses=", ".join("{status} {count}".format(status=status, count=count) for status, count in sorted(self.statuses().items())),
+            wall_time=self.wall_time(),
+            throughput=self.throughput()
+        ), file=out)
+        print("", file=out)
+        print("count", "mean", "\t".join("p{p}".format(p=p) for p in PERCENTILES), "max", "metric", "description", sep="\t", file=out)
+        for stat in self.stats():
+            print(
+                stat["count"],
+                format_stat(stat["mean"]),
+                "\t".join(format_stat(stat["percentiles"]["p{p}".format(p=p)]) for p in PERCENTILES),
+                format_stat(stat["max"]),
+                stat["metric"],
+                stat["description"],
+                sep="\t", file=out
+            )
+        print("", file=out)
+
+
+def run_load(test_id, iterations, concurrency, ramp_up=0.0, start_dir=".", out=sys.stdout, json_file=None):
+    sys_paths = [os.path.abspath(start_dir)]
+    check_test_id(test_id, sys_paths)
+    run_id = os.environ.get("TAUHKA_RUN_ID", None) or new_run_id()
+    concurrency = max(1, min(concurrency, iterations))
+    next_iteration = multiprocessing.Value("i", 0)
+    # the artifact size cap is for the whole run, every user gets its share
+    artifact_max_mb = float(os.environ.get("TAUHKA_ARTIFACT_MAX_MB", DEFAULT_ARTIFACT_MAX_MB)) / concurrency
+    results = multiprocessing.Queue()
+    # the users start evenly during the ramp-up
+    users = [
+        multiprocessing.Process(
+            target=virtual_user,
+            args=(test_id, ramp_up * user / concurrency, next_iteration, iterations, results, sys_paths, run_id, artifact_max_mb),
+            name="tauhka-load-{user}".format(user=user)
+        )
+        for user in range(concurrency)
+    ]
+    for user in users:
+        user.start()
+
+    load = TauhkaLoadResult(test_id, concurrency, ramp_up)
+    running = concurrency
+    while running:
+        try:
+            iteration = results.get(timeout=1)
+        except queue.Empty:
+            if not any(user.is_alive() for user in users):
+                break
+            continue
+        if iteration is None:
+            running -= 1
+        else:
+            load.add(iteration)
+    for user in users:
+        user.join()
+
+    failed = [iteration for iteration in load.iterations if iteration["errors"]]
+    for iteration in failed[:3]:
+        print("======================================================================", file=out)
+        print("FAIL: iteration {iteration} of {test}".format(iteration=iteration["iteration"], test=test_id), file=out)
+        print("----------------------------------------------------------------------", file=out)
+        print("\n".join(iteration["errors"]), file=out)
+    load.print_report(out)
+    if json_file:
+        with open(json_file, "w") as fh:
+            json.dump(load.as_dict(), fh, indent=2)
+    return load
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tauhka-load", description="Run one TauhkaTestCase test method concurrently in many browser sessions.")
+    parser.add_argument("test", help="test method, e.g. test_xhr.HelloWorldXHRTest.test_1_send_xhr")
+    parser.add_argument("-s", "--start-directory", default=".", help="directory the test is imported from")
+    parser.add_argument("-n", "--iterations", type=int, default=10, help="how many times the test is run in total")
+    parser.add_argument("-c", "--concurrency", type=int, default=int(os.environ.get("TAUHKA_WORKERS", 0)) or 2,
+                        help="target number of concurrent users, TAUHKA_ARTIFACT_MAX_MB is split evenly between them")
+    parser.add_argument("-r", "--ramp-up", type=float, default=0.0, help="seconds until all the users have started")
+    parser.add_argument("--json", default=None, help="save the aggregated results into this JSON file")
+    args = parser.parse_args(argv)
+    try:
+        load = run_load(args.test, args.iterations, args.concurrency, args.ramp_up, args.start_directory, json_file=args.json)
+    except ValueError as e:
+        parser.error(str(e))
+    return 0 if set(load.statuses().keys()) <= {"OK"} and len(load.iterations) == args.iterations else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
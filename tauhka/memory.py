@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the helpers for memory measurements.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import time
+import array
+import threading
+from selenium.common.exceptions import WebDriverException
+
+SPARKLINE_CHARS = "▁▂▃▄▅▆▇█"
+MEMORY_MODES = ("precise", "fast", "sampled")
+# garbage collection and the read in one round trip, window.gc needs --js-flags=--expose-gc
+PRECISE_MEMORY_SCRIPT = "if (!window.gc) { return null; } window.gc(); return window.performance.memory.usedJSHeapSize;"
+FAST_MEMORY_SCRIPT = "return window.performance.memory.usedJSHeapSize;"
+
+
+def precise_memory_usage(driver):
+    value = driver.execute_script(PRECISE_MEMORY_SCRIPT)
+    if value is None and hasattr(driver, "execute_cdp_cmd"):
+        # without the exposed gc the garbage is collected through CDP
+        driver.execute_cdp_cmd('HeapProfiler.collectGarbage', {})
+        value = driver.execute_cdp_cmd('Runtime.getHeapUsage', {})['usedSize']
+    if value is None:
+        return fast_memory_usage(driver), "fast"
+    return value, "precise"
+
+
+def fast_memory_usage(driver):
+    return driver.execute_script(FAST_MEMORY_SCRIPT)
+
+
+def sampled_memory_usage(driver, heap_sampler):
+    # the latest background sample costs no round trip at all
+    if heap_sampler is not None and heap_sampler.series.last() is not None:
+        return heap_sampler.series.last(), "sampled"
+    return fast_memory_usage(driver), "fast"
+
+
+def read_memory_usage(driver, mode, heap_sampler=None):
+    # the value and the mode which actually produced it, the others fall back to fast
+    if mode == "precise":
+        return precise_memory_usage(driver)
+    if mode == "fast":
+        return fast_memory_usage(driver), "fast"
+    if mode == "sampled":
+        return sampled_memory_usage(driver, heap_sampler)
+    raise ValueError("Unknown memory mode {mode}, expected one of {modes}".format(mode=mode, modes=", ".join(MEMORY_MODES)))
+
+
+def combined_mode(*modes):
+    # a diff of two reads made in different modes names both
+    unique = []
+    for mode in modes:
+        if mode not in unique:
+            unique.append(mode)
+    return "/".join(unique)
+
+
+def memory_baseline_metric(mode):
+    # the numbers of different modes are not comparable with each other
+    if mode == "precise":
+        return "memory_diff_kb"
+    return "memory_diff_kb.{mode}".format(mode=mode)
+
+
+class TauhkaHeapSeries(object):
+    def __init__(self):
+        self.times = array.array('d')
+        self.values = array.array('q')
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, timestamp, value):
+        self.times.append(timestamp)
+        self.values.append(int(value))
+
+    def last(self):
+        if not self.values:
+            return None
+        return self.values[-1]
+
+    def peak(self):
+        if not self.values:
+            return 0
+        return max(self.values)
+
+    def slope(self):
+        # least squares fit, bytes per time unit
+        count = len(self.values)
+        if count < 2:
+            return 0.0
+        mean_time = sum(self.times) / count
+        mean_value = sum(self.values) / count
+        variance = sum((t - mean_time) ** 2 for t in self.times)
+        if not variance:
+            return 0.0
+        covariance = sum((t - mean_time) * (v - mean_value) for t, v in zip(self.times, self.values))
+        return covariance / variance
+
+    def sparkline(self, width=40):
+        if not self.values:
+            return ""
+        count = len(self.values)
+        buckets = min(width, count)
+        points = []
+        for i in range(buckets):
+            start = i * count // buckets
+            end = max((i + 1) * count // buckets, start + 1)
+            points.append(max(self.values[start:end]))
+        low, high = min(points), max(points)
+        if high == low:
+            return SPARKLINE_CHARS[0] * buckets
+        scale = (len(SPARKLINE_CHARS) - 1) / (high - low)
+        return "".join(SPARKLINE_CHARS[int((point - low) * scale)] for point in points)
+
+
+class TauhkaHeapSampler(object):
+    def __init__(self, driver, interval, start_time=None):
+        self.driver = driver
+        self.interval = interval
+        self.start_time = start_time if start_time is not None else time.time()
+        self.series = TauhkaHeapSeries()
+        self.use_metrics = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def read_heap(self):
+        # neither call forces a garbage collection
+        if not self.use_metrics:
+            try:
+                return self.driver.execute_cdp_cmd('Runtime.getHeapUsage', {})['usedSize']
+            except WebDriverException:
+                self.use_metrics = True
+                self.driver.execute_cdp_cmd('Performance.enable', {})
+        metrics = self.driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+        for metric in metrics:
+            if metric['name'] == 'JSHeapUsedSize':
+                return metric['value']
+        return None
+
+    def sample(self):
+        try:
+            value = self.read_heap()
+        except WebDriverException:
+            return
+        if value is not None:
+            self.series.append(time.time() - self.start_time, value)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self.thread = threading.Thread(target=self.run, name="tauhka-heap-sampler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.sample()
+        return self.series
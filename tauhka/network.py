@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the helpers for network traffic monitoring.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import time
+from selenium.common.exceptions import WebDriverException
+
+
+class TauhkaBackoffWait(object):
+    def __init__(self, timeout, initial_interval=0.01, max_interval=0.25, factor=2.0, sleep=time.sleep):
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        # e.g. TauhkaEventStream.wait_for wakes up as soon as new events arrive
+        self.sleep = sleep
+
+    def until(self, condition, message=None):
+        # polls often right after the action and slows down when nothing happens
+        deadline = time.time() + self.timeout
+        interval = self.initial_interval
+        while not condition():
+            remaining = deadline - time.time()
+            assert remaining > 0, message() if message else "Timed out after {timeout} seconds.".format(timeout=self.timeout)
+            self.sleep(min(interval, remaining))
+            interval = min(interval * self.factor, self.max_interval)
+        return True
+
+
+class TauhkaLazyBody(object):
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.value = None
+
+    def resolve(self):
+        if self.value is None and self.fetch is not None:
+            try:
+                self.value = self.fetch()
+            except WebDriverException:
+                # e.g. the body is not there before loadingFinished, the next resolve tries again
+                return ""
+            self.fetch = None
+        return self.value if self.value is not None else ""
+
+    def is_resolved(self):
+        return self.value is not None
+
+    def detach(self):
+        # the browser session is going away, unresolved bodies stay empty
+        self.fetch = None
+
+    def __str__(self):
+        return str(self.resolve())
+
+    def __repr__(self):
+        if self.is_resolved():
+            return repr(str(self))
+        return "<TauhkaLazyBody>"
+
+    def __eq__(self, other):
+        if isinstance(other, TauhkaLazyBody):
+            other = str(other)
+        return str(self) == other
+
+
+def event_matches(expected, found):
+    # every given part of the expected event must match, missing parts must be missing
+    for key in expected.keys():
+        ev = expected[key]
+        ev_found = found.get(key)
+        ev_count = len(ev) if ev else 0
+        ev_found_count = len(ev_found) if ev_found else 0
+        if ev_count != ev_found_count:
+            return False
+        for i in range(ev_count):
+            if not ev[i] == ev_found[i]:
+                return False
+    return True
+
+
+def has_unresolved_body(found):
+    return any(isinstance(value, TauhkaLazyBody) and not value.is_resolved() for part in found.values() if part for value in part)
+
+
+def event_key(expected):
+    request = expected.get("request")
+    if not request or len(request) < 2:
+        return None
+    return (request[0], request[1])
+
+
+class TauhkaNetworkMatcher(object):
+    def __init__(self, expected_events, ordered=True):
+        self.expected_events = list(expected_events)
+        self.ordered = ordered
+        self.matches = [None] * len(self.expected_events)
+        self.requests = {}
+        self.sequence = {}
+        self.requests_by_key = {}
+        self.used_requests = set()
+        self.cursor = 0
+        self.last_sequence = -1
+        self.unresolved = []
+        self.expected_by_key = {}
+        for index, expected in enumerate(self.expected_events):
+            self.expected_by_key.setdefault(event_key(expected), []).append(index)
+
+    def feed(self, entries):
+        updated = []
+        for entry in entries:
+            request_id = entry[1]
+            parsed = self.requests.get(request_id)
+            if parsed is None:
+                parsed = self.requests[request_id] = {"request": None, "response": None}
+                self.sequence[request_id] = len(self.sequence)
+            if entry[2] == "=>":
+                parsed["request"] = (entry[3], entry[4], entry[5])
+                by_key = self.requests_by_key.setdefault((entry[3], entry[4]), [])
+                if request_id not in by_key:
+                    by_key.append(request_id)
+            else:
+                parsed["response"] = (entry[3], entry[5])
+            if request_id not in updated:
+                updated.append(request_id)
+        if self.ordered:
+            self.match_ordered()
+        else:
+            self.match_unordered(updated)
+        return self.is_complete()
+
+    def candidates(self, expected):
+        key = event_key(expected)
+        if key is None:
+            return self.sequence.keys()
+        return self.requests_by_key.get(key, [])
+
+    def match_ordered(self):
+        while self.cursor < len(self.expected_events):
+            expected = self.expected_events[self.cursor]
+            for request_id in self.candidates(expected):
+                if request_id in self.used_requests or self.sequence[request_id] <= self.last_sequence:
+                    continue
+                if event_matches(expected, self.requests[request_id]):
+                    self.set_match(self.cursor, request_id)
+                    self.last_sequence = self.sequence[request_id]
+                    break
+            else:
+                return
+            self.cursor += 1
+
+    def match_unordered(self, updated):
+        # the requests whose body could not be fetched yet are tried again
+        retried = [request_id for request_id in self.unresolved if request_id not in updated]
+        self.unresolved = []
+        for request_id in list(updated) + retried:
+            if request_id in self.used_requests:
+                continue
+            found = self.requests[request_id]
+            request = found["request"]
+            indexes = self.expected_by_key.get((request[0], request[1]) if request else None, []) + self.expected_by_key.get(None, [])
+            for index in indexes:
+                if self.matches[index] is None and event_matches(self.expected_events[index], found):
+                    self.set_match(index, request_id)
+                    break
+            else:
+                if indexes and has_unresolved_body(found):
+                    self.unresolved.append(request_id)
+
+    def set_match(self, index, request_id):
+        self.matches[index] = request_id
+        self.used_requests.add(request_id)
+
+    def is_complete(self):
+        return None not in self.matches
+
+    def request_count(self):
+        return len(self.requests)
+
+    def unmatched(self):
+        return [expected for expected, request_id in zip(self.expected_events, self.matches) if request_id is None]
+
+    def describe_unmatched(self):
+        return "; ".join(
+            "{request} => {response}".format(request=expected.get("request"), response=expected.get("response"))
+            for expected in self.unmatched()
+        )
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the element cache and the page objects.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+LOCATOR_STRATEGIES = {
+    "id": By.ID,
+    "css": By.CSS_SELECTOR,
+    "xpath": By.XPATH,
+    "name": By.NAME,
+    "class_name": By.CLASS_NAME,
+    "link_text": By.LINK_TEXT,
+}
+
+
+class TauhkaElementCache(object):
+    # WebElements of the current document, cleared on navigation and
+    # on StaleElementReferenceException
+    def __init__(self, finder):
+        self.finder = finder
+        self.elements = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, locator):
+        element = self.elements.get(locator)
+        if element is not None:
+            self.hits += 1
+            return element
+        self.misses += 1
+        element = self.finder(locator)
+        self.elements[locator] = element
+        return element
+
+    def forget(self, locator):
+        self.elements.pop(locator, None)
+
+    def invalidate(self):
+        self.elements.clear()
+
+    def element(self, locator):
+        return TauhkaCachedElement(self, locator)
+
+
+class TauhkaCachedElement(WebElement):
+    # a WebElement whose id is resolved through the cache, so it can be passed to
+    # execute_script and ActionChains, a stale element is resolved again once
+    def __init__(self, cache, locator):
+        self._cache = cache
+        self._locator = locator
+
+    @property
+    def element(self):
+        return self._cache.resolve(self._locator)
+
+    @property
+    def _parent(self):
+        return self.element._parent
+
+    @property
+    def _id(self):
+        return self.element._id
+
+    @property
+    def _w3c(self):
+        return getattr(self.element, "_w3c", True)
+
+    def _retry(self, action):
+        try:
+            return action(self.element)
+        except StaleElementReferenceException:
+            # the document has changed, so every cached element is stale
+            self._cache.invalidate()
+            return action(self.element)
+
+    def __eq__(self, other):
+        if isinstance(other, TauhkaCachedElement):
+            other = other.element
+        return self.element == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._locator)
+
+    def __repr__(self):
+        return "<TauhkaCachedElement {by}={value}>".format(by=self._locator[0], value=self._locator[1])
+
+
+def retrying_method(name):
+    def method(self, *args, **kwargs):
+        return self._retry(lambda element: getattr(element, name)(*args, **kwargs))
+    method.__name__ = name
+    return method
+
+
+def retrying_property(name):
+    return property(lambda self: self._retry(lambda element: getattr(element, name)))
+
+
+# the public API of the WebElement of the installed selenium goes through the retry
+for name, value in list(vars(WebElement).items()):
+    if name.startswith("_") or name in ("id", "parent"):
+        continue
+    if isinstance(value, property):
+        setattr(TauhkaCachedElement, name, retrying_property(name))
+    elif callable(value):
+        setattr(TauhkaCachedElement, name, retrying_method(name))
+
+
+class TauhkaField(object):
+    def __init__(self, elemId=None, **locator):
+        if elemId is not None:
+            locator["id"] = elemId
+        if len(locator) != 1:
+            raise ValueError("TauhkaField needs exactly one locator: {locator}".format(locator=locator))
+        strategy, value = list(locator.items())[0]
+        if strategy not in LOCATOR_STRATEGIES:
+            raise ValueError("Unknown locator strategy {strategy}".format(strategy=strategy))
+        self.locator = (LOCATOR_STRATEGIES[strategy], value)
+
+    def __get__(self, page, owner):
+        if page is None:
+            return self
+        return page.element(self.locator)
+
+
+class TauhkaPage(object):
+    def __init__(self, testcase):
+        self.testcase = testcase
+        self.cache = testcase.element_cache_for_page()
+
+    def element(self, locator):
+        return self.cache.element(locator)
+
+    def invalidate(self):
+        self.cache.invalidate()
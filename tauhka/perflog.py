@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the streaming parser for the performance log.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import re
+import json
+from collections import namedtuple
+
+NetworkRequest = namedtuple("NetworkRequest", ["timestamp", "request_id", "direction", "method", "url", "post_data"])
+NetworkResponse = namedtuple("NetworkResponse", ["timestamp", "request_id", "direction", "status", "status_text", "body"])
+
+
+class TauhkaPerformanceLogParser(object):
+    def __init__(self):
+        self.handlers = {}
+        self.method_pattern = None
+
+    def subscribe(self, method, handler):
+        self.handlers.setdefault(method, []).append(handler)
+        self.method_pattern = None
+
+    def unsubscribe(self, method, handler):
+        handlers = self.handlers.get(method, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self.handlers.pop(method, None)
+        self.method_pattern = None
+
+    def compiled_method_pattern(self):
+        if self.method_pattern is None:
+            methods = "|".join(re.escape(method) for method in sorted(self.handlers.keys()))
+            self.method_pattern = re.compile(r'"method"\s*:\s*"(?:' + methods + r')"')
+        return self.method_pattern
+
+    def feed(self, rows):
+        if not self.handlers:
+            return []
+        return self.dispatch(self.decode(rows))
+
+    def decode(self, rows):
+        method_pattern = self.compiled_method_pattern()
+        for row in rows:
+            message = row.get('message')
+            # most of the rows are trace events, reject them before decoding the json
+            if not message or not method_pattern.search(message):
+                continue
+            msg = json.loads(message).get('message', {})
+            yield msg.get('method'), msg.get('params', {})
+
+    def dispatch(self, events):
+        # (method, params) pairs, decoded from the log rows or received from the TauhkaEventStream
+        records = []
+        for method, params in events:
+            for handler in self.handlers.get(method, ()):
+                record = handler(params)
+                if record is not None:
+                    records.append(record)
+        return records
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the helpers for performance measurements.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+# metrics of CDP Performance.getMetrics which are reported as deltas over the block
+CDP_PERFORMANCE_METRICS = (
+    "ScriptDuration",
+    "TaskDuration",
+    "LayoutCount",
+    "LayoutDuration",
+    "RecalcStyleCount",
+    "RecalcStyleDuration",
+)
+
+OBSERVERS_SCRIPT = """
+function tauhkaInstallObservers(buffered) {
+    var state = window.__tauhka_perf = {
+        longTasks: 0, longTaskTime: 0, lcp: 0, cls: 0, inp: 0, observers: [],
+        resourceStart: performance.getEntriesByType('resource').length
+    };
+    function observe(options, handler) {
+        try {
+            var observer = new PerformanceObserver(function(list) { list.getEntries().forEach(handler); });
+            options.buffered = buffered;
+            observer.observe(options);
+            state.observers.push([observer, handler]);
+        } catch (e) {}
+    }
+    observe({type: 'longtask'}, function(entry) { state.longTasks += 1; state.longTaskTime += entry.duration; });
+    observe({type: 'largest-contentful-paint'}, function(entry) { state.lcp = entry.renderTime || entry.loadTime || entry.startTime; });
+    observe({type: 'layout-shift'}, function(entry) { if (!entry.hadRecentInput) { state.cls += entry.value; } });
+    observe({type: 'event', durationThreshold: 16}, function(entry) { state.inp = Math.max(state.inp, entry.duration); });
+}
+"""
+
+INSTALL_OBSERVERS_SCRIPT = OBSERVERS_SCRIPT + "tauhkaInstallObservers(false);"
+
+COLLECT_OBSERVERS_SCRIPT = OBSERVERS_SCRIPT + """
+var done = arguments[arguments.length - 1];
+var navigated = !window.__tauhka_perf;
+function collect() {
+    var state = window.__tauhka_perf;
+    state.observers.forEach(function(pair) { pair[0].takeRecords().forEach(pair[1]); pair[0].disconnect(); });
+    var resources = performance.getEntriesByType('resource').slice(navigated ? 0 : state.resourceStart);
+    var metrics = {
+        lcp: state.lcp,
+        cls: state.cls,
+        inp: state.inp,
+        long_tasks: state.longTasks,
+        long_task_time: state.longTaskTime,
+        resources: resources.length,
+        resource_max_duration: resources.reduce(function(max, entry) { return Math.max(max, entry.duration); }, 0)
+    };
+    var navigation = performance.getEntriesByType('navigation')[0];
+    if (navigated && navigation) {
+        metrics.navigation_dom_content_loaded = navigation.domContentLoadedEventEnd;
+        metrics.navigation_load = navigation.loadEventEnd;
+    }
+    delete window.__tauhka_perf;
+    done(metrics);
+}
+if (navigated) {
+    // the page was replaced during the block, read the buffered entries of the new page
+    tauhkaInstallObservers(true);
+    setTimeout(collect, 50);
+} else {
+    collect();
+}
+"""
+
+
+def cdp_performance_metrics(driver):
+    metrics = driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+    return dict((metric['name'], metric['value']) for metric in metrics if metric['name'] in CDP_PERFORMANCE_METRICS)
+
+
+def check_budgets(metrics, budgets):
+    issues = {}
+    for name, budget in budgets.items():
+        if name in metrics and metrics[name] > budget:
+            issues[name] = (metrics[name], budget)
+    return issues
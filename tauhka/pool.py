@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the TauhkaSessionPool.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import atexit
+from selenium.common.exceptions import WebDriverException
+
+
+SESSION_POOL_SCOPES = ("class", "module", "process")
+
+
+class TauhkaSession(object):
+    def __init__(self, driver, max_uses):
+        self.driver = driver
+        self.max_uses = max_uses
+        self.uses = 0
+
+    def is_worn_out(self):
+        return self.max_uses > 0 and self.uses >= self.max_uses
+
+
+class TauhkaSessionPool(object):
+    def __init__(self):
+        self.idle_sessions = {}
+        self.active_sessions = {}
+        atexit.register(self.close_all)
+
+    def scope_key(self, testcase_class, scope):
+        if scope == "class":
+            return ("class", testcase_class.__module__, testcase_class.__qualname__)
+        if scope == "module":
+            return ("module", testcase_class.__module__)
+        if scope == "process":
+            return ("process",)
+        raise ValueError("Unknown session pool scope: {scope}".format(scope=scope))
+
+    def acquire(self, key, factory, max_uses=0):
+        # unittest runs modules one after another, so idle sessions of
+        # the previous module will not be needed anymore
+        if key[0] == "module":
+            for other_key in list(self.idle_sessions.keys()):
+                if other_key[0] == "module" and other_key != key:
+                    self.close(other_key)
+
+        idle = self.idle_sessions.get(key)
+        if idle:
+            session = idle.pop()
+        else:
+            session = TauhkaSession(factory(), max_uses)
+        session.uses += 1
+        self.active_sessions[id(session.driver)] = session
+        return session.driver
+
+    def release(self, key, driver, reusable=True):
+        session = self.active_sessions.pop(id(driver), None)
+        if session is None or not reusable or session.is_worn_out():
+            self.quit(driver)
+            return
+        self.idle_sessions.setdefault(key, []).append(session)
+
+    def close(self, key):
+        for session in self.idle_sessions.pop(key, []):
+            self.quit(session.driver)
+
+    def close_all(self):
+        for key in list(self.idle_sessions.keys()):
+            self.close(key)
+
+    def quit(self, driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+session_pool = TauhkaSessionPool()
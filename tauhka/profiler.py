@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the helpers for CPU profiling.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import json
+
+IGNORED_FUNCTIONS = ("(idle)", "(root)")
+
+
+def start_cpu_profile(driver, sampling_interval=None):
+    driver.execute_cdp_cmd('Profiler.enable', {})
+    if sampling_interval:
+        driver.execute_cdp_cmd('Profiler.setSamplingInterval', {'interval': int(sampling_interval)})
+    driver.execute_cdp_cmd('Profiler.start', {})
+
+
+def stop_cpu_profile(driver):
+    profile = driver.execute_cdp_cmd('Profiler.stop', {})['profile']
+    driver.execute_cdp_cmd('Profiler.disable', {})
+    return profile
+
+
+def save_cpu_profile(profile, filename):
+    # the format DevTools opens from the Performance panel
+    with open(filename, "w", encoding="utf-8") as fh:
+        json.dump(profile, fh)
+    return filename
+
+
+def self_times(profile):
+    # the time delta of the next sample is spent in the current sample
+    nodes = dict((node['id'], node) for node in profile.get('nodes', []))
+    samples = profile.get('samples', [])
+    deltas = profile.get('timeDeltas', [])
+    per_node = {}
+    for index, node_id in enumerate(samples):
+        if index + 1 < len(deltas):
+            per_node[node_id] = per_node.get(node_id, 0) + deltas[index + 1]
+    per_function = {}
+    for node_id, duration in per_node.items():
+        frame = nodes[node_id]['callFrame']
+        key = (frame.get('functionName') or "(anonymous)", frame.get('url', ""), frame.get('lineNumber', -1) + 1)
+        per_function[key] = per_function.get(key, 0) + duration
+    return per_function
+
+
+def top_self_times(profile, top=10):
+    per_function = self_times(profile)
+    total = sum(per_function.values())
+    rows = [
+        (name, url, line, duration / 1000.0, 100.0 * duration / total if total else 0.0)
+        for (name, url, line), duration in per_function.items()
+        if name not in IGNORED_FUNCTIONS
+    ]
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return total / 1000.0, rows[:top]
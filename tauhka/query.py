@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the batched DOM queries.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+from selenium.webdriver.common.by import By
+
+DEFAULT_PROPERTIES = ("visible", "value", "innerHTML", "selected")
+# and "attr:<name>" for any attribute
+QUERY_PROPERTIES = ("visible", "value", "innerHTML", "text", "selected", "element")
+LOCATOR_STRATEGIES = {
+    By.ID: "id",
+    By.CSS_SELECTOR: "css",
+    By.XPATH: "xpath",
+    By.NAME: "name",
+    "id": "id",
+    "css": "css",
+    "xpath": "xpath",
+    "name": "name",
+}
+
+QUERY_SCRIPT = """
+var specs = arguments[0];
+var result = {};
+function find(spec) {
+    if (spec.by == 'id') { return document.getElementById(spec.value); }
+    if (spec.by == 'css') { return document.querySelector(spec.value); }
+    if (spec.by == 'name') { return document.getElementsByName(spec.value)[0] || null; }
+    return document.evaluate(spec.value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function isVisible(elem) {
+    var style = window.getComputedStyle(elem);
+    return !!(elem.offsetWidth || elem.offsetHeight || elem.getClientRects().length) && style.visibility != 'hidden' && style.display != 'none';
+}
+Object.keys(specs).forEach(function(name) {
+    var spec = specs[name];
+    var elem = find(spec);
+    var props = {exists: !!elem};
+    if (elem) {
+        spec.props.forEach(function(prop) {
+            if (prop == 'visible') { props.visible = isVisible(elem); }
+            else if (prop == 'value') { props.value = elem.value === undefined ? null : elem.value; }
+            else if (prop == 'innerHTML') { props.innerHTML = elem.innerHTML; }
+            else if (prop == 'text') { props.text = elem.innerText; }
+            else if (prop == 'selected') {
+                props.selected = elem.selectedOptions ? Array.prototype.map.call(elem.selectedOptions, function(option) { return option.text; }) : null;
+            }
+            else if (prop == 'element') { props.element = elem; }
+            else if (prop.indexOf('attr:') == 0) { props[prop] = elem.getAttribute(prop.slice(5)); }
+        });
+    }
+    result[name] = props;
+});
+return result;
+"""
+
+
+def compile_spec(locator, props=None):
+    # a plain string is an element id, like in TauhkaTestCase.find_element
+    if isinstance(locator, str):
+        locator = {"id": locator}
+    if isinstance(locator, (tuple, list)):
+        locator = {locator[0]: locator[1]}
+    locator = dict(locator)
+    props = locator.pop("props", props) or DEFAULT_PROPERTIES
+    if len(locator) != 1:
+        raise ValueError("Locator needs exactly one strategy: {locator}".format(locator=locator))
+    strategy, value = list(locator.items())[0]
+    if strategy not in LOCATOR_STRATEGIES:
+        raise ValueError("Unknown locator strategy {strategy}".format(strategy=strategy))
+    for prop in props:
+        if prop not in QUERY_PROPERTIES and not prop.startswith("attr:"):
+            raise ValueError("Unknown query property {prop}".format(prop=prop))
+    return {"by": LOCATOR_STRATEGIES[strategy], "value": value, "props": list(props)}
+
+
+class TauhkaQuery(object):
+    def __init__(self, spec, props=None):
+        self.specs = dict((name, compile_spec(locator, props)) for name, locator in spec.items())
+
+    def run(self, driver):
+        return TauhkaSnapshot(driver.execute_script(QUERY_SCRIPT, self.specs))
+
+
+class TauhkaElementState(object):
+    def __init__(self, name, props):
+        self.name = name
+        self.props = props
+
+    def __getattr__(self, prop):
+        props = self.__dict__.get("props", {})
+        if prop in props:
+            return props[prop]
+        raise AttributeError("{name} has no {prop} in the snapshot".format(name=self.__dict__.get("name"), prop=prop))
+
+    def attribute(self, name):
+        return self.props.get("attr:" + name)
+
+    def is_option_selected(self, option):
+        return any(option in text for text in self.props.get("selected") or [])
+
+    def __repr__(self):
+        return "<TauhkaElementState {name} {props}>".format(name=self.name, props=self.props)
+
+
+class TauhkaSnapshot(object):
+    def __init__(self, result):
+        self.elements = dict((name, TauhkaElementState(name, props)) for name, props in (result or {}).items())
+
+    def __getitem__(self, name):
+        return self.elements[name]
+
+    def __getattr__(self, name):
+        elements = self.__dict__.get("elements", {})
+        if name in elements:
+            return elements[name]
+        raise AttributeError(name)
+
+    def __contains__(self, name):
+        return name in self.elements
+
+    def __iter__(self):
+        return iter(self.elements)
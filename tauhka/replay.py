@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the request fixture recording and replay.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import os
+import json
+import base64
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_MODES = ("record", "replay")
+
+
+def fixture_key(method, url, post_data, match_body=True):
+    return (method, url, (post_data or "") if match_body else "")
+
+
+def load_fixtures(filename):
+    with open(filename, "r") as fh:
+        return json.load(fh).get("entries", [])
+
+
+def save_fixtures(filename, entries):
+    with open(filename, "w") as fh:
+        json.dump({"version": 1, "entries": entries}, fh, indent=2)
+
+
+class TauhkaFixtureRecorder(object):
+    def __init__(self, devtools, filename, url_patterns=("*",)):
+        self.devtools = devtools
+        self.filename = filename
+        self.url_patterns = url_patterns
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.devtools.subscribe("Fetch.requestPaused", self.on_request_paused)
+        self.devtools.call("Fetch.enable", {"patterns": [{"urlPattern": pattern, "requestStage": "Response"} for pattern in self.url_patterns]})
+        return self
+
+    def on_request_paused(self, params):
+        request_id = params["requestId"]
+        try:
+            if "responseStatusCode" in params and "responseErrorReason" not in params:
+                body = self.devtools.call("Fetch.getResponseBody", {"requestId": request_id})
+                request = params["request"]
+                with self.lock:
+                    self.entries.append({
+                        "method": request["method"],
+                        "url": request["url"],
+                        "postData": request.get("postData", ""),
+                        "status": params["responseStatusCode"],
+                        "statusText": params.get("responseStatusText", ""),
+                        "headers": params.get("responseHeaders", []),
+                        "body": body["body"] if body.get("base64Encoded") else base64.b64encode(body["body"].encode("utf-8")).decode("ascii"),
+                    })
+        finally:
+            self.devtools.call("Fetch.continueRequest", {"requestId": request_id})
+
+    def stop(self):
+        self.devtools.call("Fetch.disable")
+        self.devtools.unsubscribe("Fetch.requestPaused", self.on_request_paused)
+        with self.lock:
+            save_fixtures(self.filename, self.entries)
+
+
+class TauhkaFixtureReplayer(object):
+    def __init__(self, devtools, filename, latency=0, strict=False, match_body=True, url_patterns=("*",)):
+        self.devtools = devtools
+        self.latency = latency
+        self.strict = strict
+        self.match_body = match_body
+        self.url_patterns = url_patterns
+        self.fixtures = {}
+        self.served = 0
+        self.unmatched = []
+        # only the recorder creates the file, replaying a missing one would pass or fail every request silently
+        if not os.path.exists(filename):
+            raise FileNotFoundError("Fixture file not found: {filename}".format(filename=os.path.abspath(filename)))
+        for entry in load_fixtures(filename):
+            key = fixture_key(entry["method"], entry["url"], entry.get("postData"), match_body)
+            self.fixtures.setdefault(key, []).append(entry)
+
+    def start(self):
+        self.devtools.subscribe("Fetch.requestPaused", self.on_request_paused)
+        self.devtools.call("Fetch.enable", {"patterns": [{"urlPattern": pattern, "requestStage": "Request"} for pattern in self.url_patterns]})
+        return self
+
+    def find(self, request):
+        # repeated requests get the recorded responses in order, the last one is reused
+        entries = self.fixtures.get(fixture_key(request["method"], request["url"], request.get("postData"), self.match_body))
+        if not entries:
+            return None
+        if len(entries) > 1:
+            return entries.pop(0)
+        return entries[0]
+
+    def on_request_paused(self, params):
+        request_id = params["requestId"]
+        entry = self.find(params["request"])
+        if entry is None:
+            self.unmatched.append((params["request"]["method"], params["request"]["url"]))
+            if self.strict:
+                self.devtools.call("Fetch.failRequest", {"requestId": request_id, "errorReason": "ConnectionRefused"})
+            else:
+                self.devtools.call("Fetch.continueRequest", {"requestId": request_id})
+            return
+        self.served += 1
+        if self.latency:
+            # other requests are not held back while this one waits
+            threading.Timer(self.latency / 1000.0, self.fulfill, (request_id, entry)).start()
+        else:
+            self.fulfill(request_id, entry)
+
+    def fulfill(self, request_id, entry):
+        try:
+            self.devtools.call("Fetch.fulfillRequest", {
+                "requestId": request_id,
+                "responseCode": entry["status"],
+                "responsePhrase": entry.get("statusText") or "OK",
+                "responseHeaders": entry.get("headers", []),
+                "body": entry.get("body", ""),
+            })
+        except Exception:
+            logger.exception("Replaying %s %s failed", entry["method"], entry["url"])
+
+    def stop(self):
+        self.devtools.call("Fetch.disable")
+        self.devtools.unsubscribe("Fetch.requestPaused", self.on_request_paused)
+        # the requests which were not in the fixture file, failed when strict and passed through otherwise
+        return list(self.unmatched)
+
+    def describe_unmatched(self):
+        return "; ".join("{method} {url}".format(method=method, url=url) for method, url in self.unmatched)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the structured test report.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import os
+import re
+import sys
+import gzip
+import json
+import zlib
+import atexit
+import collections
+
+from tauhka.network import TauhkaLazyBody
+
+REPORT_SECTIONS = (
+    ("console", "Console messages:"),
+    ("network", "Network requests:"),
+    ("performance", "Performance:"),
+)
+
+
+def artifact_filename(directory, test_id, description, extension):
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", "{test}-{description}".format(test=test_id, description=description)).strip("_")
+    return os.path.join(directory, "{slug}.{extension}".format(slug=slug, extension=extension))
+
+
+def record_value(value):
+    # unresolved bodies are not fetched just for the report
+    if isinstance(value, TauhkaLazyBody):
+        return str(value) if value.is_resolved() else None
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return str(value)
+
+
+def record_from_entry(kind, test_id, entry):
+    return {
+        "type": kind,
+        "test": test_id,
+        "time": entry[0],
+        "fields": [record_value(value) for value in entry[1:]],
+    }
+
+
+class TauhkaJsonlWriter(object):
+    def __init__(self, filename, compress=False):
+        self.filename = filename
+        self.compress = compress
+        self.fh = None
+
+    def open(self):
+        if self.compress:
+            return gzip.open(self.filename, "at", encoding="utf-8")
+        return open(self.filename, "a", encoding="utf-8")
+
+    def write(self, records):
+        if self.fh is None:
+            self.fh = self.open()
+        for record in records:
+            self.fh.write(json.dumps(record, separators=(",", ":")))
+            self.fh.write("\n")
+        # a crashed run keeps everything written so far
+        self.fh.flush()
+
+    def close(self):
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+
+
+report_writer = None
+ENV_FLAG_VALUES = ("1", "true", "yes")
+
+
+def env_flag(name, default=False):
+    # the same values turn on every TAUHKA_* flag, e.g. "0" and "false" turn it off
+    value = os.environ.get(name, None)
+    if value is None:
+        return default
+    return value.strip().lower() in ENV_FLAG_VALUES
+
+
+def get_report_writer():
+    global report_writer
+    filename = os.environ.get("TAUHKA_REPORT_FILE", None)
+    if not filename:
+        return None
+    if report_writer is None:
+        compress = env_flag("TAUHKA_REPORT_GZIP")
+        filename = filename.format(pid=os.getpid())
+        if compress and not filename.endswith(".gz"):
+            filename += ".gz"
+        report_writer = TauhkaJsonlWriter(filename, compress)
+        atexit.register(report_writer.close)
+    return report_writer
+
+
+def close_report_writer():
+    # worker processes of a pool exit without running atexit
+    global report_writer
+    if report_writer is not None:
+        report_writer.close()
+        report_writer = None
+
+
+class TauhkaReport(object):
+    def __init__(self, test_id, writer=None):
+        self.test_id = test_id
+        self.writer = writer
+        self.summaries = []
+
+    def emit(self, records):
+        if self.writer:
+            self.writer.write(records)
+
+    def emit_summary(self, record):
+        record["test"] = self.test_id
+        self.summaries.append(record)
+        self.emit([record])
+
+
+class TauhkaLogBuffer(collections.deque):
+    def __init__(self, kind, report, maxlen=None):
+        super().__init__(maxlen=maxlen or None)
+        self.kind = kind
+        self.report = report
+        self.dropped = 0
+
+    def append(self, entry):
+        self.extend((entry,))
+
+    def extend(self, entries):
+        entries = list(entries)
+        if not entries:
+            return
+        if self.maxlen is not None:
+            self.dropped += max(0, len(self) + len(entries) - self.maxlen)
+        if self.report:
+            self.report.emit([record_from_entry(self.kind, self.report.test_id, entry) for entry in entries])
+        super().extend(entries)
+
+    def __iadd__(self, entries):
+        self.extend(entries)
+        return self
+
+    def records(self):
+        test_id = self.report.test_id if self.report else None
+        return [record_from_entry(self.kind, test_id, entry) for entry in self]
+
+
+class TauhkaTextRenderer(object):
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+
+    def print(self, *args, **kwargs):
+        print(*args, file=self.out, **kwargs)
+
+    def render_entries(self, records):
+        for record in records:
+            self.print("{time:10.3f}".format(time=record["time"]), "\t".join("" if value is None else str(value) for value in record["fields"]))
+
+    def render(self, test_id, status, records):
+        records = list(records)
+        by_type = collections.OrderedDict()
+        for record in records:
+            by_type.setdefault(record["type"], []).append(record)
+
+        self.print("\n")
+        self.print("======================================================================")
+        self.print("Test status ({testname}): {status}. ".format(testname=test_id, status=status))
+        self.print("----------------------------------------------------------------------")
+        for record in by_type.get("throttling", []):
+            self.print("Throttling profile: {profile} {settings}".format(profile=record["profile"], settings=json.dumps(record["settings"], sort_keys=True)))
+            self.print("")
+        for record in by_type.get("events.dropped", []):
+            self.print("Event stream buffers overflowed, dropped events: {dropped}".format(
+                dropped=", ".join("{domain} {count}".format(domain=domain, count=count) for domain, count in sorted(record["dropped"].items()) if count)
+            ))
+        for record in by_type.get("logs.dropped", []):
+            self.print("Log buffers overflowed, dropped rows: {dropped}".format(
+                dropped=", ".join("{kind} {count}".format(kind=kind, count=count) for kind, count in sorted(record["dropped"].items()))
+            ))
+        for kind, title in REPORT_SECTIONS:
+            if by_type.get(kind):
+                self.print(title)
+                self.render_entries(by_type[kind])
+                self.print("")
+        for record in by_type.get("heap.samples", []):
+            self.print("Heap samples:")
+            self.print("{count} samples every {interval:.3f}s, peak {peak} KB, slope {slope:.1f} KB/s".format(
+                count=record["count"],
+                interval=record["interval"],
+                peak=int(record["peak"]/1024),
+                slope=record["slope"]/1024
+            ))
+            self.print(record["sparkline"])
+            self.print("")
+        for record in by_type.get("soak", []):
+            self.print("Soak ({description}): {iterations} iterations, slope {slope:.2f} KB/iteration, limit {max_slope} KB {result}".format(
+                description=record["description"],
+                iterations=record["iterations"],
+                slope=record["slope"]/1024,
+                max_slope=record["max_slope"],
+                result=record["result"]
+            ))
+            self.print(record["sparkline"])
+            self.print("")
+        for record in by_type.get("heap.growth", []):
+            self.print("Heap growth ({description}):".format(description=record["description"]))
+            self.print("Snapshots: {start} {end}".format(start=record["start"], end=record["end"]))
+            for name, count, size, retainers in record["growth"]:
+                self.print("{size:10}".format(size="+{kb} KB".format(kb=int(size/1024))), "+{count}".format(count=count), name,
+                           ", ".join("{owner} x{count}".format(owner=owner, count=owner_count) for owner, owner_count in retainers), sep="\t")
+            self.print("")
+        for record in by_type.get("cpu.profile", []):
+            self.print("CPU profile ({description}): {total:.1f} ms sampled{file}".format(
+                description=record["description"],
+                total=record["total"],
+                file=", saved to {file}".format(file=record["file"]) if record["file"] else ""
+            ))
+            for name, url, line, self_time, percent in record["functions"]:
+                self.print("{self_time:10.1f} ms".format(self_time=self_time), "{percent:5.1f}%".format(percent=percent),
+                           name, "{url}:{line}".format(url=url, line=line) if url else "", sep="\t")
+            self.print("")
+        for record in by_type.get("console.monitor", []):
+            self.print("Console ({description}): {counts}{issues}".format(
+                description=record["description"],
+                counts=", ".join("{level} {count}".format(level=level, count=count) for level, count in record["counts"].items()),
+                issues=" CONSOLE_ISSUE" if record["issues"] else ""
+            ))
+            for exception in record["exceptions"]:
+                self.print(exception["message"].splitlines()[0] if exception["message"] else "")
+                for frame in exception["stack"]:
+                    self.print("    at", frame)
+            self.print("")
+        for record in by_type.get("fixtures.unmatched", []):
+            self.print("Requests not in the fixtures, {action}:".format(action="failed" if record["strict"] else "passed through"))
+            for method, url in record["requests"]:
+                self.print(method, url, sep="\t")
+            self.print("")
+        for record in by_type.get("artifacts", []):
+            self.print("Failure artifacts:")
+            for kind, filename in record["files"].items():
+                self.print(kind, filename, sep="\t")
+            self.print("")
+        if by_type.get("memory"):
+            self.print("Tests and memory usage")
+            self.render_entries(by_type["memory"])
+
+
+def read_report_chunks(filename, chunk_size=65536):
+    with open(filename, "rb") as fh:
+        if not filename.endswith(".gz"):
+            yield from iter(lambda: fh.read(chunk_size), b"")
+            return
+        # a crashed run leaves the last gzip member without its trailer, gzip.open would raise EOFError
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        for data in iter(lambda: fh.read(chunk_size), b""):
+            while data:
+                try:
+                    yield decompressor.decompress(data)
+                except zlib.error:
+                    return
+                data = b""
+                if decompressor.eof:
+                    # every reopened writer appends a new member
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+
+def read_report(filename):
+    pending = b""
+    for chunk in read_report_chunks(filename):
+        lines = (pending + chunk).split(b"\n")
+        # the last line is complete only after its newline, a partly written one is left out
+        pending = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield json.loads(line.decode("utf-8"))
+
+
+def main(argv=None):
+    # renders a JSONL report file with the same text renderer as the test run
+    argv = sys.argv[1:] if argv is None else argv
+    renderer = TauhkaTextRenderer()
+    for filename in argv:
+        tests = collections.OrderedDict()
+        for record in read_report(filename):
+            tests.setdefault(record.get("test"), []).append(record)
+        for test_id, records in tests.items():
+            statuses = [record["status"] for record in records if record["type"] == "status"]
+            renderer.render(test_id, statuses[-1] if statuses else "UNKNOWN", [record for record in records if record["type"] != "status"])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the tauhka parallel test runner.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import unittest
+import contextlib
+import multiprocessing
+
+from tauhka.pool import session_pool
+from tauhka.report import close_report_writer
+from tauhka.artifacts import close_artifact_writers, DEFAULT_ARTIFACT_MAX_MB
+from tauhka.baseline import new_run_id
+from tauhka.testcase import TauhkaTestCase
+
+DEFAULT_DURATIONS_FILE = ".tauhka-durations.json"
+LOG_KINDS = (
+    ("console_logs", "Console messages:"),
+    ("network_logs", "Network requests:"),
+    ("perf_logs", "Performance:"),
+    ("memory_logs", "Tests and memory usage:"),
+)
+
+
+class TauhkaRunnerResult(unittest.TestResult):
+    def __init__(self):
+        super().__init__()
+        self.tests = []
+        self.test_started = None
+        self.test_status = None
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.test_started = time.time()
+        self.test_status = "OK"
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        entry = {
+            "id": test.id(),
+            "started": self.test_started,
+            "duration": time.time() - self.test_started,
+            "status": self.test_status,
+        }
+        for kind, title in LOG_KINDS:
+            # entries may hold lazy values, only plain tuples of strings cross the process boundary
+            entry[kind] = [(row[0],) + tuple(str(value) for value in row[1:]) for row in getattr(test, kind, None) or []]
+        self.tests.append(entry)
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self.test_status = "ERROR"
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self.test_status = "FAILURE"
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.test_status = "SKIPPED"
+
+
+def iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+def discover_shards(start_dir, pattern, top_level_dir=None):
+    # a shard is a whole test class, so setUpClass and pooled sessions keep working
+    shards = {}
+    broken = []
+    plain = []
+    loader = unittest.TestLoader()
+    suite = loader.discover(start_dir, pattern=pattern, top_level_dir=top_level_dir)
+    for test in iter_tests(suite):
+        if isinstance(test, unittest.loader._FailedTest):
+            # modules that fail to import are errors of the run, not skipped
+            broken.append(test)
+            continue
+        if not isinstance(test, TauhkaTestCase):
+            plain.append(test)
+            continue
+        shard = "{module}.{name}".format(module=type(test).__module__, name=type(test).__qualname__)
+        shards.setdefault(shard, []).append(test.id())
+    return shards, broken, plain, loader.errors
+
+
+def run_broken(broken, errors):
+    # the failed tests only raise the stored import error, no browser is needed
+    result = TauhkaRunnerResult()
+    for test in broken:
+        test.run(result)
+    failures = [(str(test), trace) for test, trace in result.errors + result.failures]
+    if not broken:
+        failures += [("discovery", error) for error in errors]
+    return result.tests, failures
+
+
+def run_plain(plain):
+    # plain unittest cases have no browser of their own, they run in this process
+    output = io.StringIO()
+    result = TauhkaRunnerResult()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        unittest.TestSuite(plain).run(result)
+    failures = [(str(test), trace) for test, trace in result.errors + result.failures]
+    return result.tests, failures, output.getvalue()
+
+
+def load_durations(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, "r") as fh:
+        return json.load(fh)
+
+
+def save_durations(filename, durations):
+    with open(filename, "w") as fh:
+        json.dump(durations, fh, indent=2, sort_keys=True)
+
+
+def schedule_longest_first(shards, durations):
+    # shards without history are started early, as they may be the long ones
+    known = [durations[shard] for shard in shards if shard in durations]
+    unknown_duration = max(known) if known else 0.0
+    return sorted(shards, key=lambda shard: durations.get(shard, unknown_duration), reverse=True)
+
+
+def init_worker(sys_paths, run_id=None):
+    for path in reversed(sys_paths):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    # all the workers record their baselines into the same run
+    if run_id:
+        os.environ["TAUHKA_RUN_ID"] = run_id
+    # every worker runs its own headless browser
+    os.environ.pop("TEST_DEBUG", None)
+
+
+def run_shard(args):
+    shard, test_ids, artifact_max_mb = args
+    # the artifact size cap is for the whole run, every worker gets its share
+    os.environ["TAUHKA_ARTIFACT_MAX_MB"] = str(artifact_max_mb)
+    output = io.StringIO()
+    result = TauhkaRunnerResult()
+    started = time.time()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+            suite.run(result)
+    finally:
+        # the pool terminates its workers without atexit, so nothing may be left open
+        session_pool.close_all()
+        close_report_writer()
+        close_artifact_writers()
+    failures = [(str(test), trace) for test, trace in result.errors + result.failures]
+    return shard, time.time() - started, result.tests, failures, output.getvalue()
+
+
+def print_report(tests, out=sys.stdout):
+    tests = sorted(tests, key=lambda test: test["started"])
+    print("======================================================================", file=out)
+    print("Tests:", file=out)
+    for test in tests:
+        print("{duration:10.3f}".format(duration=test["duration"]), test["status"], test["id"], sep="\t", file=out)
+    print("", file=out)
+    for kind, title in LOG_KINDS:
+        rows = [(test["id"], row) for test in tests for row in test[kind]]
+        if not rows:
+            continue
+        print(title, file=out)
+        for test_id, row in rows:
+            # memory rows carry the test id already
+            columns = row[1:] if kind == "memory_logs" else (test_id,) + row[1:]
+            print("{time:10.3f}".format(time=row[0]), "\t".join(columns), sep="\t", file=out)
+        print("", file=out)
+
+
+def run(start_dir=".", pattern="test*.py", top_level_dir=None, workers=None, durations_file=DEFAULT_DURATIONS_FILE, out=sys.stdout):
+    sys_paths = [os.path.abspath(top_level_dir or start_dir)]
+    run_id = os.environ.get("TAUHKA_RUN_ID", None) or new_run_id()
+    shards, broken, plain, errors = discover_shards(start_dir, pattern, top_level_dir)
+    durations = load_durations(durations_file)
+    order = schedule_longest_first(shards, durations)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(order) or 1))
+
+    artifact_max_mb = float(os.environ.get("TAUHKA_ARTIFACT_MAX_MB", DEFAULT_ARTIFACT_MAX_MB)) / workers
+    tests, failures = run_broken(broken, errors)
+    plain_tests, plain_failures, output = run_plain(plain)
+    tests += plain_tests
+    failures += plain_failures
+    if output.strip():
+        print(output, file=out)
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(sys_paths, run_id)) as pool:
+        work = [(shard, shards[shard], artifact_max_mb) for shard in order]
+        for shard, duration, shard_tests, shard_failures, output in pool.imap_unordered(run_shard, work):
+            durations[shard] = duration
+            tests += shard_tests
+            failures += shard_failures
+            if output.strip():
+                print(output, file=out)
+    save_durations(durations_file, durations)
+
+    for test, trace in failures:
+        print("======================================================================", file=out)
+        print("FAIL: {test}".format(test=test), file=out)
+        print("----------------------------------------------------------------------", file=out)
+        print(trace, file=out)
+    print_report(tests, out)
+    print("Ran {count} tests in {shards} classes with {workers} workers and {plain} plain tests in the runner process: {status}".format(
+        count=len(tests),
+        shards=len(order),
+        workers=workers,
+        plain=len(plain),
+        status="FAILED (failures={failures})".format(failures=len(failures)) if failures else "OK"
+    ), file=out)
+    return not failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="tauhka", description="Run TauhkaTestCase suites in parallel worker processes.")
+    parser.add_argument("start_dir", nargs="?", default=".", help="directory to start the test discovery from")
+    parser.add_argument("-p", "--pattern", default="test*.py", help="pattern to match test files")
+    parser.add_argument("-t", "--top-level-directory", default=None, help="top level directory of the project")
+    parser.add_argument("-j", "--workers", type=int, default=int(os.environ.get("TAUHKA_WORKERS", 0)),
+                        help="number of worker processes, TAUHKA_ARTIFACT_MAX_MB is split evenly between them")
+    parser.add_argument("--durations", default=os.environ.get("TAUHKA_DURATIONS", DEFAULT_DURATIONS_FILE), help="file for historical test durations")
+    args = parser.parse_args(argv)
+    ok = run(args.start_dir, args.pattern, args.top_level_directory, args.workers, args.durations)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
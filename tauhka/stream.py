@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the asynchronous CDP event stream.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+import threading
+import collections
+
+from tauhka.devtools import TauhkaDevTools
+
+STREAM_DOMAINS = ("Network", "Runtime", "Log", "Performance")
+CONSOLE_EVENTS = ("Log.entryAdded", "Runtime.consoleAPICalled", "Runtime.exceptionThrown")
+# the levels chromedriver uses in get_log('browser')
+CONSOLE_LEVELS = {
+    "verbose": "DEBUG",
+    "debug": "DEBUG",
+    "log": "INFO",
+    "info": "INFO",
+    "warning": "WARNING",
+    "error": "SEVERE",
+    "assert": "SEVERE",
+}
+
+
+def console_entry(method, params):
+    # the same (timestamp, level, message) rows as collect_javascript_console
+    if method == "Log.entryAdded":
+        entry = params.get("entry", {})
+        message = " ".join(part for part in (entry.get("url"), entry.get("text")) if part)
+        return entry.get("timestamp"), CONSOLE_LEVELS.get(entry.get("level"), "INFO"), message
+    if method == "Runtime.consoleAPICalled":
+        message = " ".join(str(arg.get("value", arg.get("description", ""))) for arg in params.get("args", []))
+        return params.get("timestamp"), CONSOLE_LEVELS.get(params.get("type"), "INFO"), message
+    if method == "Runtime.exceptionThrown":
+        details = params.get("exceptionDetails", {})
+        message = details.get("exception", {}).get("description") or details.get("text", "")
+        return params.get("timestamp"), "SEVERE", message
+    return None
+
+
+class TauhkaEventStream(object):
+    # CDP events of the page collected as they happen by the reader thread of a TauhkaDevTools
+    # connection, into one bounded ring buffer per domain. The same connection serves the commands.
+    def __init__(self, devtools, domains=STREAM_DOMAINS, buffer_size=10000):
+        self.devtools = devtools
+        self.domains = domains
+        self.buffers = dict((domain, collections.deque(maxlen=buffer_size or None)) for domain in domains)
+        self.dropped = dict((domain, 0) for domain in domains)
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.devtools.listen(self.append, self.on_close)
+        try:
+            for domain in domains:
+                self.call("{domain}.enable".format(domain=domain))
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def for_driver(cls, driver, domains=STREAM_DOMAINS, buffer_size=10000, timeout=30):
+        return cls(TauhkaDevTools.for_driver(driver, timeout), domains, buffer_size)
+
+    @property
+    def error(self):
+        return self.devtools.error
+
+    def on_close(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    def append(self, method, params):
+        buffer = self.buffers.get(method.split(".", 1)[0])
+        if buffer is None:
+            return
+        with self.condition:
+            if buffer.maxlen is not None and len(buffer) == buffer.maxlen:
+                self.dropped[method.split(".", 1)[0]] += 1
+            self.sequence += 1
+            buffer.append((self.sequence, method, params))
+            self.condition.notify_all()
+
+    def call(self, method, params=None):
+        return self.devtools.call(method, params)
+
+    def cursor(self):
+        with self.condition:
+            return self.sequence
+
+    def read(self, domain, since=0):
+        # the events of the domain after the cursor, and the cursor for the next read
+        with self.condition:
+            events = []
+            for sequence, method, params in reversed(self.buffers[domain]):
+                if sequence <= since:
+                    break
+                events.append((method, params))
+            events.reverse()
+            return events, self.sequence
+
+    def latest(self, domain):
+        buffer = self.buffers[domain]
+        return buffer[-1][0] if buffer else 0
+
+    def wait_for(self, domain, timeout):
+        # returns early when the next event of the domain arrives
+        with self.condition:
+            latest = self.latest(domain)
+            return self.condition.wait_for(lambda: self.latest(domain) > latest or self.error is not None, timeout)
+
+    def close(self):
+        self.devtools.close()
@@ -34,8 +34,9 @@ import sys
 import logging
 import unittest
 import time
-import json
 import base64
+import functools
+import collections
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
@@ -46,17 +47,58 @@ from selenium.common.exceptions import NoSuchElementException, TimeoutException,
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 
+from tauhka.pool import session_pool, SESSION_POOL_SCOPES
+from tauhka.network import TauhkaNetworkMatcher, TauhkaBackoffWait, TauhkaLazyBody
+from tauhka.memory import TauhkaHeapSampler, TauhkaHeapSeries, MEMORY_MODES, read_memory_usage, memory_baseline_metric, combined_mode
+from tauhka.devtools import TauhkaDevTools, TauhkaDevToolsError
+from tauhka.fake import TauhkaFakeDriver
+from tauhka.stream import TauhkaEventStream, CONSOLE_EVENTS, console_entry
+from tauhka.console import TauhkaConsoleFilter, TauhkaConsoleLog, CONSOLE_HOOK_SCRIPT, COLLECT_CONSOLE_SCRIPT, dedupe_console, exception_record
+from tauhka.heapsnapshot import take_heap_snapshot, snapshot_filename, diff_heap_snapshots, TauhkaHeapSnapshotSummary
+from tauhka.report import TauhkaReport, TauhkaLogBuffer, TauhkaTextRenderer, get_report_writer, artifact_filename, env_flag
+from tauhka.har import TauhkaHarRecorder, HAR_EVENTS
+from tauhka.artifacts import get_artifact_writer, json_payload, DOM_SNAPSHOT_ARGS, DEFAULT_ARTIFACT_MAX_MB
+from tauhka.baseline import get_baseline_store
+from tauhka.query import TauhkaQuery
+from tauhka.page import TauhkaElementCache
+from tauhka.waits import TauhkaBrowserWait, WAIT_STRATEGIES
+from tauhka.replay import TauhkaFixtureRecorder, TauhkaFixtureReplayer, FIXTURE_MODES
+from tauhka.throttling import throttling_settings, apply_throttling
+from tauhka.profiler import start_cpu_profile, stop_cpu_profile, save_cpu_profile, top_self_times
+from tauhka.performance import INSTALL_OBSERVERS_SCRIPT, COLLECT_OBSERVERS_SCRIPT, cdp_performance_metrics, check_budgets
+from tauhka.perflog import TauhkaPerformanceLogParser, NetworkRequest, NetworkResponse
+
+# executed between tests when a browser session is reused from the pool
+SESSION_RESET_CDP_COMMANDS = [
+    ('Network.clearBrowserCookies', {}),
+    ('Network.clearBrowserCache', {}),
+    ('Network.setExtraHTTPHeaders', {'headers': {}}),
+    ('Network.setCacheDisabled', {'cacheDisabled': False}),
+    ('Network.emulateNetworkConditions', {'offline': False, 'latency': 0, 'downloadThroughput': -1, 'uploadThroughput': -1}),
+    ('Emulation.clearDeviceMetricsOverride', {}),
+    ('Emulation.setCPUThrottlingRate', {'rate': 1}),
+    ('Fetch.disable', {}),
+]
+
 
 class TauhkaMemoryMonitor(object):
-    def __init__(self, testcase, description, max_memory_diff):
+    def __init__(self, testcase, description, max_memory_diff=None, heap_snapshot_dir=None, baseline_k=None, mode=None):
         self.testcase = testcase
+        self.mode = mode or testcase.memory_mode
         self.memory_usage_at_start = None
         self.description = description
         self.max_memory_diff = max_memory_diff
+        self.heap_snapshot_dir = heap_snapshot_dir or testcase.heap_snapshot_dir
+        self.heap_snapshot_at_start = None
+        self.baseline_k = baseline_k if baseline_k is not None else testcase.baseline_k
 
     def __enter__(self):
         timestamp = time.time() - self.testcase.test_start_time
-        self.memory_usage_at_start = int(self.testcase.memory_usage())
+        if self.max_memory_diff is None:
+            # without a fixed limit the rolling baseline of the earlier runs is used
+            self.max_memory_diff = self.testcase.baseline_threshold(self.description, memory_baseline_metric(self.mode), self.baseline_k)
+        self.memory_usage_at_start, self.mode_at_start = self.testcase.measure_memory(self.mode)
+        self.memory_usage_at_start = int(self.memory_usage_at_start)
         self.testcase.memory_logs.append((
             timestamp,
             self.testcase.id(),
@@ -65,20 +107,33 @@ class TauhkaMemoryMonitor(object):
             "-",
             self.description,
             "-",
-            str(self.max_memory_diff)
+            str(self.max_memory_diff),
+            self.mode_at_start
         ))
+        if self.heap_snapshot_dir:
+            self.heap_snapshot_at_start = take_heap_snapshot(
+                self.testcase.devtools(),
+                snapshot_filename(self.heap_snapshot_dir, self.testcase.id(), self.description, "start")
+            )
 
     def __exit__(self, type, value, tb):
         result = "FAILURE"
         memory_result = "OK"
         if tb is None:
             result = "OK"
-        current_memory_usage = int(self.testcase.memory_usage())
+        current_memory_usage, mode_at_end = self.testcase.measure_memory(self.mode)
+        current_memory_usage = int(current_memory_usage)
         memory_diff, memory_end, memory_start = current_memory_usage - self.memory_usage_at_start, current_memory_usage, self.memory_usage_at_start
         timestamp = time.time() - self.testcase.test_start_time
+        self.measured_mode = combined_mode(self.mode_at_start, mode_at_end)
 
-        if self.max_memory_diff < int(memory_diff/1024):
+        self.testcase.record_baseline(self.description, memory_baseline_metric(self.measured_mode), int(memory_diff/1024))
+        if self.max_memory_diff is not None and self.max_memory_diff < int(memory_diff/1024):
             memory_result = "MEMORY_ISSUE"
+            if self.heap_snapshot_at_start:
+                self.report_heap_growth()
+        elif self.heap_snapshot_at_start:
+            os.remove(self.heap_snapshot_at_start)
 
         self.testcase.memory_logs.append((
             timestamp,
@@ -88,21 +143,302 @@ class TauhkaMemoryMonitor(object):
             str(int(memory_diff/1024)),
             self.description,
             result,
-            memory_result
+            memory_result,
+            self.measured_mode
         ))
 
+    def report_heap_growth(self):
+        heap_snapshot_at_end = take_heap_snapshot(
+            self.testcase.devtools(),
+            snapshot_filename(self.heap_snapshot_dir, self.testcase.id(), self.description, "end")
+        )
+        growth = diff_heap_snapshots(
+            TauhkaHeapSnapshotSummary.from_file(self.heap_snapshot_at_start),
+            TauhkaHeapSnapshotSummary.from_file(heap_snapshot_at_end)
+        )
+        self.testcase.report.emit_summary({
+            "type": "heap.growth",
+            "description": self.description,
+            "start": self.heap_snapshot_at_start,
+            "end": heap_snapshot_at_end,
+            "growth": growth,
+        })
+
+
+class TauhkaSoakMonitor(object):
+    def __init__(self, testcase, description, iterations=None, duration=None, max_slope=None, warmup=0, mode=None, fail_on_issue=False):
+        assert iterations or duration, "TauhkaSoakMonitor needs iterations or a duration"
+        self.testcase = testcase
+        self.description = description
+        self.iterations = iterations
+        self.duration = duration
+        self.max_slope = max_slope if max_slope is not None else testcase.soak_max_slope
+        self.warmup = warmup
+        self.mode = mode or testcase.memory_mode
+        self.fail_on_issue = fail_on_issue
+        # one heap sample per iteration, the iteration number is the x axis
+        self.series = TauhkaHeapSeries()
+        # the modes seen, not one entry per iteration
+        self.measured_modes = set()
+        self.slope = 0.0
+        self.result = None
+
+    def repeat(self):
+        started = time.time()
+        iteration = 0
+        while True:
+            if self.iterations and iteration >= self.iterations:
+                return
+            if self.duration and time.time() - started >= self.duration:
+                return
+            yield iteration
+            iteration += 1
+
+    def run(self, fn, *args, **kwargs):
+        timestamp = time.time() - self.testcase.test_start_time
+        result = "FAILURE"
+        try:
+            for iteration in self.repeat():
+                fn(*args, **kwargs)
+                if iteration >= self.warmup:
+                    value, mode = self.testcase.measure_memory(self.mode)
+                    self.measured_modes.add(mode)
+                    self.series.append(iteration, value)
+            result = "OK"
+        finally:
+            self.report(timestamp, result)
+        if self.fail_on_issue:
+            assert self.result == "OK", self.describe_issue()
+        return self.series
+
+    def report(self, timestamp, result):
+        # the slope is in bytes per iteration, the limit in KB like max_memory_diff
+        self.slope = self.series.slope()
+        self.result = "OK"
+        if self.max_slope is not None and len(self.series) > 1 and self.slope / 1024 > self.max_slope:
+            self.result = "MEMORY_LEAK"
+        self.testcase.record_baseline(self.description, "soak_slope_kb", self.slope / 1024)
+        first = self.series.values[0] if self.series.values else 0
+        last = self.series.last() or 0
+        self.testcase.memory_logs.append((
+            timestamp,
+            self.testcase.id(),
+            str(int(first/1024)),
+            str(int(last/1024)),
+            str(int((last - first)/1024)),
+            self.description,
+            result,
+            self.result,
+            combined_mode(*sorted(self.measured_modes)) or self.mode
+        ))
+        self.testcase.report.emit_summary({
+            "type": "soak",
+            "description": self.description,
+            "iterations": len(self.series) + self.warmup,
+            "samples": len(self.series),
+            "slope": self.slope,
+            "max_slope": self.max_slope,
+            "result": self.result,
+            "sparkline": self.series.sparkline(),
+        })
+
+    def describe_issue(self):
+        return "Memory grows {slope:.2f} KB per iteration > {max_slope} KB ({description})".format(
+            slope=self.slope / 1024, max_slope=self.max_slope, description=self.description
+        )
+
+
+class TauhkaPerformanceMonitor(object):
+    def __init__(self, testcase, description, budgets=None, fail_on_issue=False, baseline_k=None):
+        self.testcase = testcase
+        self.description = description
+        self.budgets = dict(budgets or {})
+        self.fail_on_issue = fail_on_issue
+        self.baseline_k = baseline_k
+        self.started = None
+        self.cdp_metrics_at_start = None
+        self.metrics = {}
+        self.issues = {}
+
+    def __enter__(self):
+        if self.testcase.has_devtools():
+            self.testcase.driver.execute_cdp_cmd('Performance.enable', {})
+            self.cdp_metrics_at_start = cdp_performance_metrics(self.testcase.driver)
+            self.testcase.driver.execute_script(INSTALL_OBSERVERS_SCRIPT)
+        self.started = time.time()
+        return self
+
+    def __exit__(self, type, value, tb):
+        result = "FAILURE"
+        if tb is None:
+            result = "OK"
+        self.metrics = {"duration": time.time() - self.started}
+        if self.cdp_metrics_at_start is not None:
+            self.metrics.update(self.testcase.driver.execute_async_script(COLLECT_OBSERVERS_SCRIPT))
+            cdp_metrics_at_end = cdp_performance_metrics(self.testcase.driver)
+            for name, value in cdp_metrics_at_end.items():
+                self.metrics[name] = value - self.cdp_metrics_at_start.get(name, 0)
+        if self.baseline_k is not None:
+            # metrics without a declared budget are compared to the rolling baseline
+            for name in self.metrics.keys():
+                if name not in self.budgets:
+                    threshold = self.testcase.baseline_threshold(self.description, name, self.baseline_k)
+                    if threshold is not None:
+                        self.budgets[name] = threshold
+        for name, value in self.metrics.items():
+            self.testcase.record_baseline(self.description, name, value)
+        self.issues = check_budgets(self.metrics, self.budgets)
+
+        timestamp = time.time() - self.testcase.test_start_time
+        for name in sorted(self.metrics.keys()):
+            self.testcase.perf_logs.append((
+                timestamp,
+                self.testcase.id(),
+                name,
+                "{value:.3f}".format(value=self.metrics[name]),
+                "{budget:.3f}".format(budget=self.budgets[name]) if name in self.budgets else "-",
+                self.description,
+                result,
+                "PERF_ISSUE" if name in self.issues else "OK"
+            ))
+        if self.fail_on_issue and tb is None:
+            assert not self.issues, "Performance budget exceeded ({description}): {issues}".format(
+                description=self.description,
+                issues=", ".join(
+                    "{name} {value:.3f} > {budget}".format(name=name, value=value, budget=budget)
+                    for name, (value, budget) in sorted(self.issues.items())
+                )
+            )
+
+
+class TauhkaProfilerMonitor(object):
+    def __init__(self, testcase, description, profile_dir=None, top=10, sampling_interval=None):
+        self.testcase = testcase
+        self.description = description
+        self.profile_dir = profile_dir or testcase.cpu_profile_dir
+        self.top = top
+        self.sampling_interval = sampling_interval
+        self.profile = None
+        self.profile_file = None
+
+    def __enter__(self):
+        if self.testcase.has_devtools():
+            start_cpu_profile(self.testcase.driver, self.sampling_interval)
+        return self
+
+    def __exit__(self, type, value, tb):
+        if not self.testcase.has_devtools():
+            return
+        self.profile = stop_cpu_profile(self.testcase.driver)
+        if self.profile_dir:
+            self.profile_file = save_cpu_profile(self.profile, artifact_filename(self.profile_dir, self.testcase.id(), self.description, "cpuprofile"))
+        total, functions = top_self_times(self.profile, self.top)
+        self.testcase.report.emit_summary({
+            "type": "cpu.profile",
+            "description": self.description,
+            "file": self.profile_file,
+            "total": total,
+            "functions": functions,
+        })
+
+
+class TauhkaConsoleMonitor(object):
+    def __init__(self, testcase, description, levels=None, pattern=None, ignore=None, budgets=None, fail_on_issue=False):
+        self.testcase = testcase
+        self.description = description
+        self.filter = TauhkaConsoleFilter(levels, pattern, ignore)
+        self.budgets = dict(budgets or {})
+        self.fail_on_issue = fail_on_issue
+        self.log = TauhkaConsoleLog()
+        self.exceptions = []
+        self.exceptions_at_start = 0
+        self.issues = {}
+        self.devtools = None
+
+    def __enter__(self):
+        # the earlier messages belong to the test, not to this block
+        self.testcase.console_logs += dedupe_console(self.testcase.collect_javascript_console())
+        self.exceptions_at_start = len(self.testcase.exceptions)
+        if not self.testcase.has_cdp():
+            self.testcase.install_console_hook()
+        elif self.testcase.events is None and self.testcase.has_devtools():
+            # the stack traces of the exceptions are only in the Runtime events
+            self.devtools = self.testcase.devtools()
+            self.devtools.subscribe("Runtime.exceptionThrown", self.testcase.on_exception_thrown)
+            self.devtools.call("Runtime.enable")
+        return self
+
+    def __exit__(self, type, value, tb):
+        result = "FAILURE"
+        if tb is None:
+            result = "OK"
+        rows = self.testcase.collect_javascript_console()
+        if self.devtools:
+            self.devtools.unsubscribe("Runtime.exceptionThrown", self.testcase.on_exception_thrown)
+            self.devtools = None
+        self.testcase.console_logs += dedupe_console(rows)
+        self.log.add(row for row in rows if self.filter(row))
+        self.exceptions = self.testcase.exceptions[self.exceptions_at_start:]
+        counts = self.log.counts()
+        self.issues = dict(
+            (level, (counts.get(level, 0), budget)) for level, budget in self.budgets.items() if counts.get(level, 0) > budget
+        )
+        self.testcase.report.emit_summary({
+            "type": "console.monitor",
+            "description": self.description,
+            "result": result,
+            "counts": counts,
+            "issues": self.issues,
+            "exceptions": self.exceptions,
+        })
+        if self.fail_on_issue and tb is None:
+            assert not self.issues, self.describe_issues()
+
+    def messages(self, level=None):
+        return [row for row in self.log.rows() if level is None or row[1] == level]
+
+    def describe_issues(self):
+        return "Console messages over budget ({description}): {issues}".format(
+            description=self.description,
+            issues="; ".join(
+                "{level} {count} > {budget}: {messages}".format(
+                    level=level, count=count, budget=budget,
+                    messages=", ".join("{message} x{count}".format(message=row[2], count=row[3]) for row in self.messages(level))
+                )
+                for level, (count, budget) in sorted(self.issues.items())
+            )
+        )
+
+    def assert_no_severe(self):
+        severe = self.messages("SEVERE")
+        assert not severe, "SEVERE console messages ({description}): {messages}".format(
+            description=self.description,
+            messages="; ".join("{message} x{count}".format(message=row[2], count=row[3]) for row in severe)
+        )
+
 
 class TauhkaNetworkMonitor(object):
-    def __init__(self, testcase, description, network_events):
+    def __init__(self, testcase, description, network_events, ordered=True, timeout=None, record_har=False, har_file=None, har_bodies=False):
         self.testcase = testcase
         self.network_monitor_start = None
         self.description = description
         self.network_events = network_events
+        self.ordered = ordered
+        self.timeout = timeout
+        self.matcher = None
+        self.record_har = record_har or bool(har_file)
+        self.har_file = har_file
+        self.har_bodies = har_bodies
+        self.har = None
 
     def __enter__(self):
         self.network_monitor_start = time.time() - self.testcase.test_start_time
         # add current events to log, it will clear things for monitoring too
         self.testcase.network_logs += self.testcase.collect_network_requests()
+        self.matcher = TauhkaNetworkMatcher(self.network_events, ordered=self.ordered)
+        if self.record_har:
+            self.har = self.testcase.har_recorder(self.har_bodies)
+        return self
 
     def __exit__(self, type, value, tb):
         result = "FAILURE"
@@ -111,63 +447,27 @@ class TauhkaNetworkMonitor(object):
             result = "OK"
 
         timestamp = time.time() - self.testcase.test_start_time
-        max_tries = 10
-        tries = 0
-        network_requests = []
-        while self.network_events:
-            assert max_tries > tries, "Network traffic was incorrect."
-
-            network_events_new = self.testcase.collect_network_requests(fetch_body_always=True)
-            network_requests += network_events_new
-            self.testcase.network_logs += network_events_new
-
-            parsed_requests = {}
-
-            for req in network_requests:
-                request_timestamp = req[0]
-                request_id = req[1]
-                request_type = req[2]
-                if request_id not in parsed_requests.keys():
-                    parsed_requests[request_id] = {"request": None, "response": None}
-                if request_type == "=>":
-                    request_method = req[3]
-                    request_url = req[4]
-                    request_data = req[5]
-                    parsed_requests[request_id]["request"] = (request_method, request_url, request_data)
-                else:
-                    response_status = req[3]
-                    response_statusText = req[4]
-                    response_text = req[5]
-                    parsed_requests[request_id]["response"] = (req[3], req[5])
-
-            for key in parsed_requests.keys():
-                event = self.network_events[0]
-                found_event = parsed_requests[key]
-                is_ok = True
-                for key in event.keys():
-                    ev = event[key]
-                    if ev:
-                        ev_count = len(event[key])
-                    else:
-                        ev_count = 0
-                    ev_found = found_event[key]
-                    if ev_found:
-                        ev_found_count = len(found_event[key])
-                    else:
-                        ev_found_count = 0
-                    is_ok = ev_count == ev_found_count
-                    if not is_ok:
-                        break
-                    for i in range(ev_count):
-                        is_ok = ev[i] == ev_found[i]
-                        if not is_ok:
-                            break
-                if is_ok:
-                    self.network_events.pop(0)
-
-            tries += 1
-            if self.network_events:
-                time.sleep(0.5)
+        timeout = self.timeout if self.timeout is not None else self.testcase.network_timeout
+        try:
+            TauhkaBackoffWait(timeout, sleep=self.testcase.wait_for_network_events).until(
+                self.collect_and_match,
+                lambda: "Network traffic was incorrect, unmatched requests: {unmatched}".format(unmatched=self.matcher.describe_unmatched())
+            )
+        finally:
+            if self.har:
+                self.har.unsubscribe()
+                if self.har_file:
+                    self.har.save(self.har_file)
+        self.testcase.record_baseline(self.description, "request_count", self.matcher.request_count())
+        self.testcase.record_baseline(self.description, "duration", time.time() - self.testcase.test_start_time - self.network_monitor_start)
+
+    def collect_and_match(self):
+        if self.matcher.is_complete():
+            return True
+        network_events_new = self.testcase.collect_network_requests(fetch_body_always=True)
+        self.testcase.network_logs += network_events_new
+        # only the new events are parsed, earlier ones are indexed already
+        return self.matcher.feed(network_events_new)
 
 
 class TauhkaTestCase(unittest.TestCase):
@@ -175,62 +475,262 @@ class TauhkaTestCase(unittest.TestCase):
         super().__init__(methodName)
         self.webdriver = os.environ.get("TAUHKA_WEBDRIVER", "./chromedriver")
         self.browser = os.environ.get("TAUHKA_BROWSER", "chrome")
+        self.fake_script = os.environ.get("TAUHKA_FAKE_SCRIPT", None)
         self.time_adjust = float(os.environ.get("TAUHKA_TIMEOFFSET", 1.25))
         self.default_wait = int(os.environ.get("TAUHKA_DEFAULT_WAIT", 10))
         self.maximum_wait = int(os.environ.get("TAUHKA_MAX_WAIT", 30))
-        self.extra_logging = bool(os.environ.get("TAUHKA_EXTRA_LOGS", True))
+        self.network_timeout = float(os.environ.get("TAUHKA_NETWORK_TIMEOUT", 5))
+        self.heap_sample_interval = float(os.environ.get("TAUHKA_HEAP_SAMPLE_INTERVAL", 0))
+        self.heap_snapshot_dir = os.environ.get("TAUHKA_HEAP_SNAPSHOT_DIR", None)
+        self.log_buffer_size = int(os.environ.get("TAUHKA_LOG_BUFFER_SIZE", 10000))
+        self.har_dir = os.environ.get("TAUHKA_HAR_DIR", None)
+        self.har_bodies = env_flag("TAUHKA_HAR_BODIES")
+        self.artifact_dir = os.environ.get("TAUHKA_ARTIFACT_DIR", None)
+        self.artifact_max_mb = float(os.environ.get("TAUHKA_ARTIFACT_MAX_MB", DEFAULT_ARTIFACT_MAX_MB))
+        self.baseline_k = float(os.environ.get("TAUHKA_BASELINE_K", 3))
+        self.baseline_min_delta = float(os.environ.get("TAUHKA_BASELINE_MIN_DELTA", 1))
+        self.cpu_profile_dir = os.environ.get("TAUHKA_CPU_PROFILE_DIR", None)
+        self.cpu_profile = env_flag("TAUHKA_CPU_PROFILE")
+        self.throttling_profile = os.environ.get("TAUHKA_THROTTLING", None)
+        self.fixture_file = os.environ.get("TAUHKA_FIXTURES", None)
+        self.fixture_mode = os.environ.get("TAUHKA_FIXTURE_MODE", "replay")
+        self.fixture_latency = float(os.environ.get("TAUHKA_FIXTURE_LATENCY", 0))
+        self.fixture_strict = env_flag("TAUHKA_FIXTURE_STRICT")
+        self.element_cache = env_flag("TAUHKA_ELEMENT_CACHE")
+        self.wait_strategy = os.environ.get("TAUHKA_WAIT_STRATEGY", "observer")
+        self.memory_mode = os.environ.get("TAUHKA_MEMORY_MODE", "precise")
+        self.soak_max_slope = float(os.environ.get("TAUHKA_SOAK_MAX_SLOPE", 1))
+        self.event_stream = env_flag("TAUHKA_EVENT_STREAM")
+        self.console_levels = [level for level in os.environ.get("TAUHKA_CONSOLE_LEVELS", "").split(",") if level]
+        self.console_ignore = os.environ.get("TAUHKA_CONSOLE_IGNORE", None)
+        self.extra_logging = env_flag("TAUHKA_EXTRA_LOGS", True)
         self.report_always = False
+        self.session_pool = os.environ.get("TAUHKA_SESSION_POOL", None)
+        self.session_max_uses = int(os.environ.get("TAUHKA_SESSION_MAX_USES", 50))
+
+    @classmethod
+    def tearDownClass(cls):
+        session_pool.close(session_pool.scope_key(cls, "class"))
+        super().tearDownClass()
 
     def setUp(self):
+        # the settings are checked before the browser is started, tearDown is not called when setUp fails
+        assert self.wait_strategy in WAIT_STRATEGIES, "TAUHKA_WAIT_STRATEGY must be one of {strategies}".format(strategies=", ".join(WAIT_STRATEGIES))
+        assert self.memory_mode in MEMORY_MODES, "TAUHKA_MEMORY_MODE must be one of {modes}".format(modes=", ".join(MEMORY_MODES))
+        assert self.fixture_mode in FIXTURE_MODES, "TAUHKA_FIXTURE_MODE must be one of {modes}".format(modes=", ".join(FIXTURE_MODES))
+        throttling = throttling_settings(self.throttling_profile) if self.throttling_profile else None
         self.memory_usage_at_start = None
-        self.memory_logs = []
+        self.recorded_metrics = []
+        self.lazy_bodies = []
+        self.devtools_connection = None
+        self.performance_log = TauhkaPerformanceLogParser()
+        self.performance_log.subscribe("Network.requestWillBeSent", self.on_request_will_be_sent)
+        self.performance_log.subscribe("Network.responseReceived", self.on_response_received)
         self.start_time = int(time.time())
         self.test_start_time = time.time() + self.time_adjust
+        if self.session_pool:
+            assert self.session_pool in SESSION_POOL_SCOPES, "TAUHKA_SESSION_POOL must be one of {scopes}".format(scopes=", ".join(SESSION_POOL_SCOPES))
+            self.driver = session_pool.acquire(self.session_key(), self.create_driver, self.session_max_uses)
+        else:
+            self.driver = self.create_driver()
+        self.events = None
+        self.fixtures = None
+        self.heap_sampler = None
+        try:
+            self.start_session(throttling)
+        except BaseException:
+            self.abort_session()
+            raise
+
+    def start_session(self, throttling):
+        self.driver.implicitly_wait(self.default_wait)
+        self.wait = WebDriverWait(self.driver, self.maximum_wait)
+        self.browser_wait = TauhkaBrowserWait(self.driver)
+        self.event_cursors = {}
+        self.exceptions = []
+        self.console_hook = False
+        self.console_filter = TauhkaConsoleFilter(self.console_levels, ignore=self.console_ignore)
+        if self.event_stream and self.has_devtools():
+            self.events = TauhkaEventStream.for_driver(self.driver, buffer_size=self.log_buffer_size)
+        self.cached_elements = None
+        if self.element_cache:
+            self.cached_elements = TauhkaElementCache(self.locate_element)
+        if throttling and self.has_cdp():
+            apply_throttling(self.driver, throttling)
+            self.report.emit_summary({"type": "throttling", "profile": self.throttling_profile, "settings": throttling})
+        if self.fixture_file and self.has_cdp():
+            self.fixtures = self.start_fixtures()
+        self.heap_samples = None
+        self.har = None
+        self.har_events = None
+        self.artifact_writer = None
+        if self.artifact_dir:
+            self.artifact_writer = get_artifact_writer(self.artifact_dir, int(self.artifact_max_mb * 1024 * 1024))
+        if self.har_dir:
+            self.har = self.har_recorder(self.har_bodies)
+        elif self.artifact_writer and self.has_cdp() and self.extra_logging and self.events is None:
+            # only the raw events are kept, the HAR of a failed test is built from them,
+            # the event stream keeps them in its Network buffer anyway
+            self.har_events = collections.deque(maxlen=self.log_buffer_size or None)
+            for method in HAR_EVENTS:
+                self.performance_log.subscribe(method, functools.partial(self.keep_har_event, method))
+        self.profiler = None
+        if self.cpu_profile:
+            self.profiler = TauhkaProfilerMonitor(self, "test").__enter__()
+        if self.heap_sample_interval > 0 and self.has_cdp() and self.extra_logging:
+            self.heap_sampler = TauhkaHeapSampler(self.driver, self.heap_sample_interval, self.test_start_time).start()
+
+    def abort_session(self):
+        # tearDown is not called when setUp fails, the browser is not left running
+        if self.heap_sampler:
+            self.heap_sampler.stop()
+            self.heap_sampler = None
+        if self.devtools_connection:
+            self.devtools_connection.close()
+            self.devtools_connection = None
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+        if self.session_pool:
+            session_pool.release(self.session_key(), self.driver, False)
+        else:
+            self.driver.quit()
+
+    def keep_har_event(self, method, params):
+        self.har_events.append((method, params))
+
+    def failure_har(self):
+        if self.har:
+            return self.har
+        if self.events is not None:
+            events = self.events.read("Network")[0]
+        elif self.har_events is not None:
+            events = list(self.har_events)
+        else:
+            return None
+        parser = TauhkaPerformanceLogParser()
+        har = TauhkaHarRecorder().subscribe(parser)
+        parser.dispatch(events)
+        return har
+
+    def har_recorder(self, bodies=False):
+        body_fetcher = None
+        if bodies:
+            body_fetcher = functools.partial(self.lazy_body, self.fetch_response_body)
+        return TauhkaHarRecorder(body_fetcher).subscribe(self.performance_log)
+
+    def record_baseline(self, description, metric, value):
+        # e.g. the load mode aggregates the recorded metrics of the iterations
+        self.recorded_metrics.append((description, metric, value))
+        store = get_baseline_store()
+        if store:
+            store.record(self.id(), description, metric, value)
+
+    def baseline_threshold(self, description, metric, k=None):
+        store = get_baseline_store()
+        if not store:
+            return None
+        return store.threshold(self.id(), description, metric, self.baseline_k if k is None else k, min_delta=self.baseline_min_delta)
+
+    def start_fixtures(self):
+        # {test} in the file name gives every test its own fixtures
+        fixture_file = self.fixture_file.format(test=self.id())
+        if self.fixture_mode == "record":
+            return TauhkaFixtureRecorder(self.devtools(), fixture_file).start()
+        return TauhkaFixtureReplayer(self.devtools(), fixture_file, latency=self.fixture_latency, strict=self.fixture_strict).start()
+
+    def has_cdp(self):
+        # chrome and the fake driver, both have also the performance and browser logs
+        return hasattr(self.driver, "execute_cdp_cmd")
+
+    def has_devtools(self):
+        return self.has_cdp() and self.extra_logging
+
+    def devtools(self):
+        # the fixtures and heap snapshots share the connection of the event stream
+        if self.events is not None:
+            return self.events.devtools
+        if self.devtools_connection is None:
+            if hasattr(self.driver, "tauhka_devtools"):
+                self.devtools_connection = self.driver.tauhka_devtools()
+            else:
+                self.devtools_connection = TauhkaDevTools.for_driver(self.driver)
+        return self.devtools_connection
+
+    def session_key(self):
+        return session_pool.scope_key(type(self), self.session_pool)
+
+    def create_driver(self):
+        if self.browser == "fake":
+            return TauhkaFakeDriver.from_file(self.fake_script, performance_log=self.extra_logging and not self.event_stream)
         if "chrome" in self.browser:
             caps = DesiredCapabilities.CHROME.copy()
-            if self.extra_logging:
+            # with the TauhkaEventStream the events do not go through the chromedriver logs
+            logs = self.extra_logging and not self.event_stream
+            if logs:
                 caps['goog:loggingPrefs'] = {
                     'browser': 'ALL',
                     'performance': 'ALL',
                 }
                 caps['loggingPrefs'] = caps['goog:loggingPrefs']
             opts = webdriver.ChromeOptions()
-            if self.extra_logging:
+            if logs:
                 opts.add_experimental_option('perfLoggingPrefs', {
                     'enableNetwork': True,
                     'enablePage': True,
                     'traceCategories': "browser,devtools.timeline,devtools"
                 })
+            if self.extra_logging:
                 opts.add_argument("--js-flags=--expose-gc")
                 opts.add_argument("--enable-precise-memory-info")
                 opts.add_argument("--no-sandbox")
             if "TEST_DEBUG" not in os.environ.keys():
                 opts.add_argument("--headless")
-            self.driver = webdriver.Chrome(self.webdriver, options=opts, desired_capabilities=caps)
-        else:
-            self.driver = webdriver.Firefox(self.webdriver)
-        self.driver.implicitly_wait(self.default_wait)
-        self.wait = WebDriverWait(self.driver, self.maximum_wait)
+            return webdriver.Chrome(self.webdriver, options=opts, desired_capabilities=caps)
+        return webdriver.Firefox(self.webdriver)
+
+    def reset_driver(self):
+        # returns False when the session is not clean enough to be reused
+        try:
+            self.driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+            self.driver.delete_all_cookies()
+            self.driver.get("about:blank")
+            if self.has_cdp():
+                for cmd, cmd_args in SESSION_RESET_CDP_COMMANDS:
+                    self.driver.execute_cdp_cmd(cmd, cmd_args)
+                if self.extra_logging and not self.event_stream:
+                    self.driver.get_log('performance')
+                    self.driver.get_log('browser')
+        except WebDriverException:
+            return False
+        return True
 
     def with_memory_usage(self, description, fn, *args, **kwargs):
         self.mark_memory_measure(description)
         fn(*args, **kwargs)
         self.diff_memory_measure_and_report(description)
 
+    def with_soak(self, description, fn, iterations=None, duration=None, max_slope=None, warmup=0):
+        return TauhkaSoakMonitor(
+            testcase=self, description=description, iterations=iterations, duration=duration, max_slope=max_slope, warmup=warmup, fail_on_issue=True
+        ).run(fn)
+
     def start_memory_measure(self, description=None):
         if not self.extra_logging:
             return
         if not description:
             description = "Test Started"
         timestamp = time.time() - self.test_start_time
-        self.memory_usage_at_start = int(self.memory_usage())
+        self.memory_usage_at_start, self.memory_mode_at_start = self.measure_memory()
+        self.memory_usage_at_start = int(self.memory_usage_at_start)
         self.memory_logs.append((
             timestamp,
             self.id(),
             "-",
             "-",
             "-",
-            description
+            description,
+            self.memory_mode_at_start
         ))
 
     def end_memory_measure_and_report(self, description=None):
@@ -247,28 +747,36 @@ class TauhkaTestCase(unittest.TestCase):
             str(int(memory_end/1024)),
             str(int(memory_diff/1024)),
             description,
+            self.measured_memory_mode
         ))
+        self.record_baseline(description, memory_baseline_metric(self.measured_memory_mode), int(memory_diff/1024))
 
     def end_memory_measure(self):
-        currentMemoryUsage = int(self.memory_usage())
+        currentMemoryUsage, mode = self.measure_memory()
+        currentMemoryUsage = int(currentMemoryUsage)
+        self.measured_memory_mode = combined_mode(self.memory_mode_at_start, mode)
         return currentMemoryUsage - self.memory_usage_at_start, currentMemoryUsage, self.memory_usage_at_start
 
     def mark_memory_measure(self, description):
         if not self.extra_logging:
             return
         timestamp = time.time() - self.test_start_time
-        self.memory_usage_at_mark = int(self.memory_usage())
+        self.memory_usage_at_mark, self.memory_mode_at_mark = self.measure_memory()
+        self.memory_usage_at_mark = int(self.memory_usage_at_mark)
         self.memory_logs.append((
             timestamp,
             self.id(),
             "-",
             "-",
             "-",
-            description
+            description,
+            self.memory_mode_at_mark
         ))
 
     def diff_memory_measure(self):
-        currentMemoryUsage = int(self.memory_usage())
+        currentMemoryUsage, mode = self.measure_memory()
+        currentMemoryUsage = int(currentMemoryUsage)
+        self.measured_memory_mode = combined_mode(self.memory_mode_at_mark, mode)
         return currentMemoryUsage - self.memory_usage_at_mark, currentMemoryUsage, self.memory_usage_at_mark
 
     def diff_memory_measure_and_report(self, msg=None):
@@ -283,13 +791,18 @@ class TauhkaTestCase(unittest.TestCase):
             str(int(memory_end/1024)),
             str(int(memory_diff/1024)),
             msg,
+            self.measured_memory_mode
         ))
+        self.record_baseline(msg, memory_baseline_metric(self.measured_memory_mode), int(memory_diff/1024))
+
+    def memory_usage(self, mode=None):
+        return self.measure_memory(mode)[0]
 
-    def memory_usage(self):
+    def measure_memory(self, mode=None):
+        mode = mode or self.memory_mode
         if not self.extra_logging:
-            return 0
-        self.driver.execute_script("window.gc()")
-        return self.driver.execute_script("return window.performance.memory.usedJSHeapSize")
+            return 0, mode
+        return read_memory_usage(self.driver, mode, getattr(self, "heap_sampler", None))
 
     def close(self):
         self.driver.close()
@@ -302,123 +815,266 @@ class TauhkaTestCase(unittest.TestCase):
         self.logger.level = logging.INFO
         self.stream_handler = logging.StreamHandler(sys.stdout)
         self.logger.addHandler(self.stream_handler)
-        self.network_logs = []
-        self.console_logs = []
+        self.report = TauhkaReport(self.id(), get_report_writer())
+        self.network_logs = TauhkaLogBuffer("network", self.report, self.log_buffer_size)
+        self.console_logs = TauhkaLogBuffer("console", self.report, self.log_buffer_size)
+        self.perf_logs = TauhkaLogBuffer("performance", self.report, self.log_buffer_size)
+        self.memory_logs = TauhkaLogBuffer("memory", self.report, self.log_buffer_size)
 
         errors_before = len(result.errors)
         failures_before = len(result.failures)
+        self.problems_before = errors_before + failures_before
 
         super().run(result)
 
+        dropped = dict((logs.kind, logs.dropped) for logs in (self.console_logs, self.network_logs, self.perf_logs, self.memory_logs) if logs.dropped)
+        if dropped:
+            # the report file has every row, only the printed report misses them
+            self.report.emit_summary({"type": "logs.dropped", "dropped": dropped})
+
+        was_failure = (errors_before != len(result.errors) or failures_before != len(result.failures))
+        status = "OK"
+        if was_failure:
+            if errors_before != len(result.errors):
+                status = "ERROR"
+            status = "FAILURE"
+        self.report.emit([{"type": "status", "test": self.id(), "status": status}])
+
         if self.extra_logging:
-            was_failure = (errors_before != len(result.errors) or failures_before != len(result.failures))
             if self.report_always or was_failure:
-                print("\n")
-                print("======================================================================")
-                status = "OK"
-                if was_failure:
-                    if errors_before != len(result.errors):
-                        status = "ERROR"
-                    status = "FAILURE"
-                print("Test status ({testname}): {status}. ".format(testname=self.id(), status=status))
-                print("----------------------------------------------------------------------")
-                if self.console_logs:
-                    print("Console messages:")
-                    for entry in self.console_logs:
-                        print("{time:10.3f}".format(time=entry[0]), "\t".join(entry[1:]))
-                    print("")
-                if self.network_logs:
-                    print("Network requests:")
-                    for entry in self.network_logs:
-                        print("{time:10.3f}".format(time=entry[0]), "\t".join(entry[1:]))
-                    print("")
-                if self.console_logs:
-                    print("Tests and memory usage")
-                    for entry in self.memory_logs:
-                        print("{time:10.3f}".format(time=entry[0]), "\t".join(entry[1:]))
+                TauhkaTextRenderer(sys.stdout).render(self.id(), status, self.report_records())
 
         self.logger.removeHandler(self.stream_handler)
 
+    def has_failed(self):
+        outcome = getattr(self, "_outcome", None)
+        if outcome is None:
+            return False
+        # before python 3.11 the errors are kept in the outcome until the test has ended
+        errors = getattr(outcome, "errors", None)
+        if errors is not None:
+            return any(exc_info is not None for test, exc_info in errors)
+        return len(outcome.result.errors) + len(outcome.result.failures) > getattr(self, "problems_before", 0)
+
+    def capture_failure_artifacts(self):
+        # only the browser calls are made here, the writer thread serializes, compresses and writes
+        writer = self.artifact_writer
+        description = "failure-{stamp}".format(stamp=int(time.time() * 1000))
+        files = collections.OrderedDict()
+        try:
+            screenshot = self.driver.get_screenshot_as_png()
+        except WebDriverException:
+            screenshot = None
+        if screenshot:
+            files["screenshot"] = writer.submit(artifact_filename(writer.directory, self.id(), description, "png"), screenshot, compress=False)
+        if self.has_cdp():
+            try:
+                snapshot = self.driver.execute_cdp_cmd('DOMSnapshot.captureSnapshot', DOM_SNAPSHOT_ARGS)
+            except WebDriverException:
+                snapshot = None
+            if snapshot:
+                files["dom"] = writer.submit(artifact_filename(writer.directory, self.id(), description + "-dom", "json"), json_payload(snapshot))
+        har = self.failure_har()
+        if har:
+            files["har"] = writer.submit(artifact_filename(writer.directory, self.id(), description, "har"), json_payload(har.har()))
+        files["console"] = writer.submit(
+            artifact_filename(writer.directory, self.id(), description + "-console", "json"),
+            json_payload({"console": self.console_logs.records(), "exceptions": list(self.exceptions)})
+        )
+        heap = self.heap_samples.last() if self.heap_samples else None
+        if heap is None and self.extra_logging:
+            try:
+                heap = self.memory_usage("fast")
+            except WebDriverException:
+                heap = None
+        try:
+            url, title = self.driver.current_url, self.driver.title
+        except WebDriverException:
+            url, title = None, None
+        files["state"] = writer.submit(
+            artifact_filename(writer.directory, self.id(), description + "-state", "json"),
+            json_payload({"test": self.id(), "url": url, "title": title, "heap": heap})
+        )
+        self.report.emit_summary({"type": "artifacts", "files": files, "evicted": len(writer.evicted)})
+        return files
+
+    def report_records(self):
+        records = []
+        for logs in (self.console_logs, self.network_logs, self.perf_logs, self.memory_logs):
+            records += logs.records()
+        return records + self.report.summaries
+
+    def read_events(self, domain):
+        # the new events of the domain since the previous read
+        events, self.event_cursors[domain] = self.events.read(domain, self.event_cursors.get(domain, 0))
+        return events
+
+    def wait_for_network_events(self, timeout):
+        if self.events is not None:
+            self.events.wait_for("Network", timeout)
+        else:
+            time.sleep(timeout)
+
+    def install_console_hook(self):
+        self.driver.execute_script(CONSOLE_HOOK_SCRIPT)
+        self.console_hook = True
+
+    def on_exception_thrown(self, params):
+        self.exceptions.append(exception_record(params))
+
     def collect_javascript_console(self):
+        return [row for row in self.read_javascript_console() if self.console_filter(row)]
+
+    def read_javascript_console(self):
         retval = []
-        if "chrome" not in self.browser:
+        if not self.has_cdp():
+            if self.console_hook:
+                try:
+                    entries = self.driver.execute_script(COLLECT_CONSOLE_SCRIPT) or []
+                except WebDriverException:
+                    entries = []
+                for entry in entries:
+                    if entry.get('stack'):
+                        self.exceptions.append({"timestamp": entry['timestamp'], "message": entry['message'], "stack": entry['stack'].splitlines()})
+                    retval.append((entry['timestamp'], entry['level'], entry['message']))
             return retval
+        if self.events is not None:
+            for method, params in self.read_events("Log") + self.read_events("Runtime"):
+                if method == "Runtime.exceptionThrown":
+                    self.on_exception_thrown(params)
+                if method in CONSOLE_EVENTS:
+                    retval.append(console_entry(method, params))
+            return sorted(retval, key=lambda row: row[0] or 0)
         for row in self.driver.get_log('browser'):
             retval.append((row['timestamp'], row['level'], row['message']))
         return retval
 
     def collect_network_requests(self, fetch_body_always=False):
+        # response bodies are attached as lazy handles, fetch_body_always is kept for compatibility
         retval = []
-        if "chrome" not in self.browser or not self.extra_logging:
+        if not self.has_cdp() or not self.extra_logging:
             return retval
-        # collect network logs
-        perfs = self.driver.get_log('performance')
-        for row in perfs:
-            if "message" in row.keys():
-                msg = json.loads(row['message'])['message']
-                if 'method' in msg.keys():
-                    if "Network.requestWillBeSent" == msg['method']:
-                        params = msg['params']
-                        timestamp = params['timestamp']
-                        requestId = str(params['requestId'])
-                        request = params['request']
-                        requestPostData = ""
-                        try:
-                            requestPostData = self.driver.execute_cdp_cmd('Network.getRequestPostData', {'requestId': requestId})
-                            if isinstance(requestPostData, dict):
-                                if "postData" in requestPostData:
-                                    requestPostData = requestPostData["postData"]
-
-                        except WebDriverException:
-                            pass
-                        retval.append((
-                            timestamp,
-                            requestId,
-                            "=>",
-                            request['method'],
-                            request['url'],
-                            str(requestPostData)
-                        ))
-                    if "Network.responseReceived" == msg['method']:
-                        params = msg['params']
-                        timestamp = params['timestamp']
-                        requestId = str(params['requestId'])
-                        response = params['response']
-                        status = response['status']
-                        statusText = response['statusText']
-                        body = ""
-                        if fetch_body_always or (status > 299 and status != 304):
-                            try:
-                                body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': requestId})
-                            except WebDriverException:
-                                pass
-                            if isinstance(body, dict):
-                                if "base64Encoded" in body:
-                                    if body["base64Encoded"]:
-                                        body = base64.b64decode(body["body"])
-                            if isinstance(body, dict):
-                                if "body" in body:
-                                    body = body["body"]
-                        retval.append((
-                            timestamp,
-                            requestId,
-                            "<=",
-                            str(status),
-                            statusText,
-                            str(body)
-                        ))
-        return retval
+        if self.events is not None:
+            return self.performance_log.dispatch(self.read_events("Network"))
+        return self.performance_log.feed(self.driver.get_log('performance'))
+
+    def on_request_will_be_sent(self, params):
+        requestId = str(params['requestId'])
+        request = params['request']
+        requestPostData = ""
+        if 'postData' in request:
+            requestPostData = request['postData']
+        elif request.get('hasPostData') and request['method'] not in ("GET", "HEAD"):
+            requestPostData = self.lazy_body(self.fetch_request_post_data, requestId)
+        return NetworkRequest(params['timestamp'], requestId, "=>", request['method'], request['url'], requestPostData)
+
+    def on_response_received(self, params):
+        requestId = str(params['requestId'])
+        response = params['response']
+        status = response['status']
+        body = self.lazy_body(self.fetch_response_body, requestId)
+        if status > 299 and status != 304:
+            # failed responses are always reported, fetch them while the browser is there
+            body.resolve()
+        return NetworkResponse(params['timestamp'], requestId, "<=", str(status), response['statusText'], body)
+
+    def lazy_body(self, fetch, requestId):
+        body = TauhkaLazyBody(lambda: fetch(requestId))
+        self.lazy_bodies.append(body)
+        return body
+
+    def network_cdp_cmd(self, cmd, cmd_args):
+        # without the performance log only the event stream connection has enabled Network,
+        # chromedriver's own session does not know the request ids
+        if self.events is not None:
+            try:
+                return self.events.call(cmd, cmd_args)
+            except TauhkaDevToolsError as e:
+                raise WebDriverException(str(e))
+        return self.driver.execute_cdp_cmd(cmd, cmd_args)
+
+    def fetch_request_post_data(self, requestId):
+        requestPostData = self.network_cdp_cmd('Network.getRequestPostData', {'requestId': requestId})
+        if isinstance(requestPostData, dict):
+            if "postData" in requestPostData:
+                requestPostData = requestPostData["postData"]
+        return requestPostData
+
+    def fetch_response_body(self, requestId):
+        body = self.network_cdp_cmd('Network.getResponseBody', {'requestId': requestId})
+        if isinstance(body, dict):
+            if "base64Encoded" in body:
+                if body["base64Encoded"]:
+                    body = base64.b64decode(body["body"])
+        if isinstance(body, dict):
+            if "body" in body:
+                body = body["body"]
+        return body
 
     def tearDown(self):
         if self.extra_logging:
-            self.console_logs += self.collect_javascript_console()
+            self.console_logs += dedupe_console(self.collect_javascript_console())
             self.network_logs += self.collect_network_requests()
 
         if self.end_test:
             self.end_test()
 
-        self.driver.quit()
+        if self.profiler:
+            self.profiler.__exit__(None, None, None)
+            self.profiler = None
+
+        if self.har:
+            self.network_logs += self.collect_network_requests()
+            self.har.unsubscribe()
+            self.har.save(artifact_filename(self.har_dir, self.id(), "network", "har"))
+
+        if self.heap_sampler:
+            self.heap_samples = self.heap_sampler.stop()
+            self.heap_sampler = None
+            self.report.emit_summary({
+                "type": "heap.samples",
+                "count": len(self.heap_samples),
+                "interval": self.heap_sample_interval,
+                "peak": self.heap_samples.peak(),
+                "slope": self.heap_samples.slope(),
+                "sparkline": self.heap_samples.sparkline(),
+            })
+
+        fixture_failure = None
+        if self.fixtures:
+            unmatched = self.fixtures.stop()
+            if unmatched:
+                self.report.emit_summary({"type": "fixtures.unmatched", "strict": self.fixture_strict, "requests": unmatched})
+                if self.fixture_strict:
+                    fixture_failure = "Requests not in the fixtures were failed: {requests}".format(requests=self.fixtures.describe_unmatched())
+            self.fixtures = None
+
+        if self.devtools_connection:
+            self.devtools_connection.close()
+            self.devtools_connection = None
+
+        if self.artifact_writer and self.has_failed():
+            self.capture_failure_artifacts()
+
+        if self.events is not None:
+            if any(self.events.dropped.values()):
+                self.report.emit_summary({"type": "events.dropped", "dropped": dict(self.events.dropped)})
+            self.events.close()
+            self.events = None
+
+        for body in self.lazy_bodies:
+            body.detach()
+        self.lazy_bodies = []
+        self.har = None
+
+        if self.session_pool:
+            session_pool.release(self.session_key(), self.driver, self.reset_driver())
+        else:
+            self.driver.quit()
         self.test_start_time = None
+        # raised only after the session has been released
+        if fixture_failure:
+            raise self.failureException(fixture_failure)
 
     def end_test(self):
         pass
@@ -475,38 +1131,77 @@ class TauhkaTestCase(unittest.TestCase):
         elem.send_keys(text)
         elem.send_keys(Keys.TAB)
 
+    def wait_for(self, condition, args, fallback, timeout=None):
+        # resolves in the browser as soon as the condition holds, the polling fallback
+        # takes over e.g. when the page navigates away during the wait
+        if timeout is None:
+            timeout = self.maximum_wait
+        if self.wait_strategy == "observer":
+            started = time.time()
+            try:
+                return self.browser_wait.until(condition, args, timeout)
+            except TimeoutException:
+                raise
+            except WebDriverException:
+                timeout = max(timeout - (time.time() - started), 0)
+        return fallback(timeout)
+
     def wait_until_visible(self, elem):
-        return self.wait.until(EC.visibility_of(elem))
+        return self.wait_for("visible", [elem], lambda timeout: WebDriverWait(self.driver, timeout).until(EC.visibility_of(elem)))
 
     def wait_until_visible_by_id(self, elemId):
-        return self.wait.until(EC.visibility_of(self.find_element(elemId)))
+        return self.wait_for(
+            "visible_by_id", [elemId],
+            lambda timeout: WebDriverWait(self.driver, timeout).until(EC.visibility_of(self.find_element(elemId))))
 
     def wait_until_hidden_by_id(self, elemId):
-        return self.wait.until(EC.invisibility_of_element_located((By.ID, elemId)))
+        return self.wait_for(
+            "hidden_by_id", [elemId],
+            lambda timeout: WebDriverWait(self.driver, timeout).until(EC.invisibility_of_element_located((By.ID, elemId))))
 
     def wait_until_window_title(self, title):
-        return self.wait.until(EC.title_is(title))
+        return self.wait_for("title_is", [title], lambda timeout: WebDriverWait(self.driver, timeout).until(EC.title_is(title)))
 
     def wait_until_window_title_contains(self, title):
-        return self.wait.until(EC.title_contains(title))
+        return self.wait_for("title_contains", [title], lambda timeout: WebDriverWait(self.driver, timeout).until(EC.title_contains(title)))
 
     def wait_until_located_by_id(self, elemId):
-        return self.wait.until(EC.presence_of_element_located((By.ID, elemId)))
+        return self.wait_for(
+            "located_by_id", [elemId],
+            lambda timeout: WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located((By.ID, elemId))))
 
     def wait_until_located_by_xpath(self, xpath):
-        return self.wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
+        return self.wait_for(
+            "located_by_xpath", [xpath],
+            lambda timeout: WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located((By.XPATH, xpath))))
 
     def wait_until_clickable_by_class(self, parent, class_name):
-        return WebDriverWait(parent, 10).until(EC.element_to_be_clickable((By.CLASS_NAME, class_name)))
+        return self.wait_for(
+            "clickable_by_class", [parent, class_name],
+            lambda timeout: WebDriverWait(parent, timeout).until(EC.element_to_be_clickable((By.CLASS_NAME, class_name))),
+            timeout=10)
 
     def wait_until_innerhtml(self, elemId, html):
-        return WebDriverWait(self.driver, 4).until(element_has_innerhtml((By.ID, elemId), html))
+        return self.wait_for(
+            "innerhtml", [elemId, html],
+            lambda timeout: WebDriverWait(self.driver, timeout).until(element_has_innerhtml((By.ID, elemId), html)),
+            timeout=4)
 
     def clear_text(self, elemId):
         self.find_element(elemId).clear()
 
+    def locate_element(self, locator):
+        return self.wait.until(EC.presence_of_element_located(locator))
+
+    def element_cache_for_page(self):
+        if self.cached_elements is not None:
+            return self.cached_elements
+        return TauhkaElementCache(self.locate_element)
+
     def find_element(self, elemId):
-        return self.wait.until(EC.presence_of_element_located((By.ID, elemId)))
+        if self.cached_elements is not None:
+            return self.cached_elements.element((By.ID, elemId))
+        return self.locate_element((By.ID, elemId))
 
     def find_element_by_id(self, elemId):
         return self.find_element(elemId)
@@ -526,7 +1221,15 @@ class TauhkaTestCase(unittest.TestCase):
     def find_element_by_class_name(self, classname):
         return self.driver.find_element_by_class_name(classname)
 
+    def query(self, spec, props=None):
+        # one execute_script round trip for all the elements in the spec
+        if not isinstance(spec, TauhkaQuery):
+            spec = TauhkaQuery(spec, props)
+        return spec.run(self.driver)
+
     def open_url(self, url):
+        if self.cached_elements is not None:
+            self.cached_elements.invalidate()
         self.driver.get(url)
 
     def get_url(self):
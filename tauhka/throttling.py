@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the network and CPU throttling profiles.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+# throughputs are bytes per second and latencies milliseconds, like in the DevTools presets
+THROTTLING_PROFILES = {
+    "slow-3G": {"network": {"latency": 2000, "downloadThroughput": 50000, "uploadThroughput": 50000}},
+    "3G": {"network": {"latency": 562.5, "downloadThroughput": 180000, "uploadThroughput": 84375}},
+    "4G": {"network": {"latency": 170, "downloadThroughput": 1125000, "uploadThroughput": 1125000}},
+    "offline": {"network": {"offline": True, "latency": 0, "downloadThroughput": 0, "uploadThroughput": 0}},
+    "slow-cpu-2x": {"cpu": 2},
+    "slow-cpu-4x": {"cpu": 4},
+    "slow-cpu-6x": {"cpu": 6},
+    "mobile": {"network": {"latency": 562.5, "downloadThroughput": 180000, "uploadThroughput": 84375}, "cpu": 4},
+}
+
+
+def throttling_settings(profile):
+    # several profiles can be combined, e.g. "3G,slow-cpu-4x"
+    settings = {}
+    for name in profile.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in THROTTLING_PROFILES:
+            raise ValueError("Unknown throttling profile {name}, available: {names}".format(name=name, names=", ".join(sorted(THROTTLING_PROFILES))))
+        settings.update(THROTTLING_PROFILES[name])
+    return settings
+
+
+def apply_throttling(driver, settings):
+    if "network" in settings:
+        conditions = {"offline": False}
+        conditions.update(settings["network"])
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.emulateNetworkConditions', conditions)
+    if "cpu" in settings:
+        driver.execute_cdp_cmd('Emulation.setCPUThrottlingRate', {'rate': settings["cpu"]})
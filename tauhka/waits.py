@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+################################################################
+# This contains the wait conditions evaluated in the browser.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+# ----
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+################################################################
+
+from selenium.common.exceptions import TimeoutException
+
+WAIT_STRATEGIES = ("observer", "poll")
+SCRIPT_TIMEOUT_MARGIN = 5
+# the webdriver default, selenium cannot read the current value back
+DEFAULT_SCRIPT_TIMEOUT = 30
+
+WAIT_SCRIPT = """
+var condition = arguments[0];
+var args = arguments[1];
+var timeout = arguments[2];
+var done = arguments[arguments.length - 1];
+function byId(elemId) { return document.getElementById(elemId); }
+function isVisible(elem) {
+    if (!elem.isConnected) { return false; }
+    var style = window.getComputedStyle(elem);
+    return !!(elem.offsetWidth || elem.offsetHeight || elem.getClientRects().length) && style.visibility != 'hidden' && style.display != 'none';
+}
+function visibleOrNull(elem) { return elem && isVisible(elem) ? elem : null; }
+var conditions = {
+    title_is: function() { return document.title == args[0]; },
+    title_contains: function() { return document.title.indexOf(args[0]) != -1; },
+    located_by_id: function() { return byId(args[0]); },
+    located_by_xpath: function() {
+        return document.evaluate(args[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    },
+    visible: function() { return visibleOrNull(args[0]); },
+    visible_by_id: function() { return visibleOrNull(byId(args[0])); },
+    hidden_by_id: function() { var elem = byId(args[0]); return !elem || !isVisible(elem); },
+    innerhtml: function() { var elem = byId(args[0]); return elem && elem.innerHTML.indexOf(args[1]) != -1 ? elem : null; },
+    clickable_by_class: function() {
+        var elem = visibleOrNull((args[0] || document).getElementsByClassName(args[1])[0]);
+        return elem && !elem.disabled ? elem : null;
+    }
+};
+var check = conditions[condition];
+var observer = null;
+var frame = null;
+var timer = null;
+var finished = false;
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    if (frame) { cancelAnimationFrame(frame); }
+    clearTimeout(timer);
+    done(result);
+}
+function poll() {
+    var value = check();
+    if (value) { finish({ok: true, value: value}); }
+    return finished;
+}
+if (!poll()) {
+    observer = new MutationObserver(poll);
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    // style and layout changes without a DOM mutation are seen on the next frame
+    var tick = function() { if (!poll()) { frame = requestAnimationFrame(tick); } };
+    frame = requestAnimationFrame(tick);
+    timer = setTimeout(function() { finish({ok: false}); }, timeout);
+}
+"""
+
+
+class TauhkaBrowserWait(object):
+    def __init__(self, driver, script_timeout=DEFAULT_SCRIPT_TIMEOUT):
+        self.driver = driver
+        self.script_timeout = script_timeout
+
+    def until(self, condition, args, timeout):
+        script_timeout = timeout + SCRIPT_TIMEOUT_MARGIN
+        previous = self.script_timeout
+        args = list(args)
+        try:
+            if script_timeout > previous:
+                self.driver.set_script_timeout(script_timeout)
+                self.script_timeout = script_timeout
+            result = self.driver.execute_async_script(WAIT_SCRIPT, condition, args, int(timeout * 1000))
+        finally:
+            # later scripts and the next test of a pooled session keep the old timeout
+            if self.script_timeout != previous:
+                self.driver.set_script_timeout(previous)
+                self.script_timeout = previous
+        if not result or not result.get("ok"):
+            raise TimeoutException("{condition} {args} did not hold in {timeout} seconds".format(condition=condition, args=args, timeout=timeout))
+        return result["value"]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+################################################################
+# This benchmark compares the WebDriver round trips and time of
+# per element lookups against a single batched query.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import os
+import time
+import unittest
+
+from tauhka.testcase import TauhkaTestCase
+
+INDEX_URL = "file://{path}".format(path=os.path.realpath(os.path.join(os.path.dirname(__file__), "../ui/src/index.html")))
+REPEAT_COUNT = int(os.environ.get("TAUHKA_BENCH_COUNT", 50))
+
+
+class BatchedQueryBenchmarkTest(TauhkaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.round_trips = 0
+        execute = self.driver.execute
+
+        def counting_execute(*args, **kwargs):
+            self.round_trips += 1
+            return execute(*args, **kwargs)
+
+        self.driver.execute = counting_execute
+        self.open_url(INDEX_URL)
+        self.wait_until_window_title("Hello World")
+
+    def check_one_by_one(self):
+        theform = self.find_element("theform")
+        afield = self.find_element_by_css("input[name=afield]")
+        formpost = self.find_element("formpost")
+        assert theform.is_displayed()
+        assert afield.is_displayed()
+        assert afield.get_attribute("value") == ""
+        assert formpost.get_attribute("innerHTML") == ""
+
+    def check_batched(self):
+        snapshot = self.query({
+            "theform": {"id": "theform", "props": ["visible"]},
+            "afield": {"css": "input[name=afield]", "props": ["visible", "value"]},
+            "formpost": {"id": "formpost", "props": ["innerHTML"]},
+        })
+        assert snapshot.theform.visible
+        assert snapshot.afield.visible
+        assert snapshot.afield.value == ""
+        assert snapshot.formpost.innerHTML == ""
+
+    def measure(self, check):
+        self.round_trips = 0
+        started = time.time()
+        for i in range(REPEAT_COUNT):
+            check()
+        total = time.time() - started
+        print("{name:18}\t{trips:8.1f}\t{ms:8.2f}".format(
+            name=check.__name__,
+            trips=self.round_trips / REPEAT_COUNT,
+            ms=total * 1000.0 / REPEAT_COUNT
+        ))
+
+    def test_compare(self):
+        print()
+        print("Running {count} repeats per strategy.".format(count=REPEAT_COUNT))
+        print("strategy          \tround trips\tms/check")
+        self.measure(self.check_one_by_one)
+        self.measure(self.check_batched)
+
+
+if __name__ == '__main__':
+    unittest.main()
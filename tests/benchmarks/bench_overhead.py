@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+################################################################
+# This benchmark measures the overhead of tauhka itself per
+# collected event and per monitor block on the fake driver.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import os
+import time
+import unittest
+
+from tauhka.testcase import TauhkaTestCase, TauhkaMemoryMonitor, TauhkaNetworkMonitor, TauhkaPerformanceMonitor
+
+EVENT_COUNT = int(os.environ.get("TAUHKA_BENCH_EVENTS", 10000))
+BLOCK_COUNT = int(os.environ.get("TAUHKA_BENCH_COUNT", 1000))
+URL = "http://bench.invalid/"
+
+
+class OverheadBenchmarkTest(TauhkaTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.browser = "fake"
+
+    def measure(self, name, count, fn):
+        round_trips = self.driver.round_trips()
+        started = time.perf_counter()
+        for i in range(count):
+            fn(i)
+        elapsed = self.last_elapsed = time.perf_counter() - started
+        print("{name:24}\t{per_item:10.2f} us\t{round_trips:8.2f}".format(
+            name=name,
+            per_item=elapsed / count * 1000000,
+            round_trips=(self.driver.round_trips() - round_trips) / count
+        ))
+
+    def collect_events(self, i):
+        self.network_logs += self.collect_network_requests()
+
+    def memory_block(self, i):
+        with TauhkaMemoryMonitor(testcase=self, description="memory", max_memory_diff=200):
+            pass
+
+    def fast_memory_block(self, i):
+        with TauhkaMemoryMonitor(testcase=self, description="memory", max_memory_diff=200, mode="fast"):
+            pass
+
+    def network_block(self, i):
+        expected_traffic = [{"request": ("GET", URL + str(i), ""), "response": ("200", "")}]
+        with TauhkaNetworkMonitor(testcase=self, description="network", network_events=expected_traffic):
+            self.driver.exchange("GET", URL + str(i))
+
+    def performance_block(self, i):
+        with TauhkaPerformanceMonitor(testcase=self, description="performance"):
+            pass
+
+    def test_overhead(self):
+        print()
+        print("measurement             \t  per item\tround trips")
+        # one request, response and loadingFinished row per exchange
+        for i in range(EVENT_COUNT // 3):
+            self.driver.exchange("GET", URL + str(i))
+        event_count = len(self.driver.logs["performance"])
+        self.measure("collected events", 1, self.collect_events)
+        print("{events} events in the log, {per_event:.2f} us per event".format(
+            events=event_count, per_event=self.last_elapsed / event_count * 1000000))
+        self.measure("TauhkaMemoryMonitor", BLOCK_COUNT, self.memory_block)
+        self.measure("  mode=fast", BLOCK_COUNT, self.fast_memory_block)
+        self.measure("TauhkaNetworkMonitor", BLOCK_COUNT, self.network_block)
+        self.measure("TauhkaPerformanceMonitor", BLOCK_COUNT, self.performance_block)
+
+
+if __name__ == '__main__':
+    unittest.main()
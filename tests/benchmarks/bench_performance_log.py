@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+################################################################
+# This benchmark feeds a recorded performance log through the
+# TauhkaPerformanceLogParser and compares it to decoding every row.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import sys
+import json
+import time
+import random
+
+from tauhka.perflog import TauhkaPerformanceLogParser, NetworkRequest, NetworkResponse
+
+ROW_COUNT = 100000
+
+
+def recorded_log(row_count, network_ratio=0.05):
+    # the shape of the rows chromedriver returns with the default tauhka perfLoggingPrefs
+    rng = random.Random(1)
+    rows = []
+    for i in range(row_count):
+        if rng.random() < network_ratio:
+            if i % 2:
+                message = {"method": "Network.requestWillBeSent", "params": {
+                    "requestId": str(i), "timestamp": i / 1000.0, "wallTime": 1580000000 + i / 1000.0,
+                    "request": {"method": "GET", "url": "http://127.0.0.1:8012/static/{i}.js".format(i=i), "headers": {"Accept": "*/*"}},
+                    "initiator": {"type": "parser"}, "type": "Script"}}
+            else:
+                message = {"method": "Network.responseReceived", "params": {
+                    "requestId": str(i - 1), "timestamp": i / 1000.0, "type": "Script",
+                    "response": {"status": 200, "statusText": "OK", "mimeType": "application/javascript",
+                                 "headers": {"Content-Type": "application/javascript"}, "timing": {"requestTime": i / 1000.0}}}}
+        else:
+            message = {"method": "Tracing.dataCollected", "params": {
+                "args": {"data": {"frame": "F1", "url": "http://127.0.0.1:8012/", "stackTrace": [{"functionName": "f", "lineNumber": i}] * 4}},
+                "cat": "devtools.timeline", "name": "FunctionCall", "ph": "X", "pid": 1, "tid": 2, "ts": i, "dur": 10}}
+        rows.append({"level": "INFO", "timestamp": i, "message": json.dumps({"message": message, "webview": "W1"})})
+    return rows
+
+
+def decode_every_row(rows):
+    records = []
+    for row in rows:
+        msg = json.loads(row['message'])['message']
+        if msg['method'] == "Network.requestWillBeSent":
+            params = msg['params']
+            records.append(NetworkRequest(params['timestamp'], params['requestId'], "=>", params['request']['method'], params['request']['url'], ""))
+        elif msg['method'] == "Network.responseReceived":
+            params = msg['params']
+            records.append(NetworkResponse(params['timestamp'], params['requestId'], "<=", str(params['response']['status']), "", ""))
+    return records
+
+
+def prefiltered(rows):
+    parser = TauhkaPerformanceLogParser()
+    parser.subscribe("Network.requestWillBeSent", lambda params: NetworkRequest(
+        params['timestamp'], params['requestId'], "=>", params['request']['method'], params['request']['url'], ""))
+    parser.subscribe("Network.responseReceived", lambda params: NetworkResponse(
+        params['timestamp'], params['requestId'], "<=", str(params['response']['status']), "", ""))
+    return parser.feed(rows)
+
+
+def measure(name, fn, rows):
+    started = time.perf_counter()
+    records = fn(rows)
+    elapsed = time.perf_counter() - started
+    print("{name:20}\t{elapsed:8.3f} s\t{per_row:8.2f} us/row\t{records} records".format(
+        name=name, elapsed=elapsed, per_row=elapsed / len(rows) * 1000000, records=len(records)))
+    return records
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # a json list of rows saved from driver.get_log('performance')
+        with open(sys.argv[1], "r") as fh:
+            rows = json.load(fh)
+    else:
+        rows = recorded_log(ROW_COUNT)
+    print("Feeding {count} performance log rows.".format(count=len(rows)))
+    expected = measure("json.loads every row", decode_every_row, rows)
+    records = measure("prefiltered parser", prefiltered, rows)
+    assert expected == records
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+################################################################
+# This benchmark compares the per test browser startup cost with
+# and without the TauhkaSessionPool.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import os
+import sys
+import time
+import unittest
+import statistics
+
+from tauhka.testcase import TauhkaTestCase
+
+INDEX_URL = "file://{path}".format(path=os.path.realpath(os.path.join(os.path.dirname(__file__), "../ui/src/index.html")))
+TEST_COUNT = int(os.environ.get("TAUHKA_BENCH_COUNT", 10))
+
+timings = []
+
+
+class StartupBenchmarkTest(TauhkaTestCase):
+    def setUp(self):
+        started = time.time()
+        super().setUp()
+        self.setup_time = time.time() - started
+
+    def tearDown(self):
+        started = time.time()
+        super().tearDown()
+        timings.append((self.setup_time, time.time() - started))
+
+    def test_open_page(self):
+        self.open_url(INDEX_URL)
+        self.wait_until_window_title("Hello World")
+
+
+def run_benchmark(scope):
+    del timings[:]
+    tests = []
+    for i in range(TEST_COUNT):
+        test = StartupBenchmarkTest("test_open_page")
+        test.session_pool = scope
+        tests.append(test)
+    started = time.time()
+    with open(os.devnull, "w") as devnull:
+        result = unittest.TextTestRunner(stream=devnull).run(unittest.TestSuite(tests))
+    StartupBenchmarkTest.tearDownClass()
+    total = time.time() - started
+    assert result.wasSuccessful(), "Benchmark tests failed: {errors}".format(errors=result.errors + result.failures)
+    setup_times = [entry[0] for entry in timings]
+    teardown_times = [entry[1] for entry in timings]
+    print("{scope:10}\t{total:8.3f}\t{setup_mean:8.3f}\t{setup_median:8.3f}\t{teardown_mean:8.3f}".format(
+        scope=str(scope),
+        total=total,
+        setup_mean=statistics.mean(setup_times),
+        setup_median=statistics.median(setup_times),
+        teardown_mean=statistics.mean(teardown_times)
+    ))
+
+
+if __name__ == '__main__':
+    print("Running {count} tests per configuration.".format(count=TEST_COUNT))
+    print("pool      \t   total\tsetUp avg\tsetUp med\ttearDown avg")
+    for scope in sys.argv[1:] or [None, "class"]:
+        run_benchmark(scope if scope != "None" else None)
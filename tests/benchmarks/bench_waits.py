@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+################################################################
+# This benchmark compares the overhead of the polling waits and
+# the waits resolved in the browser by a MutationObserver.
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright (c) 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import os
+import sys
+import time
+import unittest
+import statistics
+
+from tauhka.testcase import TauhkaTestCase
+
+INDEX_URL = "file://{path}".format(path=os.path.realpath(os.path.join(os.path.dirname(__file__), "../ui/src/index.html")))
+REPEAT_COUNT = int(os.environ.get("TAUHKA_BENCH_COUNT", 20))
+CHANGE_DELAY = 0.05
+
+CHANGE_SCRIPT = """
+var msg = arguments[0];
+setTimeout(function() { document.getElementById('formpost').innerHTML = msg; }, arguments[1]);
+"""
+
+
+class WaitBenchmarkTest(TauhkaTestCase):
+    def test_delayed_changes(self):
+        self.open_url(INDEX_URL)
+        self.wait_until_window_title("Hello World")
+        overheads = []
+        for i in range(REPEAT_COUNT):
+            msg = "Change {i}".format(i=i)
+            started = time.time()
+            self.driver.execute_script(CHANGE_SCRIPT, msg, int(CHANGE_DELAY * 1000))
+            self.wait_until_innerhtml("formpost", msg)
+            overheads.append(time.time() - started - CHANGE_DELAY)
+        print("{strategy:10}\t{total:8.3f}\t{mean:8.3f}\t{median:8.3f}\t{worst:8.3f}".format(
+            strategy=self.wait_strategy,
+            total=sum(overheads),
+            mean=statistics.mean(overheads),
+            median=statistics.median(overheads),
+            worst=max(overheads)
+        ))
+
+
+def run_benchmark(strategy):
+    test = WaitBenchmarkTest("test_delayed_changes")
+    test.wait_strategy = strategy
+    with open(os.devnull, "w") as devnull:
+        result = unittest.TextTestRunner(stream=devnull).run(test)
+    assert result.wasSuccessful(), "Benchmark tests failed: {errors}".format(errors=result.errors + result.failures)
+
+
+if __name__ == '__main__':
+    print("Running {count} waits per strategy, the page changes {delay} s after the wait starts.".format(count=REPEAT_COUNT, delay=CHANGE_DELAY))
+    print("strategy  \t   total\t    mean\t  median\t   worst")
+    for strategy in sys.argv[1:] or ["poll", "observer"]:
+        run_benchmark(strategy)
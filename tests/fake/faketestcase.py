@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains the test case base for the browserless tests
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import os
+
+from tauhka.testcase import TauhkaTestCase
+
+HELLO_URL = "http://hello.invalid/"
+
+
+class FakeTestCase(TauhkaTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.browser = "fake"
+        self.fake_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "hello.json")
+        self.time_adjust = 0
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains the browserless scenarios for the load mode tests
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+from selenium.common.exceptions import WebDriverException
+
+from faketestcase import FakeTestCase, HELLO_URL
+from tauhka.testcase import TauhkaMemoryMonitor, TauhkaNetworkMonitor
+
+
+class FakeLoadScenario(FakeTestCase):
+    def test_1_echo(self):
+        self.open_url(HELLO_URL)
+        expected_traffic = [
+            {
+                "request": ("POST", HELLO_URL + "echo", "payload=Hello"),
+                "response": ("200", "Hello")
+            }
+        ]
+        with TauhkaMemoryMonitor(testcase=self, description="echo memory", max_memory_diff=1024):
+            with TauhkaNetworkMonitor(testcase=self, description="echo", network_events=expected_traffic):
+                self.driver.exchange("POST", HELLO_URL + "echo", body="Hello", post_data="payload=Hello")
+
+    def test_2_fails(self):
+        assert False, "this scenario always fails"
+
+
+class FakeArtifactScenario(FakeTestCase):
+    def settle(self):
+        pass
+
+    def test_1_fails(self):
+        self.open_url(HELLO_URL)
+        self.driver.log_console("SEVERE", "something broke")
+        self.driver.exchange("GET", HELLO_URL + "data", body="[]")
+        self.settle()
+        assert False, "this scenario always fails"
+
+    def test_2_passes(self):
+        self.open_url(HELLO_URL)
+
+
+class FakeStreamedArtifactScenario(FakeArtifactScenario):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.event_stream = True
+
+    def settle(self):
+        # the stand-in server sends the events before the response of the next command
+        self.events.call("Runtime.getHeapUsage")
+
+
+class FakeReportScenario(FakeTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.report_always = True
+        self.log_buffer_size = 2
+
+    @unittest.skip("skipped before setUp")
+    def test_1_skipped(self):
+        pass
+
+    def test_2_overflows(self):
+        for i in range(5):
+            self.memory_logs.append((i, self.id(), "-", "-", "-", "row {i}".format(i=i), "-"))
+
+
+class FakeReplayScenario(FakeTestCase):
+    def test_1_requests(self):
+        for request_id, url in (("1", HELLO_URL + "data"), ("2", HELLO_URL + "missing")):
+            self.driver.emit("Fetch.requestPaused", {"requestId": request_id, "request": {"method": "GET", "url": url}}, log=False)
+        assert self.fixtures.served == 1
+
+
+class FakePooledScenario(FakeTestCase):
+    drivers = []
+
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.session_pool = "class"
+        self.session_max_uses = 0
+
+    def test_1_reuses(self):
+        self.drivers.append(self.driver)
+
+    def test_2_breaks_the_reset(self):
+        self.drivers.append(self.driver)
+
+        def fail(*args):
+            raise WebDriverException("reset failed")
+        self.driver.on_script("localStorage.clear", fail)
+
+    def test_3_gets_a_new_session(self):
+        self.drivers.append(self.driver)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka failure artifacts
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+import scenarios
+from tauhka.artifacts import TauhkaArtifactWriter, get_artifact_writer
+
+
+class ArtifactWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_1_writes_compressed_in_background(self):
+        writer = TauhkaArtifactWriter(self.directory)
+        filename = writer.submit(os.path.join(self.directory, "a.json"), lambda: json.dumps({"a": 1}))
+        writer.flush()
+        with gzip.open(filename, "rt") as fh:
+            assert json.load(fh) == {"a": 1}
+        writer.close()
+        assert writer.thread is None
+
+    def test_2_oldest_are_evicted_over_the_cap(self):
+        writer = TauhkaArtifactWriter(self.directory, max_bytes=250)
+        filenames = [writer.submit(os.path.join(self.directory, "{i}.bin".format(i=i)), b"x" * 100, compress=False) for i in range(4)]
+        writer.close()
+        assert writer.evicted == filenames[:2]
+        assert sorted(os.listdir(self.directory)) == ["2.bin", "3.bin"]
+        assert writer.total_bytes == 200
+
+
+class FailureArtifactTest(unittest.TestCase):
+    scenario = scenarios.FakeArtifactScenario
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_scenario(self, name):
+        test = self.scenario(name)
+        test.artifact_dir = self.directory
+        result = unittest.TestResult()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            test.run(result)
+        get_artifact_writer(self.directory).flush()
+        return test, out.getvalue()
+
+    def test_1_failure_is_captured(self):
+        test, out = self.run_scenario("test_1_fails")
+        files = test.report.summaries[-1]["files"]
+        assert list(files.keys()) == ["screenshot", "dom", "har", "console", "state"]
+        assert all(os.path.exists(filename) for filename in files.values())
+        with gzip.open(files["har"], "rt") as fh:
+            assert [entry["request"]["url"] for entry in json.load(fh)["log"]["entries"]][-1].endswith("/data")
+        with gzip.open(files["console"], "rt") as fh:
+            assert "something broke" in json.dumps(json.load(fh))
+        with gzip.open(files["state"], "rt") as fh:
+            assert json.load(fh)["heap"] == 1024 * 1024
+        assert "Failure artifacts:" in out
+
+    def test_2_passing_test_pays_nothing(self):
+        test, out = self.run_scenario("test_2_passes")
+        assert os.listdir(self.directory) == []
+        assert test.driver.commands["get_screenshot_as_png"] == 0
+        # no HAR is built, the raw events are only kept in a bounded buffer
+        assert test.har is None
+
+
+class StreamedFailureArtifactTest(FailureArtifactTest):
+    scenario = scenarios.FakeStreamedArtifactScenario
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka baselines
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from tauhka.baseline import TauhkaBaselineStore
+
+
+class BaselineStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "baseline.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record_runs(self, values, metric="memory_diff_kb"):
+        for i, value in enumerate(values):
+            store = TauhkaBaselineStore(self.filename, "run-{i}".format(i=i))
+            store.record("test_a", "open", metric, value)
+            store.close()
+
+    def test_1_history_excludes_the_current_run(self):
+        self.record_runs([10, 20, 30])
+        store = TauhkaBaselineStore(self.filename, "run-2")
+        assert store.history("test_a", "open", "memory_diff_kb") == [20, 10]
+        assert store.history("test_a", "other", "memory_diff_kb") == []
+        store.close()
+
+    def test_2_threshold(self):
+        self.record_runs([100, 102, 98, 101, 99, 100])
+        store = TauhkaBaselineStore(self.filename, "current")
+        # median 100, MAD 1, the relative spread of 5% is wider
+        assert store.threshold("test_a", "open", "memory_diff_kb", k=3) == 115
+        assert store.threshold("test_a", "open", "memory_diff_kb", k=3, min_samples=10) is None
+        store.close()
+
+    def test_3_threshold_of_zeros_has_a_floor(self):
+        self.record_runs([0, 0, 0, 0, 0])
+        store = TauhkaBaselineStore(self.filename, "current")
+        assert store.threshold("test_a", "open", "memory_diff_kb") == 1
+        assert store.threshold("test_a", "open", "memory_diff_kb", min_delta=16) == 16
+        store.close()
+
+    def test_4_compare_sorts_the_worst_first(self):
+        store = TauhkaBaselineStore(self.filename, "before")
+        store.record("test_a", "open", "duration", 1.0)
+        store.record("test_b", "open", "duration", 2.0)
+        store.record("test_c", "open", "duration", 0.0)
+        store.close()
+        store = TauhkaBaselineStore(self.filename, "after")
+        store.record("test_a", "open", "duration", 1.5)
+        store.record("test_b", "open", "duration", 1.0)
+        store.record("test_c", "open", "duration", 0.0)
+        store.record("test_d", "open", "duration", 9.0)
+        assert [run[0] for run in store.runs()] == ["before", "after"]
+        rows = store.compare("before", "after")
+        assert [row[0] for row in rows] == ["test_a", "test_c", "test_b"]
+        assert rows[0][3:] == (1.0, 1.5, 0.5, 1.5)
+        assert rows[1][-1] == 1.0
+        store.close()
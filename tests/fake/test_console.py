@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the TauhkaConsoleMonitor
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+from faketestcase import FakeTestCase, HELLO_URL
+from tauhka.testcase import TauhkaConsoleMonitor
+
+
+class FakeConsoleMonitorTest(FakeTestCase):
+    def settle(self):
+        pass
+
+    def test_1_repeated_messages_are_counted(self):
+        with TauhkaConsoleMonitor(testcase=self, description="storm") as monitor:
+            for i in range(1000):
+                self.driver.log_console("WARNING", "deprecated API")
+            self.driver.log_console("INFO", "done")
+            self.settle()
+        assert monitor.messages("WARNING")[0][2:] == ("deprecated API", 1000)
+        assert monitor.log.counts()["WARNING"] == 1000
+        assert len(self.console_logs) == 2
+        monitor.assert_no_severe()
+
+    def test_2_severe_budget(self):
+        with self.assertRaises(AssertionError):
+            with TauhkaConsoleMonitor(testcase=self, description="errors", budgets={"SEVERE": 0}, fail_on_issue=True) as monitor:
+                self.driver.log_console("SEVERE", "Failed to load resource: 500")
+                self.settle()
+        assert monitor.issues == {"SEVERE": (1, 0)}
+
+    def test_3_filters(self):
+        # the messages before the block are not counted
+        self.open_url(HELLO_URL)
+        self.settle()
+        with TauhkaConsoleMonitor(testcase=self, description="filtered", levels=["SEVERE"], ignore="favicon") as monitor:
+            self.driver.log_console("SEVERE", "GET /favicon.ico 404")
+            self.driver.log_console("WARNING", "slow")
+            self.settle()
+        monitor.assert_no_severe()
+        assert [row[2] for row in self.console_logs] == [
+            "page loaded", "Uncaught TypeError: undefined is not a function", "GET /favicon.ico 404", "slow"
+        ]
+
+    def test_4_exception_stack_traces(self):
+        with TauhkaConsoleMonitor(testcase=self, description="exception") as monitor:
+            self.driver.throw_exception("TypeError: x is undefined", [("render", HELLO_URL + "app.js", 10, 5), ("", HELLO_URL + "app.js", 2, 1)])
+            self.settle()
+        assert monitor.messages("SEVERE")[0][2] == "TypeError: x is undefined"
+        assert monitor.exceptions[0]["stack"] == [
+            "render ({url}app.js:10:5)".format(url=HELLO_URL),
+            "(anonymous) ({url}app.js:2:1)".format(url=HELLO_URL),
+        ]
+        with self.assertRaises(AssertionError):
+            monitor.assert_no_severe()
+
+
+class FakeStreamedConsoleMonitorTest(FakeConsoleMonitorTest):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.event_stream = True
+
+    def settle(self):
+        # the stand-in server sends the events before the response of the next command
+        self.events.call("Runtime.getHeapUsage")
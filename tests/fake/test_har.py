@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka HAR recorder
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import os
+import json
+import shutil
+import tempfile
+
+from faketestcase import FakeTestCase, HELLO_URL
+from tauhka.testcase import TauhkaNetworkMonitor
+
+REQUIRED_FIELDS = {
+    "entry": {"startedDateTime", "time", "request", "response", "cache", "timings"},
+    "request": {"method", "url", "httpVersion", "cookies", "headers", "queryString", "headersSize", "bodySize"},
+    "response": {"status", "statusText", "httpVersion", "cookies", "headers", "content", "redirectURL", "headersSize", "bodySize"},
+    "content": {"size", "mimeType"},
+    "timings": {"send", "wait", "receive"},
+}
+TIMING = {
+    "requestTime": 1000.0,
+    "dnsStart": 1, "dnsEnd": 3,
+    "connectStart": 3, "connectEnd": 10,
+    "sslStart": 5, "sslEnd": 10,
+    "sendStart": 11, "sendEnd": 12,
+    "receiveHeadersEnd": 40,
+}
+
+
+class FakeHarTest(FakeTestCase):
+    def emit_canned_traffic(self):
+        self.driver.bodies["canned.1"] = "Hello"
+        self.driver.emit("Network.requestWillBeSent", {
+            "requestId": "canned.1", "timestamp": 1000.0, "wallTime": 1546300800.0,
+            "request": {"method": "POST", "url": HELLO_URL + "echo?lang=fi&q=1", "headers": {"Content-Type": "text/plain"}, "postData": "a=1"},
+        })
+        self.driver.emit("Network.responseReceived", {
+            "requestId": "canned.1", "timestamp": 1000.04,
+            "response": {
+                "url": HELLO_URL + "echo?lang=fi&q=1", "status": 200, "statusText": "OK", "protocol": "http/1.1",
+                "headers": {"Content-Length": 5}, "mimeType": "text/plain", "remoteIPAddress": "127.0.0.1", "timing": TIMING,
+            },
+        })
+        self.driver.emit("Network.dataReceived", {"requestId": "canned.1", "timestamp": 1000.045, "dataLength": 3})
+        self.driver.emit("Network.dataReceived", {"requestId": "canned.1", "timestamp": 1000.046, "dataLength": 2})
+        self.driver.emit("Network.loadingFinished", {"requestId": "canned.1", "timestamp": 1000.05, "encodedDataLength": 105})
+        # a redirect keeps the request id, the second request fails
+        self.driver.emit("Network.requestWillBeSent", {
+            "requestId": "canned.2", "timestamp": 1001.0, "wallTime": 1546300801.0,
+            "request": {"method": "GET", "url": HELLO_URL + "old", "headers": {}},
+        })
+        self.driver.emit("Network.requestWillBeSent", {
+            "requestId": "canned.2", "timestamp": 1001.01, "wallTime": 1546300801.01,
+            "request": {"method": "GET", "url": HELLO_URL + "new", "headers": {}},
+            "redirectResponse": {"status": 302, "statusText": "Found", "headers": {"Location": HELLO_URL + "new"}},
+        })
+        self.driver.emit("Network.loadingFailed", {"requestId": "canned.2", "timestamp": 1001.02, "errorText": "net::ERR_FAILED"})
+
+    def record(self, har_file=None):
+        expected_traffic = [{"request": ("POST", HELLO_URL + "echo?lang=fi&q=1", "a=1"), "response": ("200", "Hello")}]
+        with TauhkaNetworkMonitor(testcase=self, description="har", network_events=expected_traffic,
+                                  record_har=True, har_file=har_file, har_bodies=True) as monitor:
+            self.emit_canned_traffic()
+        return monitor.har.har()
+
+    def test_1_required_fields(self):
+        har = self.record()
+        assert har["log"]["version"] == "1.2"
+        assert set(har["log"]["creator"].keys()) == {"name", "version"}
+        entries = har["log"]["entries"]
+        assert [(entry["request"]["method"], entry["request"]["url"]) for entry in entries] == [
+            ("POST", HELLO_URL + "echo?lang=fi&q=1"), ("GET", HELLO_URL + "old"), ("GET", HELLO_URL + "new")
+        ]
+        for entry in entries:
+            assert REQUIRED_FIELDS["entry"] <= set(entry.keys())
+            assert REQUIRED_FIELDS["request"] <= set(entry["request"].keys())
+            assert REQUIRED_FIELDS["response"] <= set(entry["response"].keys())
+            assert REQUIRED_FIELDS["content"] <= set(entry["response"]["content"].keys())
+            assert REQUIRED_FIELDS["timings"] <= set(entry["timings"].keys())
+
+    def test_2_entry(self):
+        entry = self.record()["log"]["entries"][0]
+        assert entry["startedDateTime"] == "2019-01-01T00:00:00Z"
+        assert entry["request"]["queryString"] == [{"name": "lang", "value": "fi"}, {"name": "q", "value": "1"}]
+        assert entry["request"]["postData"] == {"mimeType": "text/plain", "text": "a=1"}
+        assert entry["request"]["bodySize"] == 3
+        assert entry["response"]["status"] == 200
+        assert entry["response"]["headers"] == [{"name": "Content-Length", "value": "5"}]
+        assert entry["response"]["content"] == {"size": 5, "mimeType": "text/plain", "text": "Hello"}
+        assert entry["response"]["bodySize"] == 105
+        assert entry["serverIPAddress"] == "127.0.0.1"
+
+    def test_3_timings(self):
+        entry = self.record()["log"]["entries"][0]
+        timings = dict((name, round(value, 3)) for name, value in entry["timings"].items())
+        assert timings == {"blocked": 1, "dns": 2, "connect": 7, "ssl": 5, "send": 1, "wait": 28, "receive": 10}
+        # ssl is a part of connect
+        assert round(entry["time"], 3) == 49
+
+    def test_4_redirect_and_failure(self):
+        redirect, failed = self.record()["log"]["entries"][1:]
+        assert redirect["response"]["status"] == 302
+        assert redirect["response"]["redirectURL"] == HELLO_URL + "new"
+        assert failed["response"]["status"] == 0
+        assert failed["response"]["statusText"] == "net::ERR_FAILED"
+        assert failed["timings"] == {"blocked": -1, "dns": -1, "connect": -1, "ssl": -1, "send": 0, "wait": 0, "receive": 0}
+
+    def test_5_saved_har(self):
+        directory = tempfile.mkdtemp()
+        try:
+            har_file = os.path.join(directory, "test.har")
+            har = self.record(har_file)
+            with open(har_file, "r", encoding="utf-8") as fh:
+                assert json.load(fh) == har
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka heap snapshot parser
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import os
+import json
+import random
+import shutil
+import tempfile
+import unittest
+
+from tauhka.heapsnapshot import TauhkaJsonStream, TauhkaHeapSnapshotSummary, diff_heap_snapshots
+
+META = {
+    "node_fields": ["type", "name", "id", "self_size", "edge_count"],
+    "node_types": [["hidden", "object", "closure", "string"], "string", "number", "number", "number"],
+    "edge_fields": ["type", "name_or_index", "to_node"],
+    "edge_types": [["context", "element", "property", "weak"], "string_or_number", "node"],
+}
+STRINGS = ["", "Window", "Leäk", "a \"quoted\", [bracketed] string", "x", "y"]
+
+
+def heap_snapshot(leaks):
+    # a Window which holds a string and a chain of Leäk objects, with a weak edge which is not a retainer
+    nodes = [1, 1, 1, 10, 3]
+    edges = [2, 4, 5, 3, 5, 5, 2, 5, 5 * (leaks + 1)]
+    for index in range(leaks):
+        last = index == leaks - 1
+        nodes += [1, 2, 3 + 2 * index, 20, 0 if last else 1]
+        if not last:
+            edges += [2, 4, 5 * (index + 2)]
+    nodes += [3, 3, 99, 30, 0]
+    return json.dumps({
+        "snapshot": {"meta": META, "node_count": len(nodes) // 5, "edge_count": len(edges) // 3},
+        "nodes": nodes,
+        "edges": edges,
+        "strings": STRINGS,
+    }, ensure_ascii=False, indent=1)
+
+
+class ChunkedReader(object):
+    # returns the text in random 1-7 character pieces, whatever was asked
+    def __init__(self, text, seed):
+        self.fh = io.StringIO(text)
+        self.random = random.Random(seed)
+
+    def read(self, size):
+        return self.fh.read(self.random.randint(1, 7))
+
+
+class HeapSnapshotTest(unittest.TestCase):
+    def parse(self, text, seed=0):
+        summary = TauhkaHeapSnapshotSummary()
+        summary.parse(TauhkaJsonStream(ChunkedReader(text, seed), chunk_size=1))
+        return summary
+
+    def test_1_small_chunks(self):
+        for seed in range(20):
+            summary = self.parse(heap_snapshot(2), seed)
+            assert summary.objects == {"Window": [1, 10], "Leäk": [2, 40], "(string)": [1, 30]}
+            assert summary.retainers == {"Leäk": {"Window": 1, "Leäk": 1}, "(string)": {"Window": 1}}
+
+    def test_2_without_retainers(self):
+        summary = TauhkaHeapSnapshotSummary()
+        summary.parse(TauhkaJsonStream(ChunkedReader(heap_snapshot(3), 1), chunk_size=1), retainers=False)
+        assert summary.objects["Leäk"] == [3, 60]
+        assert summary.retainers == {}
+
+    def test_3_diff(self):
+        before = self.parse(heap_snapshot(1))
+        after = self.parse(heap_snapshot(3))
+        assert diff_heap_snapshots(before, after) == [("Leäk", 2, 40, [("Leäk", 2)])]
+        assert diff_heap_snapshots(after, before) == []
+        assert diff_heap_snapshots(before, before) == []
+
+    def test_4_from_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, "test.heapsnapshot")
+            with open(filename, "w", encoding="utf-8") as fh:
+                fh.write(heap_snapshot(2))
+            summary = TauhkaHeapSnapshotSummary.from_file(filename)
+        finally:
+            shutil.rmtree(directory)
+        assert summary.objects["Leäk"] == [2, 40]
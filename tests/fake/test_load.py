@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka load mode
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import os
+import unittest
+
+from tauhka.load import percentile, run_load, TauhkaLoadResult
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class PercentileTest(unittest.TestCase):
+    def test_1_nearest_rank(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([], 50) is None
+
+
+class LoadTest(unittest.TestCase):
+    def test_1_iterations_are_aggregated(self):
+        out = io.StringIO()
+        environ = dict(os.environ)
+        load = run_load("scenarios.FakeLoadScenario.test_1_echo", iterations=6, concurrency=3, ramp_up=0.1, start_dir=HERE, out=out)
+        # only the user processes are set up, the caller keeps its environment
+        assert dict(os.environ) == environ
+        assert len(load.iterations) == 6
+        assert sorted(iteration["iteration"] for iteration in load.iterations) == list(range(6))
+        assert load.statuses() == {"OK": 6}
+        assert len(set(iteration["user"] for iteration in load.iterations)) <= 3
+        assert load.throughput() > 0
+        stats = dict(((stat["description"], stat["metric"]), stat) for stat in load.stats())
+        assert stats[("iteration", "duration")]["count"] == 6
+        assert stats[("echo", "request_count")]["percentiles"]["p99"] == 1
+        assert ("echo", "duration") in stats
+        assert ("echo memory", "memory_diff_kb") in stats
+        assert "iterations/s" in out.getvalue()
+
+    def test_2_failures_are_reported(self):
+        out = io.StringIO()
+        load = run_load("scenarios.FakeLoadScenario.test_2_fails", iterations=2, concurrency=2, start_dir=HERE, out=out)
+        assert load.statuses() == {"FAILURE": 2}
+        assert "this scenario always fails" in out.getvalue()
+
+    def test_3_test_id_is_checked_before_the_users_start(self):
+        for test_id in ("scenarios.FakeLoadScenario", "scenarios.FakeLoadScenario.test_99_missing", "no_such_module.Test.test_1"):
+            with self.assertRaises(ValueError):
+                run_load(test_id, iterations=2, concurrency=2, start_dir=HERE, out=io.StringIO())
+
+    def test_4_report_without_iterations(self):
+        out = io.StringIO()
+        TauhkaLoadResult("scenarios.FakeLoadScenario.test_1_echo", 2, 0.0).print_report(out)
+        assert "0\t-\t-\t-\t-\t-\tduration\titeration" in out.getvalue()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka heap series and sampler
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+from selenium.common.exceptions import WebDriverException
+
+from tauhka.fake import TauhkaFakeDriver
+from tauhka.memory import TauhkaHeapSeries, TauhkaHeapSampler, SPARKLINE_CHARS
+
+
+def heap_series(values, interval=1.0):
+    series = TauhkaHeapSeries()
+    for i, value in enumerate(values):
+        series.append(i * interval, value)
+    return series
+
+
+class HeapSeriesTest(unittest.TestCase):
+    def test_1_slope_of_a_linear_series(self):
+        series = heap_series([1000 + 512 * i for i in range(10)], interval=0.5)
+        assert round(series.slope(), 6) == 1024
+        assert heap_series([5000] * 4).slope() == 0.0
+        assert heap_series([5000]).slope() == 0.0
+        assert TauhkaHeapSeries().slope() == 0.0
+
+    def test_2_slope_ignores_noise_around_the_trend(self):
+        series = heap_series([100, 300, 200, 400, 300, 500])
+        # least squares: covariance 1100 / variance 17.5
+        assert round(series.slope(), 6) == round(1100 / 17.5, 6)
+
+    def test_3_peak_and_last(self):
+        series = heap_series([3, 9, 4])
+        assert series.peak() == 9
+        assert series.last() == 4
+        assert len(series) == 3
+        assert TauhkaHeapSeries().peak() == 0
+        assert TauhkaHeapSeries().last() is None
+
+    def test_4_sparkline(self):
+        assert TauhkaHeapSeries().sparkline() == ""
+        assert heap_series([7, 7, 7]).sparkline() == SPARKLINE_CHARS[0] * 3
+        line = heap_series(range(len(SPARKLINE_CHARS))).sparkline()
+        assert line == SPARKLINE_CHARS
+        # longer series are bucketed by their maximum
+        line = heap_series([0, 0, 0, 10, 0, 0] * 20).sparkline(width=4)
+        assert line == SPARKLINE_CHARS[0] * 4
+        line = heap_series([0] * 60 + [10] * 60).sparkline(width=4)
+        assert line == SPARKLINE_CHARS[0] * 2 + SPARKLINE_CHARS[-1] * 2
+
+
+class HeapSamplerTest(unittest.TestCase):
+    def test_1_samples_at_start_and_stop(self):
+        driver = TauhkaFakeDriver({"heap": [1000, 3000]})
+        series = TauhkaHeapSampler(driver, interval=60).start().stop()
+        assert list(series.values) == [1000, 3000]
+        assert series.peak() == 3000
+        assert driver.gc_count == 0
+
+    def test_2_falls_back_to_performance_metrics(self):
+        driver = TauhkaFakeDriver({"heap": [1000, 2000, 3000]})
+
+        def unsupported(cmd_args):
+            raise WebDriverException("'Runtime.getHeapUsage' wasn't found")
+        driver.cdp_responses["Runtime.getHeapUsage"] = unsupported
+        sampler = TauhkaHeapSampler(driver, interval=60)
+        sampler.sample()
+        assert sampler.use_metrics
+        sampler.sample()
+        sampler.sample()
+        assert list(sampler.series.values) == [1000, 2000, 3000]
+
+    def test_3_failed_reads_are_skipped(self):
+        driver = TauhkaFakeDriver({"heap": [1000]})
+
+        def gone(cmd_args):
+            raise WebDriverException("session deleted")
+        sampler = TauhkaHeapSampler(driver, interval=60)
+        sampler.sample()
+        driver.cdp_responses["Runtime.getHeapUsage"] = gone
+        driver.cdp_responses["Performance.getMetrics"] = gone
+        sampler.sample()
+        assert list(sampler.series.values) == [1000]
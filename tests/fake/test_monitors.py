@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka monitors
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+from faketestcase import FakeTestCase, HELLO_URL
+from tauhka.memory import read_memory_usage
+from tauhka.testcase import TauhkaMemoryMonitor, TauhkaNetworkMonitor, TauhkaPerformanceMonitor
+
+
+class FakeMemoryMonitorTest(FakeTestCase):
+    def test_1_memory_diff_is_reported(self):
+        self.driver.heap_values.extend([1024 * 1024, 1024 * 1024 + 100 * 1024])
+        with TauhkaMemoryMonitor(testcase=self, description="grows 100 kB", max_memory_diff=200):
+            pass
+        row = self.memory_logs[-1]
+        assert row[4] == "100"
+        assert row[7] == "OK"
+        assert row[8] == "precise"
+        assert self.driver.gc_count == 2
+
+    def test_2_memory_issue(self):
+        self.driver.heap_values.extend([1024 * 1024, 1024 * 1024 + 300 * 1024])
+        with TauhkaMemoryMonitor(testcase=self, description="grows 300 kB", max_memory_diff=200):
+            pass
+        assert self.memory_logs[-1][7] == "MEMORY_ISSUE"
+
+    def test_3_fast_mode_does_not_collect_garbage(self):
+        with TauhkaMemoryMonitor(testcase=self, description="fast", max_memory_diff=200, mode="fast"):
+            pass
+        assert self.memory_logs[-1][8] == "fast"
+        assert self.driver.gc_count == 0
+
+    def test_4_fallback_mode_is_reported(self):
+        with TauhkaMemoryMonitor(testcase=self, description="sampled", max_memory_diff=200, mode="sampled"):
+            pass
+        assert self.memory_logs[-2][8] == "fast"
+        assert self.memory_logs[-1][8] == "fast"
+        assert self.recorded_metrics[-1][1] == "memory_diff_kb.fast"
+
+    def test_5_precise_falls_back_without_gc_and_cdp(self):
+        class NoGcDriver(object):
+            def execute_script(self, script):
+                return None if "window.gc" in script else 1024
+        assert read_memory_usage(NoGcDriver(), "precise") == (1024, "fast")
+        assert self.measure_memory("precise") == (1024 * 1024, "precise")
+
+
+class FakeNetworkMonitorTest(FakeTestCase):
+    def test_1_expected_traffic(self):
+        self.open_url(HELLO_URL)
+        expected_traffic = [
+            {
+                "request": ("POST", HELLO_URL + "echo", "payload=Hello"),
+                "response": ("200", "Hello")
+            }
+        ]
+        with TauhkaNetworkMonitor(testcase=self, description="echo", network_events=expected_traffic) as monitor:
+            self.driver.exchange("POST", HELLO_URL + "echo", body="Hello", post_data="payload=Hello")
+        assert monitor.matcher.is_complete()
+        # the page load before the monitor is in the log too
+        assert len(self.network_logs) == 6
+
+    def test_2_missing_traffic_fails(self):
+        expected_traffic = [{"request": ("GET", HELLO_URL + "missing")}]
+        with self.assertRaises(AssertionError):
+            with TauhkaNetworkMonitor(testcase=self, description="missing", network_events=expected_traffic, timeout=0.05):
+                self.driver.exchange("GET", HELLO_URL + "other")
+
+
+class FakePerformanceMonitorTest(FakeTestCase):
+    def test_1_cdp_metrics_are_diffed(self):
+        with TauhkaPerformanceMonitor(testcase=self, description="script") as monitor:
+            self.driver.metrics["ScriptDuration"] = 0.75
+        assert abs(monitor.metrics["ScriptDuration"] - 0.25) < 0.001
+        assert monitor.metrics["TaskDuration"] == 0
+
+    def test_2_budget_is_enforced(self):
+        with self.assertRaises(AssertionError):
+            with TauhkaPerformanceMonitor(testcase=self, description="script", budgets={"ScriptDuration": 0.1}, fail_on_issue=True):
+                self.driver.metrics["ScriptDuration"] = 1.0
+        issues = dict((row[2], row[7]) for row in self.perf_logs)
+        assert issues == {"ScriptDuration": "PERF_ISSUE", "TaskDuration": "OK", "duration": "OK"}
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka network matching
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+from selenium.common.exceptions import WebDriverException
+
+from tauhka.network import TauhkaNetworkMatcher, TauhkaBackoffWait, TauhkaLazyBody
+
+URL = "http://localhost:8080/"
+
+
+def request(request_id, method, url, post_data=None):
+    return (0, request_id, "=>", method, url, post_data)
+
+
+def response(request_id, status, body):
+    return (0, request_id, "<=", status, "OK", body)
+
+
+def expected(method, url, post_data, status, body):
+    return {"request": (method, url, post_data), "response": (status, body)}
+
+
+class NetworkMatcherTest(unittest.TestCase):
+    def test_1_ordered(self):
+        matcher = TauhkaNetworkMatcher([
+            expected("GET", URL + "a", None, "200", "A"),
+            expected("GET", URL + "b", None, "200", "B"),
+        ])
+        assert not matcher.feed([request("1", "GET", URL + "a"), response("1", "200", "A")])
+        assert matcher.matches == ["1", None]
+        assert matcher.feed([request("2", "GET", URL + "b"), response("2", "200", "B")])
+        assert matcher.matches == ["1", "2"]
+
+    def test_2_ordered_rejects_requests_out_of_order(self):
+        matcher = TauhkaNetworkMatcher([
+            expected("GET", URL + "a", None, "200", "A"),
+            expected("GET", URL + "b", None, "200", "B"),
+        ])
+        assert not matcher.feed([
+            request("1", "GET", URL + "b"), response("1", "200", "B"),
+            request("2", "GET", URL + "a"), response("2", "200", "A"),
+        ])
+        assert matcher.matches == ["2", None]
+        assert matcher.describe_unmatched() == "('GET', '{url}b', None) => ('200', 'B')".format(url=URL)
+        # a later request of b completes the sequence
+        assert matcher.feed([request("3", "GET", URL + "b"), response("3", "200", "B")])
+        assert matcher.matches == ["2", "3"]
+
+    def test_3_unordered_accepts_requests_out_of_order(self):
+        matcher = TauhkaNetworkMatcher([
+            expected("GET", URL + "a", None, "200", "A"),
+            expected("GET", URL + "b", None, "200", "B"),
+        ], ordered=False)
+        assert matcher.feed([
+            request("1", "GET", URL + "b"), response("1", "200", "B"),
+            request("2", "GET", URL + "a"), response("2", "200", "A"),
+        ])
+        assert matcher.matches == ["2", "1"]
+
+    def test_4_duplicate_keys(self):
+        for ordered in (True, False):
+            matcher = TauhkaNetworkMatcher([
+                expected("POST", URL + "echo", "payload=1", "200", "1"),
+                expected("POST", URL + "echo", "payload=2", "200", "2"),
+            ], ordered=ordered)
+            # the same request is never matched twice
+            assert not matcher.feed([request("1", "POST", URL + "echo", "payload=1"), response("1", "200", "1")])
+            assert not matcher.feed([request("2", "POST", URL + "echo", "payload=1"), response("2", "200", "1")])
+            assert matcher.matches == ["1", None]
+            assert matcher.feed([request("3", "POST", URL + "echo", "payload=2"), response("3", "200", "2")])
+            assert matcher.matches == ["1", "3"]
+            assert matcher.request_count() == 3
+
+    def test_5_response_arrives_later(self):
+        for ordered in (True, False):
+            matcher = TauhkaNetworkMatcher([expected("GET", URL, None, "200", "Hello")], ordered=ordered)
+            assert not matcher.feed([request("1", "GET", URL)])
+            assert matcher.feed([response("1", "200", "Hello")])
+
+    def test_6_only_the_request_is_expected(self):
+        matcher = TauhkaNetworkMatcher([{"request": ("GET", URL + "a", None)}], ordered=False)
+        assert not matcher.feed([request("1", "GET", URL + "b")])
+        assert matcher.unmatched() == [{"request": ("GET", URL + "a", None)}]
+        assert matcher.feed([request("2", "GET", URL + "a"), response("2", "404", "")])
+
+    def test_7_body_fetched_after_a_failure(self):
+        for ordered in (True, False):
+            matcher = TauhkaNetworkMatcher([expected("GET", URL, None, "200", "Hello")], ordered=ordered)
+            # the response is seen before loadingFinished, the first fetch fails
+            assert not matcher.feed([request("1", "GET", URL), response("1", "200", LateBody("Hello", failures=1))])
+            assert matcher.feed([])
+
+
+class LateBody(TauhkaLazyBody):
+    def __init__(self, body, failures):
+        self.calls = 0
+
+        def fetch():
+            self.calls += 1
+            if self.calls <= failures:
+                raise WebDriverException("No resource with given identifier found")
+            return body
+        super().__init__(fetch)
+
+
+class LazyBodyTest(unittest.TestCase):
+    def test_1_failed_fetch_is_retried(self):
+        body = LateBody("Hello", failures=2)
+        assert str(body) == ""
+        assert not body.is_resolved()
+        assert str(body) == ""
+        assert str(body) == "Hello"
+        assert str(body) == "Hello"
+        assert body.calls == 3
+
+    def test_2_detached_body_stays_empty(self):
+        body = LateBody("Hello", failures=1)
+        assert str(body) == ""
+        body.detach()
+        assert str(body) == ""
+        assert body.calls == 1
+
+
+class BackoffWaitTest(unittest.TestCase):
+    def test_1_intervals_grow_to_the_maximum(self):
+        sleeps = []
+        polls = []
+
+        def condition():
+            polls.append(1)
+            return len(polls) > 7
+        assert TauhkaBackoffWait(60, sleep=sleeps.append).until(condition)
+        assert [round(interval, 6) for interval in sleeps] == [0.01, 0.02, 0.04, 0.08, 0.16, 0.25, 0.25]
+
+    def test_2_no_sleep_when_the_condition_holds(self):
+        sleeps = []
+        assert TauhkaBackoffWait(60, sleep=sleeps.append).until(lambda: True)
+        assert sleeps == []
+
+    def test_3_timeout(self):
+        with self.assertRaises(AssertionError) as context:
+            TauhkaBackoffWait(0.05).until(lambda: False)
+        assert str(context.exception) == "Timed out after 0.05 seconds."
+        with self.assertRaises(AssertionError) as context:
+            TauhkaBackoffWait(0.05).until(lambda: False, message=lambda: "still waiting")
+        assert str(context.exception) == "still waiting"
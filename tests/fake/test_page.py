@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka page objects
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.remote.webelement import WebElement
+
+from tauhka.page import TauhkaElementCache
+
+
+class FakeParent(object):
+    # answers the element commands, the ids in stale_ids are from an old document
+    def __init__(self):
+        self.stale_ids = set()
+        self.commands = []
+
+    def execute(self, command, params):
+        self.commands.append((command, params["id"]))
+        if params["id"] in self.stale_ids:
+            raise StaleElementReferenceException("stale {id}".format(id=params["id"]))
+        return {"value": None}
+
+
+class CachedElementTest(unittest.TestCase):
+    def setUp(self):
+        self.parent = FakeParent()
+        self.found = []
+        self.cache = TauhkaElementCache(self.finder)
+
+    def finder(self, locator):
+        element = WebElement(self.parent, "element-{count}".format(count=len(self.found)))
+        self.found.append(locator)
+        return element
+
+    def test_1_serialized_as_a_web_element(self):
+        cached = self.cache.element((By.ID, "afield"))
+        assert isinstance(cached, WebElement)
+        # a WebDriver without a session is enough for the argument conversion of execute_script
+        wrapped = WebDriver.__new__(WebDriver)._wrap_value([cached])[0]
+        assert "element-0" in wrapped.values()
+        assert cached.id == "element-0"
+        assert cached == self.cache.element((By.ID, "afield"))
+
+    def test_2_stale_element_is_resolved_again(self):
+        cached = self.cache.element((By.ID, "afield"))
+        cached.click()
+        self.parent.stale_ids.add("element-0")
+        cached.click()
+        assert [element_id for command, element_id in self.parent.commands] == ["element-0", "element-0", "element-1"]
+        assert self.found == [(By.ID, "afield")] * 2
+        assert cached.id == "element-1"
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka performance log parser
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+
+from tauhka.fake import performance_row
+from tauhka.perflog import TauhkaPerformanceLogParser
+
+
+# a trace row which is not even json, decoding it would fail
+BROKEN_ROW = {"level": "INFO", "message": '{"message": {"method": "Tracing.dataCollected", broken'}
+
+
+class PerformanceLogParserTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = TauhkaPerformanceLogParser()
+        self.seen = []
+
+    def handler(self, name):
+        def handle(params):
+            self.seen.append((name, params))
+            return name
+        return handle
+
+    def test_1_unsubscribed_methods_are_not_decoded(self):
+        self.parser.subscribe("Network.requestWillBeSent", self.handler("request"))
+        rows = [
+            BROKEN_ROW,
+            performance_row("Network.dataReceived", {"requestId": "1"}),
+            performance_row("Network.requestWillBeSent", {"requestId": "1"}),
+            {"level": "INFO"},
+        ]
+        assert self.parser.feed(rows) == ["request"]
+        assert self.seen == [("request", {"requestId": "1"})]
+
+    def test_2_nothing_is_parsed_without_subscribers(self):
+        assert self.parser.feed([BROKEN_ROW]) == []
+
+    def test_3_every_handler_gets_the_params(self):
+        self.parser.subscribe("Network.responseReceived", self.handler("first"))
+        self.parser.subscribe("Network.responseReceived", self.handler("second"))
+        params = {"requestId": "2", "response": {"status": 200}}
+        assert self.parser.feed([performance_row("Network.responseReceived", params)]) == ["first", "second"]
+        assert self.seen == [("first", params), ("second", params)]
+
+    def test_4_unsubscribe(self):
+        first = self.handler("first")
+        second = self.handler("second")
+        self.parser.subscribe("Network.loadingFinished", first)
+        self.parser.subscribe("Network.loadingFinished", second)
+        row = performance_row("Network.loadingFinished", {"requestId": "3"})
+        self.parser.feed([row])
+        self.parser.unsubscribe("Network.loadingFinished", first)
+        self.parser.feed([row])
+        self.parser.unsubscribe("Network.loadingFinished", second)
+        # the method is not matched anymore, the row is skipped before decoding
+        assert self.parser.handlers == {}
+        assert self.parser.feed([row]) == []
+        assert [name for name, params in self.seen] == ["first", "second", "second"]
+        # unknown handlers are ignored
+        self.parser.unsubscribe("Network.loadingFinished", first)
+
+    def test_5_handlers_returning_none_add_no_records(self):
+        self.parser.subscribe("Network.requestWillBeSent", lambda params: None)
+        assert self.parser.feed([performance_row("Network.requestWillBeSent", {"requestId": "4"})]) == []
+
+    def test_6_dispatch_of_decoded_events(self):
+        self.parser.subscribe("Runtime.consoleAPICalled", self.handler("console"))
+        assert self.parser.dispatch([("Runtime.consoleAPICalled", {"type": "log"}), ("Log.entryAdded", {})]) == ["console"]
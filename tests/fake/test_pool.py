@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka session pool
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import unittest
+import contextlib
+
+import scenarios
+from tauhka.fake import TauhkaFakeDriver
+from tauhka.pool import TauhkaSessionPool
+
+
+class SessionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = TauhkaSessionPool()
+        self.created = []
+
+    def tearDown(self):
+        self.pool.close_all()
+
+    def factory(self):
+        self.created.append(TauhkaFakeDriver())
+        return self.created[-1]
+
+    def test_1_released_session_is_reused(self):
+        key = ("class", __name__, "A")
+        driver = self.pool.acquire(key, self.factory)
+        self.pool.release(key, driver)
+        assert self.pool.acquire(key, self.factory) is driver
+        # a busy session is not given out twice
+        other = self.pool.acquire(key, self.factory)
+        assert other is not driver
+        assert len(self.created) == 2
+        assert not driver.quit_called
+
+    def test_2_worn_out_session_is_replaced(self):
+        key = ("class", __name__, "A")
+        driver = self.pool.acquire(key, self.factory, max_uses=2)
+        self.pool.release(key, driver)
+        assert self.pool.acquire(key, self.factory, max_uses=2) is driver
+        self.pool.release(key, driver)
+        assert driver.quit_called
+        assert self.pool.acquire(key, self.factory, max_uses=2) is not driver
+        assert len(self.created) == 2
+
+    def test_3_unusable_session_is_quit(self):
+        key = ("class", __name__, "A")
+        driver = self.pool.acquire(key, self.factory)
+        self.pool.release(key, driver, reusable=False)
+        assert driver.quit_called
+        assert self.pool.acquire(key, self.factory) is not driver
+
+    def test_4_idle_sessions_of_other_modules_are_closed(self):
+        first_module = ("module", "test_a")
+        driver = self.pool.acquire(first_module, self.factory)
+        self.pool.release(first_module, driver)
+        class_key = ("class", "test_a", "A")
+        class_driver = self.pool.acquire(class_key, self.factory)
+        self.pool.release(class_key, class_driver)
+
+        other = self.pool.acquire(("module", "test_b"), self.factory)
+        assert other is not driver
+        assert driver.quit_called
+        # only the module scope is evicted
+        assert not class_driver.quit_called
+        assert self.pool.acquire(class_key, self.factory) is class_driver
+
+
+class PooledTestCaseTest(unittest.TestCase):
+    def test_1_failed_reset_replaces_the_session(self):
+        scenarios.FakePooledScenario.drivers = []
+        suite = unittest.TestSuite(scenarios.FakePooledScenario(name) for name in ("test_1_reuses", "test_2_breaks_the_reset", "test_3_gets_a_new_session"))
+        result = unittest.TestResult()
+        with contextlib.redirect_stdout(io.StringIO()):
+            suite.run(result)
+        assert result.wasSuccessful()
+        first, second, third = scenarios.FakePooledScenario.drivers
+        assert first is second
+        assert third is not second
+        assert second.quit_called
+        # tearDownClass closes the idle sessions of the class
+        assert third.quit_called
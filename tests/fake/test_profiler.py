@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka CPU profile summary
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+
+from tauhka.profiler import self_times, top_self_times
+
+APP_URL = "http://hello.invalid/app.js"
+
+
+def node(node_id, name, line=-1, url=""):
+    return {"id": node_id, "callFrame": {"functionName": name, "url": url, "lineNumber": line, "columnNumber": 0}}
+
+
+# render is sampled in two nodes, e.g. called from two places, the time deltas are in microseconds
+PROFILE = {
+    "nodes": [node(1, "(root)"), node(2, "(idle)"), node(3, "render", 9, APP_URL), node(4, "", 19, APP_URL), node(5, "render", 9, APP_URL)],
+    "samples": [3, 3, 4, 2, 5, 3],
+    "timeDeltas": [100, 1000, 2000, 500, 4000, 1500],
+}
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_1_next_delta_is_the_self_time_of_the_sample(self):
+        assert self_times(PROFILE) == {
+            ("render", APP_URL, 10): 4500,
+            ("(anonymous)", APP_URL, 20): 500,
+            ("(idle)", "", 0): 4000,
+        }
+
+    def test_2_top_self_times(self):
+        total, rows = top_self_times(PROFILE)
+        # idle time counts in the total but is not listed
+        assert total == 9.0
+        assert [row[:4] for row in rows] == [("render", APP_URL, 10, 4.5), ("(anonymous)", APP_URL, 20, 0.5)]
+        assert [round(row[4], 2) for row in rows] == [50.0, 5.56]
+        assert top_self_times(PROFILE, top=1)[1][0][0] == "render"
+
+    def test_3_empty_profile(self):
+        assert top_self_times({"nodes": [], "samples": [], "timeDeltas": []}) == (0.0, [])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka batched queries
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+from selenium.webdriver.common.by import By
+
+from tauhka.fake import TauhkaFakeDriver
+from tauhka.query import TauhkaQuery, QUERY_SCRIPT, DEFAULT_PROPERTIES, compile_spec
+
+
+class CompileSpecTest(unittest.TestCase):
+    def test_1_locators(self):
+        assert compile_spec("formpost") == {"by": "id", "value": "formpost", "props": list(DEFAULT_PROPERTIES)}
+        assert compile_spec((By.CSS_SELECTOR, "input[name=afield]"), ["value"]) == {"by": "css", "value": "input[name=afield]", "props": ["value"]}
+        assert compile_spec({"xpath": "//form", "props": ["visible", "attr:action"]}) == {"by": "xpath", "value": "//form", "props": ["visible", "attr:action"]}
+        # the props of the locator win over the shared ones
+        assert compile_spec({"name": "afield", "props": ["text"]}, ["value"])["props"] == ["text"]
+
+    def test_2_invalid_specs(self):
+        for locator, props in (({"id": "a", "css": "b"}, None), ({"link text": "a"}, None), ("a", ["color"])):
+            with self.assertRaises(ValueError):
+                compile_spec(locator, props)
+
+
+class QueryTest(unittest.TestCase):
+    def setUp(self):
+        self.driver = TauhkaFakeDriver()
+        self.scripts = []
+
+    def answer(self, result):
+        def run(specs):
+            self.scripts.append(specs)
+            return result
+        self.driver.on_script("var specs = arguments[0];", run)
+
+    def test_1_one_round_trip(self):
+        self.answer({
+            "formpost": {"exists": True, "innerHTML": "Hello", "visible": True},
+            "afield": {"exists": True, "value": "", "attr:name": "afield"},
+        })
+        snapshot = TauhkaQuery({
+            "formpost": {"id": "formpost", "props": ["innerHTML", "visible"]},
+            "afield": {"css": "input[name=afield]", "props": ["value", "attr:name"]},
+        }).run(self.driver)
+        assert self.driver.commands["execute_script"] == 1
+        assert self.scripts == [{
+            "formpost": {"by": "id", "value": "formpost", "props": ["innerHTML", "visible"]},
+            "afield": {"by": "css", "value": "input[name=afield]", "props": ["value", "attr:name"]},
+        }]
+        assert snapshot.formpost.innerHTML == "Hello"
+        assert snapshot["formpost"].visible
+        assert snapshot.afield.value == ""
+        assert snapshot.afield.attribute("name") == "afield"
+        assert sorted(snapshot) == ["afield", "formpost"]
+
+    def test_2_missing_element(self):
+        self.answer({"missing": {"exists": False}})
+        snapshot = TauhkaQuery({"missing": "missing"}).run(self.driver)
+        assert "missing" in snapshot
+        assert not snapshot.missing.exists
+        with self.assertRaises(AttributeError):
+            snapshot.missing.value
+        assert snapshot.missing.attribute("name") is None
+        assert not snapshot.missing.is_option_selected("Hello")
+
+    def test_3_props_not_in_the_snapshot(self):
+        self.answer({"formpost": {"exists": True, "innerHTML": "Hello"}, "selector": {"exists": True, "selected": ["Hello World"]}})
+        snapshot = TauhkaQuery({"formpost": ("id", "formpost"), "selector": "selector"}, ["innerHTML"]).run(self.driver)
+        with self.assertRaises(AttributeError):
+            snapshot.formpost.text
+        with self.assertRaises(AttributeError):
+            snapshot.nothing
+        assert snapshot.selector.is_option_selected("World")
+
+    def test_4_script_reads_every_known_prop(self):
+        for prop in ("visible", "value", "innerHTML", "text", "selected", "element", "attr:"):
+            assert "'{prop}'".format(prop=prop) in QUERY_SCRIPT
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka fixture replay
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+import scenarios
+from faketestcase import HELLO_URL
+from tauhka.replay import save_fixtures
+
+
+class FixtureReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fixture_file = os.path.join(self.directory, "fixtures.json")
+        save_fixtures(self.fixture_file, [{"method": "GET", "url": HELLO_URL + "data", "postData": "", "status": 200, "body": ""}])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_scenario(self, strict):
+        test = scenarios.FakeReplayScenario("test_1_requests")
+        test.fixture_file = self.fixture_file
+        test.fixture_strict = strict
+        result = unittest.TestResult()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            test.run(result)
+        unmatched = [record for record in test.report.summaries if record["type"] == "fixtures.unmatched"]
+        return result, unmatched, out.getvalue()
+
+    def test_1_unmatched_are_reported(self):
+        result, unmatched, out = self.run_scenario(strict=False)
+        assert result.wasSuccessful()
+        assert [(record["strict"], record["requests"]) for record in unmatched] == [(False, [("GET", HELLO_URL + "missing")])]
+        assert out == ""
+
+    def test_2_strict_fails_the_test(self):
+        result, unmatched, out = self.run_scenario(strict=True)
+        assert len(result.failures) == 1
+        assert "Requests not in the fixtures were failed: GET {url}missing".format(url=HELLO_URL) in result.failures[0][1]
+        assert unmatched[0]["strict"]
+        assert "Requests not in the fixtures, failed:" in out
+
+    def test_3_missing_fixture_file(self):
+        os.remove(self.fixture_file)
+        result, unmatched, out = self.run_scenario(strict=False)
+        assert len(result.errors) == 1
+        assert "Fixture file not found: {filename}".format(filename=self.fixture_file) in result.errors[0][1]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka reports
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+import scenarios
+from tauhka.report import TauhkaJsonlWriter, read_report, env_flag
+
+
+class ReportRenderingTest(unittest.TestCase):
+    def run_scenario(self, name):
+        test = scenarios.FakeReportScenario(name)
+        result = unittest.TestResult()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            test.run(result)
+        return test, result, out.getvalue()
+
+    def test_1_skipped_test_is_rendered(self):
+        test, result, out = self.run_scenario("test_1_skipped")
+        assert len(result.skipped) == 1
+        assert not result.errors
+        assert "Test status (scenarios.FakeReportScenario.test_1_skipped): OK." in out
+
+    def test_2_dropped_rows_are_reported(self):
+        test, result, out = self.run_scenario("test_2_overflows")
+        assert test.report.summaries[-1] == {"type": "logs.dropped", "dropped": {"memory": 3}, "test": test.id()}
+        assert "Log buffers overflowed, dropped rows: memory 3" in out
+
+
+class ReadReportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.records = [{"type": "status", "test": "test_{i}".format(i=i), "status": "OK"} for i in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_report(self, filename, compress, writers=1):
+        filename = os.path.join(self.directory, filename)
+        per_writer = len(self.records) // writers
+        for i in range(writers):
+            writer = TauhkaJsonlWriter(filename, compress)
+            writer.write(self.records[i * per_writer:(i + 1) * per_writer])
+            if i < writers - 1:
+                writer.close()
+        # the last writer is left open like after a crash, only the flushed data is on disk
+        return filename, writer
+
+    def test_1_gzip_without_trailer(self):
+        filename, writer = self.write_report("crash.jsonl.gz", True)
+        with open(filename, "rb") as fh:
+            data = fh.read()
+        truncated = os.path.join(self.directory, "truncated.jsonl.gz")
+        with open(truncated, "wb") as fh:
+            fh.write(data)
+        writer.close()
+        with self.assertRaises(EOFError):
+            with gzip.open(truncated, "rt") as fh:
+                fh.read()
+        assert list(read_report(truncated)) == self.records
+
+    def test_2_truncated_anywhere(self):
+        filename, writer = self.write_report("report.jsonl.gz", True, writers=2)
+        writer.close()
+        assert list(read_report(filename)) == self.records
+        with open(filename, "rb") as fh:
+            data = fh.read()
+        for size in range(0, len(data), 7):
+            truncated = os.path.join(self.directory, "truncated-{size}.jsonl.gz".format(size=size))
+            with open(truncated, "wb") as fh:
+                fh.write(data[:size])
+            records = list(read_report(truncated))
+            assert records == self.records[:len(records)]
+
+    def test_3_partial_plain_line(self):
+        filename, writer = self.write_report("report.jsonl", False)
+        writer.close()
+        with open(filename, "a", encoding="utf-8") as fh:
+            fh.write('{"type": "sta')
+        assert list(read_report(filename)) == self.records
+
+
+class EnvFlagTest(unittest.TestCase):
+    def tearDown(self):
+        os.environ.pop("TAUHKA_TEST_FLAG", None)
+
+    def test_1_values(self):
+        assert not env_flag("TAUHKA_TEST_FLAG")
+        assert env_flag("TAUHKA_TEST_FLAG", True)
+        for value in ("1", "true", "Yes", " TRUE "):
+            os.environ["TAUHKA_TEST_FLAG"] = value
+            assert env_flag("TAUHKA_TEST_FLAG")
+        for value in ("", "0", "false", "no", "off"):
+            os.environ["TAUHKA_TEST_FLAG"] = value
+            assert not env_flag("TAUHKA_TEST_FLAG", True)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka runner
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+
+from tauhka.runner import run, run_shard
+from tauhka.baseline import TauhkaBaselineStore
+
+BROKEN_MODULE = """
+import nonexistent_module_xyz
+"""
+
+POOLED_MODULE = """
+import os
+from faketestcase import FakeTestCase, HELLO_URL
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class PooledTest(FakeTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.session_pool = "process"
+
+    def create_driver(self):
+        driver = super().create_driver()
+        quit = driver.quit
+
+        def quit_and_mark():
+            open(os.path.join(HERE, "quit-{pid}".format(pid=os.getpid())), "a").close()
+            quit()
+        driver.quit = quit_and_mark
+        return driver
+
+    def test_1_open(self):
+        self.open_url(HELLO_URL)
+
+    def test_2_open(self):
+        self.open_url(HELLO_URL)
+"""
+
+BASELINE_MODULE = """
+from faketestcase import FakeTestCase
+
+
+class FirstBaselineTest(FakeTestCase):
+    def test_1_record(self):
+        self.record_baseline("first", "duration", 1.0)
+
+
+class SecondBaselineTest(FakeTestCase):
+    def test_1_record(self):
+        self.record_baseline("second", "duration", 2.0)
+"""
+
+PLAIN_MODULE = """
+import os
+import unittest
+
+
+class PlainTest(unittest.TestCase):
+    def test_1_pass(self):
+        print("plain test in", os.getpid())
+
+    def test_2_fail(self):
+        self.fail("plain failure")
+"""
+
+
+class RunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.environ = dict(os.environ)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.directory)
+
+    def write_module(self, name, source):
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as fh:
+            fh.write(source)
+
+    def run_directory(self, workers=1):
+        out = io.StringIO()
+        ok = run(self.directory, workers=workers, durations_file=os.path.join(self.directory, "durations.json"), out=out)
+        return ok, out.getvalue()
+
+    def test_1_import_error_fails_the_run(self):
+        self.write_module("test_broken.py", BROKEN_MODULE)
+        self.write_module("test_runner_ok.py", POOLED_MODULE)
+        ok, out = self.run_directory()
+        assert not ok
+        assert "nonexistent_module_xyz" in out
+        assert "FAILED (failures=1)" in out
+
+    def test_2_workers_clean_up(self):
+        self.write_module("test_runner_pooled.py", POOLED_MODULE)
+        os.environ["TAUHKA_REPORT_FILE"] = os.path.join(self.directory, "report-{pid}.jsonl")
+        os.environ["TAUHKA_REPORT_GZIP"] = "1"
+        ok, out = self.run_directory()
+        assert ok, out
+        files = os.listdir(self.directory)
+        # the pooled session is quit once, after both tests of the shard
+        assert len([name for name in files if name.startswith("quit-")]) == 1
+        reports = [name for name in files if name.startswith("report-")]
+        assert len(reports) == 1
+        with gzip.open(os.path.join(self.directory, reports[0]), "rt", encoding="utf-8") as fh:
+            statuses = [record["status"] for record in map(json.loads, fh) if record["type"] == "status"]
+        assert statuses == ["OK", "OK"]
+
+    def test_3_workers_share_the_run_id(self):
+        self.write_module("test_runner_baseline.py", BASELINE_MODULE)
+        os.environ.pop("TAUHKA_RUN_ID", None)
+        os.environ["TAUHKA_BASELINE_DB"] = os.path.join(self.directory, "baseline.sqlite")
+        ok, out = self.run_directory(workers=2)
+        assert ok, out
+        store = TauhkaBaselineStore(os.environ["TAUHKA_BASELINE_DB"])
+        runs = store.runs()
+        store.close()
+        # the run id is made in the parent process
+        assert [run[0].endswith("-{pid}".format(pid=os.getpid())) for run in runs] == [True]
+        assert runs[0][2] == 2
+        assert "TAUHKA_RUN_ID" not in os.environ
+
+    def test_4_artifact_cap_is_split(self):
+        os.environ["TAUHKA_ARTIFACT_MAX_MB"] = "200"
+        run_shard(("empty", [], 50.0))
+        assert os.environ["TAUHKA_ARTIFACT_MAX_MB"] == "50.0"
+
+    def test_5_plain_tests_run_in_the_parent(self):
+        self.write_module("test_runner_plain.py", PLAIN_MODULE)
+        self.write_module("test_runner_mixed.py", POOLED_MODULE)
+        ok, out = self.run_directory()
+        assert not ok
+        assert "plain test in {pid}".format(pid=os.getpid()) in out
+        assert "plain failure" in out
+        assert "test_runner_plain.PlainTest.test_1_pass" in out
+        assert "Ran 4 tests in 1 classes with 1 workers and 2 plain tests in the runner process: FAILED (failures=1)" in out
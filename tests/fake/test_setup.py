@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka test setup
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import io
+import unittest
+import contextlib
+
+import scenarios
+from tauhka.fake import TauhkaFakeDriver
+from tauhka.devtools import TauhkaDevToolsError
+
+
+class FailingSetUpTest(unittest.TestCase):
+    def run_with(self, **settings):
+        test = scenarios.FakeLoadScenario("test_1_echo")
+        for name, value in settings.items():
+            setattr(test, name, value)
+        drivers = []
+
+        def create_driver():
+            drivers.append(TauhkaFakeDriver.from_file(test.fake_script))
+            return drivers[-1]
+        test.create_driver = create_driver
+        result = unittest.TestResult()
+        with contextlib.redirect_stdout(io.StringIO()):
+            test.run(result)
+        assert not result.wasSuccessful()
+        # no browser is left running
+        assert all(driver.quit_called for driver in drivers)
+        return drivers
+
+    def test_1_wait_strategy(self):
+        assert self.run_with(wait_strategy="bogus") == []
+
+    def test_2_memory_mode(self):
+        assert self.run_with(memory_mode="bogus") == []
+
+    def test_3_throttling_profile(self):
+        assert self.run_with(throttling_profile="5G") == []
+
+    def test_4_fixture_mode(self):
+        assert self.run_with(fixture_file="fixtures.json", fixture_mode="bogus") == []
+
+    def test_5_failure_after_the_browser_is_started(self):
+        def start_fixtures():
+            raise TauhkaDevToolsError("Fetch.enable failed")
+        drivers = self.run_with(event_stream=True, fixture_file="fixtures.json", start_fixtures=start_fixtures)
+        assert len(drivers) == 1
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka soak monitor
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+from faketestcase import FakeTestCase
+from tauhka.testcase import TauhkaSoakMonitor
+
+
+class FakeSoakMonitorTest(FakeTestCase):
+    def leak(self, size):
+        self.driver.heap_value += size
+
+    def test_1_stable_heap_passes(self):
+        series = self.with_soak("stable", lambda: None, iterations=100)
+        assert len(series) == 100
+        assert self.memory_logs[-1][7] == "OK"
+        assert self.report.summaries[-1]["slope"] == 0
+
+    def test_2_leak_is_flagged(self):
+        with self.assertRaises(AssertionError):
+            self.with_soak("leaks 10 kB", lambda: self.leak(10 * 1024), iterations=50, max_slope=5)
+        assert self.memory_logs[-1][7] == "MEMORY_LEAK"
+
+    def test_3_one_off_allocation_is_not_a_leak(self):
+        monitor = TauhkaSoakMonitor(testcase=self, description="one-off", iterations=200, max_slope=5, warmup=1)
+        monitor.run(lambda: self.leak(0 if len(monitor.series) else 1024 * 1024))
+        assert monitor.result == "OK"
+
+    def test_4_duration(self):
+        monitor = TauhkaSoakMonitor(testcase=self, description="duration", duration=0.05)
+        monitor.run(self.leak, 1024)
+        assert len(monitor.series) > 1
+        assert abs(monitor.slope - 1024) < 1
+        assert monitor.series.values.typecode == "q"
+
+    def test_5_modes_are_kept_once(self):
+        monitor = TauhkaSoakMonitor(testcase=self, description="modes", iterations=100)
+        monitor.run(lambda: None)
+        assert monitor.measured_modes == {self.memory_mode}
+        assert self.memory_logs[-1][8] == self.memory_mode
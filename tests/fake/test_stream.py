@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the TauhkaEventStream
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+from selenium.common.exceptions import WebDriverException
+from faketestcase import FakeTestCase, HELLO_URL
+from tauhka.network import TauhkaBackoffWait
+from tauhka.testcase import TauhkaNetworkMonitor
+
+
+class FakeEventStreamTest(FakeTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.event_stream = True
+
+    def collect_until(self, collect, count):
+        records = []
+
+        def collected():
+            records.extend(collect())
+            return len(records) >= count
+        TauhkaBackoffWait(1).until(collected)
+        return records
+
+    def test_1_events_are_streamed(self):
+        assert self.events is not None
+        self.open_url(HELLO_URL)
+
+        records = self.collect_until(self.collect_network_requests, 4)
+        assert [record.url for record in records[::2]] == [HELLO_URL, HELLO_URL + "data.json"]
+        assert str(records[3].body) == "{}"
+
+        console = self.collect_until(self.collect_javascript_console, 2)
+        assert [row[1:] for row in console] == [("INFO", "page loaded"), ("SEVERE", "Uncaught TypeError: undefined is not a function")]
+
+        # nothing is polled from the driver logs
+        assert self.driver.commands["get_log"] == 0
+
+    def test_2_network_monitor_reads_the_stream(self):
+        expected_traffic = [
+            {
+                "request": ("POST", HELLO_URL + "echo", "payload=Hello"),
+                "response": ("200", "Hello")
+            }
+        ]
+        with TauhkaNetworkMonitor(testcase=self, description="echo", network_events=expected_traffic) as monitor:
+            self.driver.exchange("POST", HELLO_URL + "echo", body="Hello", post_data="payload=Hello")
+        assert monitor.matcher.is_complete()
+
+    def test_3_bodies_are_fetched_through_the_stream(self):
+        self.driver.exchange("POST", HELLO_URL + "echo", body="Hello", post_data="payload=Hello")
+        records = self.collect_until(self.collect_network_requests, 2)
+        # chromedriver's own session has not enabled Network without the performance log
+        with self.assertRaises(WebDriverException):
+            self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": records[1].request_id})
+        assert str(records[0].post_data) == "payload=Hello"
+        assert str(records[1].body) == "Hello"
+
+    def test_4_one_debugger_connection(self):
+        # the fixtures and heap snapshots share the connection of the stream
+        assert self.devtools() is self.events.devtools
+        assert self.devtools().call("Runtime.getHeapUsage")["usedSize"] > 0
+        assert len(self.driver.devtools_server.clients) == 1
+        assert self.driver.devtools_connections == []
+
+
+class FakeEventStreamOverflowTest(FakeTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.event_stream = True
+        self.log_buffer_size = 3
+
+    def test_1_ring_buffer_drops_the_oldest_events(self):
+        self.driver.exchange("GET", HELLO_URL + "first")
+        self.driver.exchange("GET", HELLO_URL + "second")
+        TauhkaBackoffWait(1).until(lambda: self.events.dropped["Network"] == 3)
+        records = self.collect_network_requests()
+        assert len(records) == 2
+        assert records[0].url == HELLO_URL + "second"
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the TauhkaTestCase
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+from faketestcase import FakeTestCase, HELLO_URL
+from selenium.common.exceptions import WebDriverException
+from tauhka.perflog import NetworkRequest, NetworkResponse
+from tauhka.waits import WAIT_SCRIPT, DEFAULT_SCRIPT_TIMEOUT
+
+
+class FakeTestCaseTest(FakeTestCase):
+    def test_1_open_url_replays_the_page(self):
+        self.open_url(HELLO_URL)
+        self.wait_until_window_title("Hello Fake")
+        assert self.get_url() == HELLO_URL
+
+        records = self.collect_network_requests()
+        assert [type(record) for record in records] == [NetworkRequest, NetworkResponse] * 2
+        assert records[2].url == HELLO_URL + "data.json"
+        assert records[3].status == "200"
+        assert str(records[3].body) == "{}"
+
+        console = self.collect_javascript_console()
+        assert [row[1] for row in console] == ["INFO", "SEVERE"]
+
+    def test_2_logs_are_drained(self):
+        self.open_url(HELLO_URL)
+        assert len(self.collect_network_requests()) == 4
+        assert self.collect_network_requests() == []
+        assert self.collect_javascript_console()
+        assert self.collect_javascript_console() == []
+
+    def test_3_capabilities(self):
+        assert self.has_cdp()
+        assert self.has_devtools()
+
+    def test_4_reset_driver(self):
+        self.open_url(HELLO_URL)
+        assert self.reset_driver()
+        assert self.get_url() == "about:blank"
+        assert self.collect_network_requests() == []
+
+    def test_5_wait_restores_the_script_timeout(self):
+        self.open_url(HELLO_URL)
+        self.wait_for("title_is", ["Hello Fake"], None, timeout=60)
+        assert self.driver.commands["set_script_timeout"] == 2
+        assert self.driver.script_timeout == DEFAULT_SCRIPT_TIMEOUT
+
+        def navigated(*args):
+            assert self.driver.script_timeout == 65
+            raise WebDriverException("javascript error: document unloaded while waiting for result")
+        self.driver.on_script(WAIT_SCRIPT, navigated)
+        with self.assertRaises(WebDriverException):
+            self.browser_wait.until("title_is", ["Hello Fake"], 60)
+        assert self.driver.script_timeout == DEFAULT_SCRIPT_TIMEOUT
+
+    def test_6_short_wait_keeps_the_script_timeout(self):
+        self.open_url(HELLO_URL)
+        self.wait_for("title_is", ["Hello Fake"], None, timeout=10)
+        assert self.driver.commands["set_script_timeout"] == 0
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+################################################################
+# This file contains browserless tests for the Tauhka throttling profiles
+#
+# This file is part of Tauhka project.
+#
+# Author(s):
+#     Juhapekka Piiroinen <juhapekka.piiroinen@csc.fi>
+#
+# Copyright 2019 CSC - IT Center for Science Ltd.
+# All Rights Reserved.
+################################################################
+
+import unittest
+
+from tauhka.fake import TauhkaFakeDriver
+from tauhka.throttling import THROTTLING_PROFILES, throttling_settings, apply_throttling
+
+
+class ThrottlingTest(unittest.TestCase):
+    def test_1_profiles_are_combined(self):
+        assert throttling_settings("3G, slow-cpu-4x") == {"network": THROTTLING_PROFILES["3G"]["network"], "cpu": 4}
+        assert throttling_settings("slow-cpu-2x,") == {"cpu": 2}
+        assert throttling_settings("") == {}
+
+    def test_2_later_profiles_win(self):
+        assert throttling_settings("mobile,slow-cpu-6x") == {"network": THROTTLING_PROFILES["mobile"]["network"], "cpu": 6}
+        assert throttling_settings("4G,slow-3G")["network"] == THROTTLING_PROFILES["slow-3G"]["network"]
+
+    def test_3_unknown_profile(self):
+        with self.assertRaises(ValueError) as context:
+            throttling_settings("3G,5G")
+        assert str(context.exception).startswith("Unknown throttling profile 5G, available: 3G, 4G,")
+
+    def test_4_apply(self):
+        driver = TauhkaFakeDriver()
+        applied = []
+        for cmd in ("Network.emulateNetworkConditions", "Emulation.setCPUThrottlingRate"):
+            driver.cdp_responses[cmd] = lambda cmd_args, cmd=cmd: applied.append((cmd, cmd_args)) or {}
+        apply_throttling(driver, throttling_settings("offline,slow-cpu-4x"))
+        assert applied == [
+            ("Network.emulateNetworkConditions", {"offline": True, "latency": 0, "downloadThroughput": 0, "uploadThroughput": 0}),
+            ("Emulation.setCPUThrottlingRate", {"rate": 4}),
+        ]
+        applied[:] = []
+        apply_throttling(driver, throttling_settings("3G"))
+        assert applied[0][1]["offline"] is False
@@ -12,6 +12,8 @@
 # All Rights Reserved.
 ################################################################
 
+import os
+
 from tauhka.testcase import TauhkaTestCase
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
@@ -24,3 +26,25 @@ class HelloWorldTestCaseReportAlways(TauhkaTestCase):
 
 class HelloWorldTestCase(TauhkaTestCase):
     pass
+
+
+class HelloWorldPooledTestCase(TauhkaTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.session_pool = "class"
+        self.session_max_uses = 2
+
+
+class HelloWorldThrottledTestCase(TauhkaTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.throttling_profile = "3G,slow-cpu-4x"
+        self.report_always = True
+
+
+class HelloWorldReplayTestCase(TauhkaTestCase):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.fixture_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "xhr.json")
+        self.fixture_mode = "replay"
+        self.fixture_strict = True
@@ -13,8 +13,8 @@
 
 import os
 
-from hellotestcase import HelloWorldTestCase
-from tauhka.testcase import TauhkaMemoryMonitor
+from hellotestcase import HelloWorldTestCase, HelloWorldPooledTestCase
+from tauhka.testcase import TauhkaMemoryMonitor, TauhkaPerformanceMonitor, TauhkaConsoleMonitor
 
 from views.form import HelloForm
 
@@ -52,3 +52,155 @@ class HelloWorldFormTest(HelloWorldTestCase):
 
         # check that the form data is now in pre
         assert self.find_element("formpost").get_attribute("innerHTML") == msg
+
+    def test_2_submit_performance(self):
+        self.start_test()
+
+        form = HelloForm(testcase=self)
+        form.afield.send_keys("Hello Performance!")
+
+        with TauhkaPerformanceMonitor(
+                testcase=self,
+                description="form.submit - duration max 2s, no long tasks",
+                budgets={"duration": 2.0, "long_tasks": 0, "cls": 0.1},
+                fail_on_issue=True) as monitor:
+            form.submit()
+
+        assert monitor.metrics["duration"] < 2.0
+
+    def test_3_query_form(self):
+        self.start_test()
+
+        form = HelloForm(testcase=self)
+        form.afield.send_keys("Hello Query!")
+
+        snapshot = self.query({
+            "theform": "theform",
+            "afield": {"css": "input[name=afield]"},
+            "formpost": {"id": "formpost", "props": ["innerHTML", "visible"]},
+            "missing": "does_not_exist",
+        })
+
+        assert snapshot.theform.exists
+        assert snapshot.afield.value == "Hello Query!"
+        assert snapshot.afield.visible
+        assert snapshot.formpost.innerHTML == ""
+        assert not snapshot.missing.exists
+
+    def test_4_page_survives_reload(self):
+        self.start_test()
+
+        form = HelloForm(testcase=self)
+        form.afield.send_keys("Before reload")
+        assert form.cache.misses == 1
+
+        # the cached element is stale after the reload and gets resolved again
+        self.driver.refresh()
+        assert form.afield.get_attribute("value") == ""
+        assert form.cache.misses == 2
+
+        form.afield.send_keys("After reload")
+        assert form.afield.get_attribute("value") == "After reload"
+        assert form.cache.misses == 2
+
+    def test_8_waits_resolve_on_mutation(self):
+        self.start_test()
+
+        self.driver.execute_script("setTimeout(function() { document.getElementById('formpost').innerHTML = 'Later'; }, 100);")
+        assert self.wait_until_innerhtml("formpost", "Later").get_attribute("innerHTML") == "Later"
+
+        self.driver.execute_script("setTimeout(function() { document.getElementById('theform').style.display = 'none'; }, 100);")
+        assert self.wait_until_hidden_by_id("theform")
+        assert not self.is_element_visible("theform")
+
+    def test_9_memory_modes(self):
+        self.start_test()
+
+        form = HelloForm(testcase=self)
+        form.afield.send_keys("Hello Memory!")
+
+        for mode in ("precise", "fast", "sampled"):
+            with TauhkaMemoryMonitor(
+                    testcase=self,
+                    description="form.submit - {mode} memory usage".format(mode=mode),
+                    max_memory_diff=200,
+                    mode=mode):
+                form.submit()
+            # without a running heap sampler there is no sample, and the fast read is reported
+            expected = "fast" if mode == "sampled" and self.heap_sampler is None else mode
+            assert self.memory_logs[-1][-1] == expected
+
+    def test_10_submit_console(self):
+        self.start_test()
+
+        form = HelloForm(testcase=self)
+        form.afield.send_keys("Hello Console!")
+
+        with TauhkaConsoleMonitor(
+                testcase=self,
+                description="form.submit - no errors",
+                budgets={"SEVERE": 0},
+                fail_on_issue=True) as monitor:
+            form.submit()
+            form.submit()
+
+        assert [row[3] for row in monitor.messages() if "Form was submitted" in row[2]] == [2]
+
+
+class HelloWorldFormPollingWaitTest(HelloWorldFormTest):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.wait_strategy = "poll"
+
+
+class HelloWorldFormElementCacheTest(HelloWorldFormTest):
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        self.element_cache = True
+
+    def test_5_find_element_is_cached(self):
+        self.start_test()
+
+        assert self.is_element_visible("theform")
+        assert self.is_element_visible("theform")
+        assert self.find_element("formpost").get_attribute("innerHTML") == ""
+        assert self.cached_elements.misses == 2
+        assert self.cached_elements.hits == 1
+
+        # navigation clears the cache
+        self.start_test()
+        assert self.is_element_visible("theform")
+        assert self.cached_elements.misses == 3
+
+    def test_11_cached_elements_are_script_arguments(self):
+        self.start_test()
+
+        form = HelloForm(testcase=self)
+        self.driver.execute_script("arguments[0].value = 'From script';", form.afield)
+        assert form.afield.get_attribute("value") == "From script"
+        assert self.driver.execute_script("return arguments[0].id;", self.find_element("formpost")) == "formpost"
+        self.scroll_to_element(self.find_element("theform"))
+
+
+class HelloWorldFormPooledTest(HelloWorldFormTest, HelloWorldPooledTestCase):
+    def test_6_send_message_again(self):
+        self.test_1_send_message()
+
+
+class HelloWorldPooledStorageTest(HelloWorldPooledTestCase):
+    # both tests get the same browser session, the second one must not see the state of the first
+    session_ids = []
+
+    def test_1_set_cookie_and_storage(self):
+        self.open_url("http://127.0.0.1:8012")
+        self.driver.add_cookie({"name": "tauhka", "value": "pooled"})
+        self.driver.execute_script("window.localStorage.setItem('tauhka', 'pooled'); window.sessionStorage.setItem('tauhka', 'pooled');")
+        assert self.driver.get_cookie("tauhka")["value"] == "pooled"
+        assert self.driver.execute_script("return window.localStorage.length + window.sessionStorage.length") == 2
+        self.session_ids.append(self.driver.session_id)
+
+    def test_2_cookie_and_storage_are_reset(self):
+        self.open_url("http://127.0.0.1:8012")
+        assert self.session_ids == [self.driver.session_id]
+        assert self.driver.get_cookies() == []
+        assert self.driver.execute_script("return window.localStorage.length + window.sessionStorage.length") == 0
@@ -13,7 +13,7 @@
 
 import os
 
-from hellotestcase import HelloWorldTestCase, HelloWorldTestCaseReportAlways
+from hellotestcase import HelloWorldTestCase, HelloWorldTestCaseReportAlways, HelloWorldThrottledTestCase, HelloWorldReplayTestCase
 from tauhka.testcase import TauhkaMemoryMonitor, TauhkaNetworkMonitor
 
 from views.form import HelloForm
@@ -66,3 +66,12 @@ class HelloWorldXHRTest(HelloWorldTestCase):
 
 class HelloWorldXHRTestReport(HelloWorldXHRTest, HelloWorldTestCaseReportAlways):
     pass
+
+
+class HelloWorldXHRTestThrottled(HelloWorldXHRTest, HelloWorldThrottledTestCase):
+    pass
+
+
+class HelloWorldXHRTestReplay(HelloWorldXHRTest, HelloWorldReplayTestCase):
+    # served from fixtures/xhr.json, the server on port 8012 is not needed
+    pass
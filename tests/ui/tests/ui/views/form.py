@@ -11,12 +11,13 @@
 # All Rights Reserved.
 ################################################################
 
+from tauhka.page import TauhkaPage, TauhkaField
 
-class HelloForm(object):
-    def __init__(self, testcase):
-        self.testcase = testcase
-        self.theform = self.testcase.find_element("theform")
-        self.afield = self.testcase.find_element_by_css("input[name=afield]")
+
+class HelloForm(TauhkaPage):
+    theform = TauhkaField("theform")
+    afield = TauhkaField(css="input[name=afield]")
+    formpost = TauhkaField("formpost")
 
     def submit(self):
         btn = self.theform.find_element_by_css_selector("input[type=submit]")